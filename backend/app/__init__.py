@@ -1,8 +1,20 @@
+import os
+import json
+import asyncio
 import logging
-from .models import ChatRequest, ChatResponse
+from .models import BatchRequest, ChatRequest, ChatResponse, JobRequest
 from .workflow import Workflow
+from .admission import AdmissionRejected, admission_from_env
+from .jobs import jobs_from_env
+from .batch import batch_runner_from_env
+from .warmup import warmup_from_env
+from .store import ContextLocked
+from .locks import RunSuperseded
+from tools.deadline import DeadlineExceeded, deadline_scope, enforce_deadline
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 
 # Load environment variables from .env file
@@ -15,6 +27,10 @@ origins = ["*"]  # Allow all origins for simplicity; adjust as needed
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 wflw = Workflow()
+admission = admission_from_env()
+jobs = jobs_from_env(wflw, admission=admission)
+batches = batch_runner_from_env(wflw, admission=admission)
+warmup = warmup_from_env(wflw)
 
 # Add /api prefix to all routes
 app = FastAPI(
@@ -29,11 +45,98 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_jobs():
+    # Resume jobs left queued by a previous run
+    jobs.start()
+    # Warm up in the background; /readyz reports ready once it is done
+    warmup.start()
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    await warmup.stop()
+    await jobs.stop()
+
+def request_user(http_request: Request) -> str:
+    """Identifies the user a request belongs to, for fair queueing."""
+    return http_request.headers.get("X-User-Id") or (http_request.client.host if http_request.client else "anonymous")
+
+def request_timeout(http_request: Request) -> Optional[float]:
+    """Reads the seconds a client is willing to wait for admission from the `X-Request-Timeout` header."""
+    try:
+        return float(http_request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        return None
+
+def request_deadline(http_request: Request) -> Optional[float]:
+    """
+    Reads the request's time budget in seconds from the `X-Request-Deadline` header, defaulting
+    to the `CHAT_DEADLINE` environment variable (300; 0 for none).
+    """
+    try:
+        return float(http_request.headers["X-Request-Deadline"])
+    except (KeyError, ValueError):
+        return float(os.getenv("CHAT_DEADLINE", "300")) or None
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its response is ready."""
+
+async def cancel_on_disconnect(http_request: Request, coro, poll_interval: float = 0.5):
+    """
+    Runs a coroutine, cancelling it if the client disconnects (or presses stop) before it finishes,
+    so the agents stop working on a response nobody will read.
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    except (ClientDisconnected, asyncio.CancelledError):
+        task.cancel()
+        # Let the run roll back and release its conversation before returning
+        await asyncio.gather(task, return_exceptions=True)
+        raise
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest, http_request: Request) -> ChatResponse:
+    async def run() -> tuple[str, Optional[str]]:
+        async with admission.admit(request_user(http_request), timeout=request_timeout(http_request)):
+            if "ctx_id" in request.model_fields_set:
+                # Sticky-free: the conversation is loaded from (and stored back to) the shared context store
+                return await wflw.chat_in_context(
+                    request.message,
+                    request.ctx_id,
+                    lock_timeout=request_timeout(http_request),
+                )
+            response = await wflw.chat(request.message)
+            return response, wflw.ctx_id
+
     try:
-        response = await wflw.chat(request.message)
-        return ChatResponse(response=response)
+        # The deadline covers queueing and the whole run, and is passed down to every tool and LLM call
+        with deadline_scope(request_deadline(http_request)):
+            async with enforce_deadline():
+                response, ctx_id = await cancel_on_disconnect(http_request, run())
+        return ChatResponse(response=response, ctx_id=ctx_id)
+    except ClientDisconnected:
+        logging.info("Client disconnected; cancelled its chat run.")
+        raise HTTPException(status_code=499, detail="Client closed the request.")
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ContextLocked, RunSuperseded) as e:
+        # The conversation is busy, or a newer message to it replaced this one
+        raise HTTPException(status_code=409, detail=str(e))
+    except AdmissionRejected as e:
+        logging.warning(f"Chat request rejected ({e.reason}); retry after {e.retry_after}s.")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy ({e.reason}). Please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logging.error(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
@@ -51,9 +154,9 @@ async def reset() -> dict[str, str]:
 @app.get("/get-contexts")
 async def get_contexts() -> dict:
     try:
-        contexts = wflw.ctx_index
-        # Convert contexts dict to a proper string format if it's not already
-        return {"contexts": str(contexts) if contexts else "{}"}
+        contexts = await asyncio.to_thread(wflw.refresh_contexts_index)
+        # Serialize as JSON, so contexts still waiting for a title come through as null
+        return {"contexts": json.dumps(contexts) if contexts else "{}"}
     except Exception as e:
         logging.error(f"Error retrieving contexts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving contexts: {str(e)}")
@@ -69,6 +172,85 @@ async def load_context(id: str) -> dict:
         logging.error(f"Error loading context: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error loading context: {str(e)}")
 
+@app.get("/search")
+async def search(
+    q: str,
+    top_k: int = 10,
+    kind: Optional[list[str]] = Query(None),
+) -> dict:
+    try:
+        results = await asyncio.to_thread(wflw.search, q, top_k, kind)
+        return {"results": results}
+    except Exception as e:
+        logging.error(f"Error searching contexts: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching contexts: {str(e)}")
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest, http_request: Request) -> dict:
+    try:
+        job = jobs.submit(request.message, ctx_id=request.ctx_id, user=request_user(http_request))
+        return {"id": job["id"], "status": job["status"]}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        logging.error(f"Error submitting job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting job: {str(e)}")
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, events: bool = False) -> dict:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job if events else {key: value for key, value in job.items() if key != "events"}
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    async def stream():
+        # Server-sent events; disconnecting only ends the subscription, not the job
+        async for event in jobs.subscribe(job_id):
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.post("/batch")
+async def batch(request: BatchRequest, http_request: Request) -> StreamingResponse:
+    try:
+        batches.validate(request.topics, request.content_types)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def stream():
+        # Newline-delimited JSON, one line per item as it finishes; disconnecting cancels the rest
+        async for result in batches.run(request.topics, request.content_types, request.instructions, user=request_user(http_request)):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def metrics() -> dict:
+    try:
+        return {**wflw.metrics(), "admission": admission.metrics(), "jobs": jobs.metrics(), "batch": batches.metrics()}
+    except Exception as e:
+        logging.error(f"Error collecting metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error collecting metrics: {str(e)}")
+
+@app.get("/healthz")
+async def healthz() -> dict[str, str]:
+    # Liveness only: the process is up and serving requests
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz() -> dict:
+    # Readiness: only route traffic here once the warm-up is done
+    if not warmup.ready:
+        raise HTTPException(status_code=503, detail=warmup.report(), headers={"Retry-After": "5"})
+    return warmup.report()
+
 @app.get("/")
 async def root() -> dict[str, str]:
     return {"message": "Welcome to the Agent Workflow API"}
\ No newline at end of file
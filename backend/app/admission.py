@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted; carries the suggested Retry-After in seconds."""
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounds the number of concurrent workflow runs, with a fair, bounded waiting queue.
+
+    Waiting requests are admitted round-robin across users, so one user's burst can't starve
+    the others. A request is rejected up front when the queue is full, or when its expected
+    wait exceeds its deadline, rather than timing out after queueing.
+
+    Background work (batch items and jobs) takes slots from the same budget, queued under users
+    of its own, so it shares the workflow with chat requests rather than running on top of them.
+    Having no client waiting on it, it waits as long as it takes instead of being rejected.
+    """
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 32,
+        max_queue_per_user: int = 4,
+        default_timeout: float = 120,
+    ):
+        """
+        Args:
+            max_concurrent (int): Maximum number of workflow runs at once.
+            max_queue (int): Maximum number of waiting requests.
+            max_queue_per_user (int): Maximum number of waiting requests per user.
+            default_timeout (float): Seconds a request may wait for admission, unless it brings its own deadline.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.default_timeout = default_timeout
+        self.active = 0
+        self.stats = Counter()
+        self.avg_run_time = 30.0
+        self.avg_wait_time = 0.0
+        self._queues: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def expected_wait(self) -> float:
+        """Estimates how long a request joining the queue now would wait, in seconds."""
+        if self.active < self.max_concurrent and not self.queue_depth:
+            return 0.0
+        return (self.queue_depth + 1) / self.max_concurrent * self.avg_run_time
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.stats[f"rejected_{reason}"] += 1
+        return AdmissionRejected(reason, retry_after=max(1, round(self.expected_wait())))
+
+    async def _acquire(self, user: str, timeout: Optional[float]):
+        if self.active < self.max_concurrent and not self.queue_depth:
+            self.active += 1
+            return
+
+        if self.queue_depth >= self.max_queue:
+            raise self._reject("queue_full")
+        if len(self._queues.get(user, ())) >= self.max_queue_per_user:
+            raise self._reject("user_queue_full")
+        if timeout is not None and self.expected_wait() > timeout:
+            raise self._reject("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user, deque()).append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we gave up; hand the slot on
+                self._release()
+            else:
+                waiter.cancel()
+                self._remove(user, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("timeout")
+
+    def _remove(self, user: str, waiter: asyncio.Future):
+        queue = self._queues.get(user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[user]
+
+    def _release(self):
+        # Admit the next waiter, round-robin across users
+        while self._queues:
+            user, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            del self._queues[user]
+            if queue:
+                self._queues[user] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def _acquire_background(self, user: str):
+        while True:
+            try:
+                await self._acquire(user, None)
+                return
+            except AdmissionRejected as e:
+                # The queue is full; come back when a place is likely to be free
+                self.stats["background_deferred"] += 1
+                await asyncio.sleep(e.retry_after)
+
+    @asynccontextmanager
+    async def admit(self, user: str, timeout: Optional[float] = None, background: bool = False):
+        """
+        Waits for a free workflow slot and holds it for the duration of the block.
+
+        Args:
+            user (str): The user the request belongs to, for fairness.
+            timeout (Optional[float]): The request's deadline for admission, in seconds.
+            background (bool): Whether this is background work, which waits without a deadline.
+
+        Raises:
+            AdmissionRejected: If the queue is full, or the request can't be admitted before its deadline.
+                               Never raised for background work.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        queued_at = time.monotonic()
+        if background:
+            await self._acquire_background(user)
+        else:
+            await self._acquire(user, timeout)
+
+        started_at = time.monotonic()
+        self.avg_wait_time = 0.9 * self.avg_wait_time + 0.1 * (started_at - queued_at)
+        self.stats["admitted_background" if background else "admitted"] += 1
+        try:
+            yield
+        finally:
+            self.avg_run_time = 0.9 * self.avg_run_time + 0.1 * (time.monotonic() - started_at)
+            self._release()
+
+    def metrics(self) -> dict:
+        """Returns the current load, queue depth per user, and admission counters."""
+        return {
+            **self.stats,
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_user": {user: len(queue) for user, queue in self._queues.items()},
+            "avg_wait_s": round(self.avg_wait_time, 3),
+            "avg_run_s": round(self.avg_run_time, 3),
+            "expected_wait_s": round(self.expected_wait(), 3),
+        }
+
+def admission_from_env() -> AdmissionController:
+    """Builds the admission controller from the `ADMISSION_*` environment variables."""
+    return AdmissionController(
+        max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "4")),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+        max_queue_per_user=int(os.getenv("ADMISSION_MAX_QUEUE_PER_USER", "4")),
+        default_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "120")),
+    )
@@ -0,0 +1,231 @@
+import os
+import re
+import asyncio
+import contextlib
+import logging
+from collections import Counter
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+from llama_index.core.workflow import Context
+from prompts import BATCH_ITEM_PROMPT
+from .admission import AdmissionController
+from .memory import topic_terms
+from .workflow import Session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = ("brief", "blog", "script")
+# Workflow state field holding each content type
+CONTENT_FIELDS = {"brief": "intel_briefing", "blog": "blog_posts", "script": "scripts"}
+
+def brief_key(topic: str) -> str:
+    """Turns a topic into the intel briefing key its batch item stores the brief under."""
+    return re.sub(r"[^a-z0-9]+", "_", topic.lower()).strip("_")[:60] or "topic"
+
+def batch_message(topic: str, key: str, content_types: list[str], brief_ready: bool, instructions: Optional[str]) -> str:
+    """
+    Builds the ManagerAgent message for one batch item.
+
+    Args:
+        topic (str): The item's topic.
+        key (str): The intel briefing key of the topic.
+        content_types (list[str]): The content to produce.
+        brief_ready (bool): Whether a brief is already stored under `key`, so research can be skipped.
+        instructions (Optional[str]): Extra instructions for every item.
+
+    Returns:
+        str: The message.
+    """
+    if brief_ready:
+        steps = [f"An intel briefing on this topic is already stored in context under the key `{key}`. Use it as is; skip research and briefing."]
+    else:
+        steps = [f"Research the topic with the appropriate research agents, then have the brief writer store an intel briefing under the key `{key}`."]
+    if "blog" in content_types:
+        steps.append(f"Have the blog agent prepare an 800-1200 word blog post draft from the `{key}` briefing.")
+    if "script" in content_types:
+        steps.append(f"Have the YouTube agent write a ~60 second video script from the `{key}` briefing.")
+    return BATCH_ITEM_PROMPT.format(
+        topic=topic,
+        steps="\n".join(f"{i}.  {step}" for i, step in enumerate(steps, start=1)),
+        instructions=f"*   {instructions}" if instructions else "",
+    )
+
+class BatchRunner:
+    """Runs the research -> brief -> blog/script pipeline for many topics, with bounded parallelism.
+
+    Research is shared: topics that normalize to the same terms are researched once, and the
+    other items start from the resulting brief, as do topics with a fresh brief in research
+    memory. Concurrent identical tool lookups are further shared through the tool cache. Each
+    item runs in its own stored conversation, and its result (or failure) is yielded as soon
+    as it finishes.
+    """
+    def __init__(self, workflow, concurrency: int = 2, max_items: int = 50, admission: Optional[AdmissionController] = None):
+        """
+        Args:
+            workflow (Workflow): The workflow that runs the items.
+            concurrency (int): Maximum number of items running at once, across all batches.
+            max_items (int): Maximum number of topics per batch.
+            admission (Optional[AdmissionController]): The admission controller whose workflow slots
+                                                       items run in, alongside chat requests.
+        """
+        self.workflow = workflow
+        self.admission = admission
+        self.max_items = max_items
+        self.stats = Counter()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def validate(self, topics: list[str], content_types: list[str]):
+        """
+        Checks a batch before it runs.
+
+        Raises:
+            ValueError: If the batch is empty, too large, or asks for an unknown content type.
+        """
+        unknown = set(content_types) - set(CONTENT_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown content types: {sorted(unknown)}. Use {list(CONTENT_TYPES)}.")
+        if not topics or not content_types:
+            raise ValueError("A batch needs at least one topic and one content type.")
+        if len(topics) > self.max_items:
+            raise ValueError(f"A batch can have at most {self.max_items} topics.")
+
+    def plan(self, topics: list[str]) -> list[dict]:
+        """
+        Plans the items of a batch, deduplicating their research.
+
+        Args:
+            topics (list[str]): The topics.
+
+        Returns:
+            list[dict]: One item per topic, with the index of the item whose brief it reuses (if any)
+                        and the brief it starts from (if one is fresh in research memory).
+        """
+        items, leaders = [], {}
+        for index, topic in enumerate(topics):
+            terms = frozenset(topic_terms(topic)) or frozenset([topic.strip().lower()])
+            item = {"index": index, "topic": topic, "key": brief_key(topic), "shares_research_with": None, "brief": None}
+            if terms in leaders:
+                item["shares_research_with"] = leaders[terms]
+            else:
+                leaders[terms] = index
+                matches = self.workflow.research_memory.find(topic, limit=1)
+                if matches and matches[0]["fresh"]:
+                    item["brief"] = matches[0]["brief"]
+            items.append(item)
+        return items
+
+    async def run(
+        self,
+        topics: list[str],
+        content_types: list[str],
+        instructions: Optional[str] = None,
+        user: str = "anonymous",
+    ) -> AsyncIterator[dict]:
+        """
+        Runs a batch, yielding each item's result as it finishes.
+
+        Args:
+            topics (list[str]): The topics.
+            content_types (list[str]): The content to produce for each topic: `brief`, `blog` and/or `script`.
+            instructions (Optional[str]): Extra instructions for every item.
+            user (str): The user the batch belongs to, for fair admission.
+        """
+        self.validate(topics, content_types)
+        content_types = list(dict.fromkeys(content_types))
+        items = self.plan(topics)
+        briefs = {item["index"]: asyncio.get_running_loop().create_future() for item in items}
+        results = asyncio.Queue()
+        self.stats["batches"] += 1
+
+        async def run_item(item: dict):
+            try:
+                leader = item["shares_research_with"]
+                if leader is not None:
+                    # Wait for the leader's research, then start from its brief
+                    item["brief"] = await asyncio.shield(briefs[leader])
+                result = await self._run_item(item, content_types, instructions, user)
+                # Shared with the items waiting on this one's research, whatever content was requested
+                briefs[item["index"]].set_result(result.pop("brief"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Batch item failed: {item['topic']}")
+                briefs[item["index"]].set_result(None)
+                result = {"index": item["index"], "topic": item["topic"], "status": "failed", "error": str(e)}
+                self.stats["items_failed"] += 1
+            await results.put(result)
+
+        tasks = [asyncio.create_task(run_item(item)) for item in items]
+        try:
+            for _ in items:
+                yield await results.get()
+        finally:
+            # The consumer went away (e.g. the client disconnected); stop the remaining items
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_item(self, item: dict, content_types: list[str], instructions: Optional[str], user: str) -> dict:
+        if self.admission is None:
+            admitted = contextlib.nullcontext()
+        else:
+            # Each item takes a workflow slot like a chat request, queued as the batch's own user
+            admitted = self.admission.admit(f"batch:{user}", background=True)
+        async with self._semaphore, admitted:
+            session = Session(ctx_id=str(uuid4()))
+            brief = item["brief"]
+            if brief is not None:
+                # Seed the conversation with the shared brief, so the agents skip research
+                session.ctx = Context(self.workflow.workflow)
+                session.workflow = self.workflow.workflow
+                await session.ctx.set("state", {"intel_briefing": {item["key"]: brief}})
+                self.stats["research_reused"] += 1
+            else:
+                self.stats["research_runs"] += 1
+
+            ctx_id = None
+            if content_types == ["brief"] and brief is not None:
+                # Nothing left to do for this topic
+                response = f"Reused the intel briefing stored under key: {item['key']}"
+                state = {"intel_briefing": {item["key"]: brief}}
+            else:
+                message = batch_message(item["topic"], item["key"], content_types, brief is not None, instructions)
+                response = await self.workflow.run(message, session, persist=False)
+                await self.workflow.update_stored_context(session)
+                state = await session.ctx.get("state", default={})
+                ctx_id = session.ctx_id
+
+            self.stats["items_succeeded"] += 1
+            stored_briefs = state.get("intel_briefing", {})
+            if item["key"] not in stored_briefs and len(stored_briefs) == 1:
+                # The brief writer picked its own key
+                shared_brief = next(iter(stored_briefs.values()))
+            else:
+                shared_brief = stored_briefs.get(item["key"], brief)
+            return {
+                "index": item["index"],
+                "topic": item["topic"],
+                "status": "succeeded",
+                "ctx_id": ctx_id,
+                "response": response,
+                "reused_research": brief is not None,
+                "artifacts": {
+                    CONTENT_FIELDS[content_type]: state.get(CONTENT_FIELDS[content_type], {})
+                    for content_type in content_types
+                },
+                "brief": shared_brief,
+            }
+
+    def metrics(self) -> dict:
+        """Returns the batch counters, including how many items reused shared research."""
+        return dict(self.stats)
+
+def batch_runner_from_env(workflow, admission: Optional[AdmissionController] = None) -> BatchRunner:
+    """Builds the batch runner configured by the `BATCH_MAX_CONCURRENT` and `BATCH_MAX_ITEMS` environment variables."""
+    return BatchRunner(
+        workflow,
+        admission=admission,
+        concurrency=int(os.getenv("BATCH_MAX_CONCURRENT", "2")),
+        max_items=int(os.getenv("BATCH_MAX_ITEMS", "50")),
+    )
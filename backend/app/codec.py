@@ -0,0 +1,222 @@
+import os
+import json
+import zlib
+import logging
+import tempfile
+from typing import Any, Optional
+
+# Optional fast serializers and compressors; the stdlib fallbacks are always available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Encoded documents start with MAGIC, followed by one byte each for the serializer and compression IDs.
+# Documents without the header are plain JSON, as written by earlier versions.
+MAGIC = b"ACC\x01"
+HEADER_SIZE = len(MAGIC) + 2
+
+SERIALIZERS = {"json": 0, "orjson": 1, "msgpack": 2}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+# File extensions, in lookup order: encoded documents are preferred over legacy JSON
+BINARY_EXTENSION = ".ctx"
+JSON_EXTENSION = ".json"
+
+def available_serializers() -> list[str]:
+    """Returns the serializers that can be used in this environment."""
+    return [name for name, module in [("json", json), ("orjson", orjson), ("msgpack", msgpack)] if module is not None]
+
+def available_compressions() -> list[str]:
+    """Returns the compressions that can be used in this environment."""
+    return [name for name, module in [("none", True), ("zlib", zlib), ("zstd", zstandard), ("lz4", lz4_frame)] if module is not None]
+
+class Codec:
+    """Serializes and compresses stored context documents.
+
+    A codec is described by a spec of the form `<serializer>[+<compression>]`, e.g. `json`,
+    `orjson+zstd` or `msgpack+lz4`. `auto` picks the fastest serializer and compression installed.
+    """
+    def __init__(self, spec: str = "auto", level: Optional[int] = None):
+        """
+        Args:
+            spec (str): The codec spec.
+            level (Optional[int]): The compression level, or None for the compressor's default.
+        """
+        if spec == "auto":
+            serializer = "orjson" if orjson is not None else "json"
+            compression = "zstd" if zstandard is not None else "lz4" if lz4_frame is not None else "none"
+        else:
+            serializer, _, compression = spec.partition("+")
+            compression = compression or "none"
+
+        if serializer not in available_serializers():
+            raise ValueError(f"Serializer '{serializer}' is not available. Choose from: {available_serializers()}")
+        if compression not in available_compressions():
+            raise ValueError(f"Compression '{compression}' is not available. Choose from: {available_compressions()}")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.level = level
+
+    @property
+    def spec(self) -> str:
+        return self.serializer if self.compression == "none" else f"{self.serializer}+{self.compression}"
+
+    @property
+    def extension(self) -> str:
+        """Plain JSON keeps the `.json` extension, so it stays readable by older versions."""
+        return JSON_EXTENSION if self.spec == "json" else BINARY_EXTENSION
+
+    def encode(self, obj: Any) -> bytes:
+        """
+        Encodes an object with this codec.
+
+        Args:
+            obj (Any): A JSON-serializable object.
+
+        Returns:
+            bytes: The encoded document.
+        """
+        if self.spec == "json":
+            return json.dumps(obj).encode("utf-8")
+
+        if self.serializer == "orjson":
+            payload = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        elif self.serializer == "msgpack":
+            payload = msgpack.packb(obj, use_bin_type=True)
+        else:
+            payload = json.dumps(obj).encode("utf-8")
+
+        if self.compression == "zlib":
+            payload = zlib.compress(payload, self.level if self.level is not None else 1)
+        elif self.compression == "zstd":
+            payload = zstandard.ZstdCompressor(level=self.level if self.level is not None else 3).compress(payload)
+        elif self.compression == "lz4":
+            payload = lz4_frame.compress(payload, compression_level=self.level or 0)
+
+        return MAGIC + bytes([SERIALIZERS[self.serializer], COMPRESSIONS[self.compression]]) + payload
+
+def decode(data: bytes) -> Any:
+    """
+    Decodes a document written by any codec, detecting the format from its header.
+
+    Args:
+        data (bytes): The encoded document, or legacy plain JSON.
+
+    Returns:
+        Any: The decoded object.
+    """
+    if not data.startswith(MAGIC):
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+    serializer_id, compression_id = data[len(MAGIC)], data[len(MAGIC) + 1]
+    payload = data[HEADER_SIZE:]
+
+    if compression_id == COMPRESSIONS["zlib"]:
+        payload = zlib.decompress(payload)
+    elif compression_id == COMPRESSIONS["zstd"]:
+        if zstandard is None:
+            raise ValueError("Document is zstd-compressed, but `zstandard` is not installed.")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif compression_id == COMPRESSIONS["lz4"]:
+        if lz4_frame is None:
+            raise ValueError("Document is lz4-compressed, but `lz4` is not installed.")
+        payload = lz4_frame.decompress(payload)
+    elif compression_id != COMPRESSIONS["none"]:
+        raise ValueError(f"Unknown compression ID: {compression_id}")
+
+    if serializer_id == SERIALIZERS["msgpack"]:
+        if msgpack is None:
+            raise ValueError("Document is msgpack-encoded, but `msgpack` is not installed.")
+        return msgpack.unpackb(payload, raw=False)
+    if serializer_id not in (SERIALIZERS["json"], SERIALIZERS["orjson"]):
+        raise ValueError(f"Unknown serializer ID: {serializer_id}")
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+def find_document(stem: str) -> Optional[str]:
+    """
+    Finds the file holding a stored document, in any format.
+
+    Args:
+        stem (str): The document path without extension (e.g. `./contexts/<id>/ctx`).
+
+    Returns:
+        Optional[str]: The path of the document, or None if it doesn't exist.
+    """
+    for extension in (BINARY_EXTENSION, JSON_EXTENSION):
+        if os.path.exists(stem + extension):
+            return stem + extension
+    return None
+
+def write_document(stem: str, obj: Any, codec: Codec) -> str:
+    """
+    Atomically writes a document with the given codec, removing copies stored in other formats.
+    Each write goes through its own temporary file, so concurrent writers never share one.
+
+    Args:
+        stem (str): The document path without extension.
+        obj (Any): A JSON-serializable object.
+        codec (Codec): The codec to encode the document with.
+
+    Returns:
+        str: The path the document was written to.
+    """
+    path = stem + codec.extension
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec.encode(obj))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    for extension in (BINARY_EXTENSION, JSON_EXTENSION):
+        if stem + extension != path and os.path.exists(stem + extension):
+            os.remove(stem + extension)
+    return path
+
+def read_document(stem: str) -> Any:
+    """
+    Reads a document written by any codec.
+
+    Args:
+        stem (str): The document path without extension.
+
+    Returns:
+        Any: The decoded object.
+
+    Raises:
+        FileNotFoundError: If the document doesn't exist in any format.
+    """
+    path = find_document(stem)
+    if path is None:
+        raise FileNotFoundError(f"No document found at {stem}")
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+def codec_from_env() -> Codec:
+    """Builds the codec configured by the `CONTEXT_CODEC` and `CONTEXT_CODEC_LEVEL` environment variables."""
+    spec = os.getenv("CONTEXT_CODEC", "auto")
+    level = os.getenv("CONTEXT_CODEC_LEVEL")
+    try:
+        return Codec(spec, level=int(level) if level else None)
+    except ValueError as e:
+        logger.warning(f"Invalid context codec '{spec}' ({e}). Falling back to plain JSON.")
+        return Codec("json")
@@ -0,0 +1,241 @@
+import os
+import logging
+from collections import Counter, deque
+from typing import Optional, Union
+from llama_index.core.agent.workflow import AgentInput, AgentOutput, AgentSetup, ToolCall, ToolCallResult
+from llama_index.core.llms import ChatMessage
+from llama_index.core.workflow import Context, StartEvent, StopEvent, step
+from llms import usage_from_raw
+from .parallel import ParallelAgentWorkflow
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ESCALATION_NOTE = (
+    "[The hand-off budget for this request is exhausted ({reason}). Do not hand off or call tools. "
+    "Answer the user now with what has been gathered so far, and say briefly what is still missing.]"
+)
+PARTIAL_ANSWER = "I had to stop before finishing this request ({reason})."
+
+class HandoffBudget:
+    """The per-run limits on hand-offs and agent tokens, and the hop statistics used to tune the prompts."""
+    def __init__(
+        self,
+        max_hops: int = 6,
+        max_tokens: Optional[int] = 300_000,
+        max_idle_cycles: int = 1,
+        escalate: bool = True,
+        recent_runs: int = 20,
+    ):
+        """
+        Args:
+            max_hops (int): Maximum number of hand-offs per run.
+            max_tokens (Optional[int]): Maximum agent LLM tokens (input and output) per run; unlimited if None.
+            max_idle_cycles (int): Hand-offs back to an agent already visited since the last new tool output
+                that are tolerated per run.
+            escalate (bool): Whether an exhausted run gets one last, tool-less step by the root agent to
+                answer with what it has; otherwise it stops with a partial answer right away.
+            recent_runs (int): Number of recent runs whose hand-off paths are kept for `/metrics`.
+        """
+        self.max_hops = max_hops
+        self.max_tokens = max_tokens
+        self.max_idle_cycles = max_idle_cycles
+        self.escalate = escalate
+        self.stats = Counter()
+        self.hops_per_run = Counter()
+        self.handoffs = Counter()
+        self.outcomes = Counter()
+        self.recent = deque(maxlen=recent_runs)
+
+    def exhausted(self, run: dict) -> Optional[str]:
+        """Returns why a run is over budget, or None if it isn't."""
+        if run["hops"] > self.max_hops:
+            return f"more than {self.max_hops} hand-offs"
+        if run["idle_cycles"] > self.max_idle_cycles:
+            return "agents kept handing off without new tool output"
+        if self.max_tokens is not None and run["tokens"] > self.max_tokens:
+            return f"more than {self.max_tokens} tokens"
+        return None
+
+    def record(self, run: dict, outcome: str):
+        """Records a finished run's hand-offs."""
+        self.stats["runs"] += 1
+        self.stats["hops"] += run["hops"]
+        self.stats["idle_cycles"] += run["idle_cycles"]
+        self.hops_per_run[run["hops"]] += 1
+        self.outcomes[outcome] += 1
+        self.recent.append({"path": run["path"], "hops": run["hops"], "tokens": run["tokens"], "outcome": outcome})
+        logger.info(f"Run {outcome} after {run['hops']} hand-offs: {' -> '.join(run['path'])}")
+
+    def metrics(self) -> dict:
+        runs = self.stats["runs"]
+        return {
+            "max_hops": self.max_hops,
+            "max_tokens": self.max_tokens,
+            "max_idle_cycles": self.max_idle_cycles,
+            "runs": runs,
+            "avg_hops": round(self.stats["hops"] / runs, 2) if runs else 0.0,
+            "hops_per_run": dict(sorted(self.hops_per_run.items())),
+            "idle_cycles": self.stats["idle_cycles"],
+            "outcomes": dict(self.outcomes),
+            "top_handoffs": dict(self.handoffs.most_common(10)),
+            "recent_runs": list(self.recent),
+        }
+
+class GuardedAgentWorkflow(ParallelAgentWorkflow):
+    """An agent workflow that keeps agents from handing off to each other indefinitely.
+
+    Each run counts its hand-offs and the tokens its agent LLM calls use, and watches for idle cycles:
+    hand-offs back to an agent already visited since the last new (non-hand-off) tool output, like a
+    manager and a specialist bouncing the request between them. A run over budget is escalated to the
+    root agent for one last step without tools, to answer with what has been gathered, or stopped
+    with a partial answer.
+
+    The run's accounting is kept in the context under `hop_budget`, so it is serialized with it.
+    """
+    def __init__(self, *args, budget: Optional[HandoffBudget] = None, **kwargs):
+        """
+        Args:
+            budget (Optional[HandoffBudget]): The hand-off and token limits; the defaults if None.
+            *args, **kwargs: Passed to `ParallelAgentWorkflow`.
+        """
+        super().__init__(*args, **kwargs)
+        self.budget = budget or HandoffBudget()
+
+    @step
+    async def init_run(self, ctx: Context, ev: StartEvent) -> AgentInput:
+        agent_input = await super().init_run(ctx, ev)
+        # The hand-off tool leaves its target behind; a stale one would pull the next run's agent back
+        await ctx.set("next_agent", None)
+        memory = await ctx.get("memory")
+        await ctx.set("hop_budget", {
+            "path": [agent_input.current_agent_name],
+            "hops": 0,
+            "tokens": 0,
+            "idle_cycles": 0,
+            "since_progress": [agent_input.current_agent_name],
+            "tool_outputs": 0,
+            "memory_start": len(await memory.aget_all()),
+            "escalated": None,
+        })
+        return agent_input
+
+    @step
+    async def run_agent_step(self, ctx: Context, ev: AgentSetup) -> AgentOutput:
+        memory = await ctx.get("memory")
+        agent = self.agents[ev.current_agent_name]
+        run = await ctx.get("hop_budget", default=None)
+        if run is not None and run["escalated"]:
+            tools = []
+        else:
+            tools = await self.get_tools(ev.current_agent_name, await ctx.get("user_msg_str") or "")
+
+        agent_output = await agent.take_step(ctx, ev.input, tools, memory)
+        ctx.write_event_to_stream(agent_output)
+
+        if run is not None:
+            input_tokens, output_tokens = usage_from_raw(agent_output.raw)
+            if input_tokens is None:
+                input_tokens = sum(len(str(message.content or "")) for message in ev.input) // 4
+            if output_tokens is None:
+                output_tokens = len(agent_output.response.content or "") // 4
+            run["tokens"] += input_tokens + output_tokens
+            await ctx.set("hop_budget", run)
+        return agent_output
+
+    @step
+    async def parse_agent_output(self, ctx: Context, ev: AgentOutput) -> Union[StopEvent, ToolCall, None]:
+        run = await ctx.get("hop_budget", default=None)
+        if run is not None and run["escalated"] and ev.tool_calls:
+            # The escalation step has no tools; a hallucinated call is dropped and the run ends
+            await ctx.set(self.agents[ev.current_agent_name].scratchpad_key, [])
+            return await self._stop(ctx, ev.current_agent_name, run, run["escalated"], finalize=False)
+
+        result = await super().parse_agent_output(ctx, ev)
+        if isinstance(result, StopEvent) and run is not None:
+            self.budget.record(run, "escalated" if run["escalated"] else "completed")
+        return result
+
+    @step
+    async def aggregate_tool_results(self, ctx: Context, ev: ToolCallResult) -> Union[AgentInput, StopEvent, None]:
+        from_agent = await ctx.get("current_agent_name")
+        result = await super().aggregate_tool_results(ctx, ev)
+        run = await ctx.get("hop_budget", default=None)
+        if result is None or run is None:
+            return result
+        if isinstance(result, StopEvent):
+            self.budget.record(run, "completed")
+            return result
+
+        await ctx.set("next_agent", None)
+        tool_calls = await ctx.get("current_tool_calls", default=[])
+        tool_outputs = sum(1 for call in tool_calls if call.tool_name != "handoff")
+        if tool_outputs > run["tool_outputs"]:
+            run["tool_outputs"] = tool_outputs
+            run["since_progress"] = [from_agent]
+
+        to_agent = result.current_agent_name
+        if to_agent != from_agent:
+            run["hops"] += 1
+            run["path"].append(to_agent)
+            self.budget.handoffs[f"{from_agent} -> {to_agent}"] += 1
+            if to_agent in run["since_progress"]:
+                run["idle_cycles"] += 1
+            run["since_progress"].append(to_agent)
+        await ctx.set("hop_budget", run)
+
+        reason = self.budget.exhausted(run)
+        if reason is None:
+            return result
+        if run["escalated"] or not self.budget.escalate:
+            return await self._stop(ctx, from_agent, run, reason, finalize=to_agent == from_agent)
+        return await self._escalate(ctx, from_agent, to_agent, run, reason)
+
+    async def _escalate(self, ctx: Context, from_agent: str, to_agent: str, run: dict, reason: str) -> AgentInput:
+        logger.warning(f"Escalating run to {self.root_agent}: {reason} ({' -> '.join(run['path'])}).")
+        memory = await ctx.get("memory")
+        if to_agent == from_agent:
+            # The agent is mid-task; move its tool calls and results into memory before leaving it
+            await self.agents[from_agent].finalize(ctx, AgentOutput(response=ChatMessage(role="assistant", content=""), tool_calls=[], raw=None, current_agent_name=from_agent), memory)
+        run["escalated"] = reason
+        await ctx.set("hop_budget", run)
+        await ctx.set("current_agent_name", self.root_agent)
+        # The note goes to this one LLM call only, not into the conversation's memory
+        note = ChatMessage(role="user", content=ESCALATION_NOTE.format(reason=reason))
+        input_messages = await memory.aget(input=await ctx.get("user_msg_str"))
+        return AgentInput(input=[*input_messages, note], current_agent_name=self.root_agent)
+
+    async def _stop(self, ctx: Context, agent_name: str, run: dict, reason: str, finalize: bool) -> StopEvent:
+        logger.warning(f"Stopping run: {reason} ({' -> '.join(run['path'])}).")
+        memory = await ctx.get("memory")
+        if finalize:
+            await self.agents[agent_name].finalize(ctx, AgentOutput(response=ChatMessage(role="assistant", content=""), tool_calls=[], raw=None, current_agent_name=agent_name), memory)
+
+        # Salvage the last thing an agent said during this run
+        messages = (await memory.aget_all())[run["memory_start"]:]
+        partial = next((str(message.content) for message in reversed(messages) if message.role == "assistant" and message.content), None)
+        content = PARTIAL_ANSWER.format(reason=reason)
+        if partial:
+            content += f" Here is what I have so far:\n\n{partial}"
+        response = ChatMessage(role="assistant", content=content)
+        await memory.aput(response)
+
+        output = AgentOutput(response=response, tool_calls=[], raw=None, current_agent_name=agent_name)
+        ctx.write_event_to_stream(output)
+        await ctx.set("current_tool_calls", [])
+        self.budget.record(run, "stopped")
+        return StopEvent(result=output)
+
+def handoff_budget_from_env() -> HandoffBudget:
+    """
+    Builds the hand-off budget from the `HANDOFF_MAX_HOPS` (default 6), `RUN_MAX_TOKENS` (default 300000;
+    0 for no limit), `HANDOFF_MAX_IDLE_CYCLES` (default 1) and `HANDOFF_ON_EXHAUSTED` (`escalate`, the
+    default, or `stop`) environment variables.
+    """
+    max_tokens = int(os.getenv("RUN_MAX_TOKENS", "300000"))
+    return HandoffBudget(
+        max_hops=int(os.getenv("HANDOFF_MAX_HOPS", "6")),
+        max_tokens=max_tokens if max_tokens > 0 else None,
+        max_idle_cycles=int(os.getenv("HANDOFF_MAX_IDLE_CYCLES", "1")),
+        escalate=os.getenv("HANDOFF_ON_EXHAUSTED", "escalate").strip().lower() != "stop",
+    )
@@ -0,0 +1,416 @@
+import os
+import asyncio
+import contextlib
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+from llama_index.core.agent.workflow import AgentOutput, ToolCall, ToolCallResult
+from .admission import AdmissionController
+from .store import ContextLocked, ContextStore
+from .workflow import Session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = {"succeeded", "failed", "interrupted"}
+# Workflow state fields returned with a finished job
+ARTIFACT_FIELDS = ("intel_briefing", "scripts", "blog_posts")
+
+def describe_event(event, max_chars: int = 2000) -> Optional[dict]:
+    """
+    Summarizes a workflow event for job subscribers.
+
+    Args:
+        event: The workflow event.
+        max_chars (int): Tool outputs are truncated to this length.
+
+    Returns:
+        Optional[dict]: The event summary, or None for events subscribers don't need.
+    """
+    if isinstance(event, ToolCallResult):
+        return {
+            "type": "tool_result",
+            "agent": getattr(event, "current_agent_name", None),
+            "tool": event.tool_name,
+            "output": str(event.tool_output)[:max_chars],
+        }
+    if isinstance(event, ToolCall):
+        return {
+            "type": "tool_call",
+            "agent": getattr(event, "current_agent_name", None),
+            "tool": event.tool_name,
+            "arguments": event.tool_kwargs,
+        }
+    if isinstance(event, AgentOutput):
+        return {
+            "type": "agent_output",
+            "agent": event.current_agent_name,
+            "content": event.response.content,
+            "tool_calls": [call.tool_name for call in event.tool_calls],
+        }
+    return None
+
+class JobManager:
+    """Runs chat messages as detached background jobs.
+
+    A job keeps running when the client that submitted it disconnects. Its status, progress
+    events and final response are persisted in the context store, so they can be fetched (or
+    replayed to a new subscriber) from any worker at any time, including after a restart. The
+    conversation a job runs in is stored like any other context, so its artifacts can also be
+    loaded in the chat.
+
+    A job runs on the worker that accepted it, under a lock in the store, and is only held in
+    memory until its final status is stored. When a worker starts,
+    it resumes the stored jobs left queued, and marks interrupted the running jobs whose worker
+    stopped; jobs another live worker holds are left alone.
+    """
+    def __init__(
+        self,
+        workflow,
+        store: ContextStore,
+        concurrency: int = 2,
+        max_pending: int = 50,
+        persist_interval: float = 2.0,
+        admission: Optional[AdmissionController] = None,
+    ):
+        """
+        Args:
+            workflow (Workflow): The workflow that runs the jobs.
+            store (ContextStore): The store job records are kept in.
+            concurrency (int): Maximum number of jobs running at once.
+            max_pending (int): Maximum number of queued jobs; further submissions are rejected.
+            persist_interval (float): Minimum seconds between writes of a running job's progress.
+            admission (Optional[AdmissionController]): The admission controller whose workflow slots
+                                                       jobs run in, alongside chat requests.
+        """
+        self.workflow = workflow
+        self.store = store
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.persist_interval = persist_interval
+        self.admission = admission
+        self.jobs: dict[str, dict] = {}
+        self.stats = Counter()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._subscribers: defaultdict[str, list[asyncio.Queue]] = defaultdict(list)
+
+    @staticmethod
+    def _lock_name(job_id: str) -> str:
+        # Held in the store by the worker running the job
+        return f"job-{job_id}"
+
+    def save(self, job: dict):
+        """Writes a job record to the store."""
+        self.store.write_job(job)
+
+    def start(self):
+        """Starts the workers, and resumes the stored jobs no worker is running. Needs a running event loop."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._workers.append(asyncio.create_task(self._resume()))
+
+    async def _resume(self):
+        """Queues the stored jobs left queued, and marks interrupted those left running by a worker that stopped."""
+        try:
+            job_ids = await asyncio.to_thread(self.store.job_ids)
+        except Exception as e:
+            logger.error(f"Error listing stored jobs: {e}")
+            return
+        unfinished = []
+        for job_id in job_ids:
+            job = None if job_id in self.jobs else await asyncio.to_thread(self._stored, job_id)
+            if job is not None and job["status"] not in FINAL_STATUSES:
+                unfinished.append(job)
+
+        for job in sorted(unfinished, key=lambda job: job["created_at"]):
+            if job["status"] == "queued":
+                self.jobs[job["id"]] = job
+                self._queue.put_nowait(job["id"])
+                continue
+            try:
+                # A running job's lock is free only if the worker running it is gone
+                async with self.store.lock(self._lock_name(job["id"]), timeout=0):
+                    job = await asyncio.to_thread(self._stored, job["id"])
+                    if job is not None and job["status"] == "running":
+                        job.update(
+                            status="interrupted",
+                            error="The server stopped while the job was running.",
+                            finished_at=datetime.now().isoformat(),
+                        )
+                        await asyncio.to_thread(self.save, job)
+            except ContextLocked:
+                continue
+
+    async def stop(self):
+        """Cancels the workers. Running jobs are marked interrupted."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    @property
+    def pending(self) -> int:
+        return sum(job["status"] == "queued" for job in self.jobs.values())
+
+    def submit(self, message: str, ctx_id: Optional[str] = None, user: str = "anonymous") -> dict:
+        """
+        Queues a message to be run as a background job.
+
+        Args:
+            message (str): The user message.
+            ctx_id (Optional[str]): A stored context to continue. Defaults to a new conversation.
+            user (str): The user submitting the job, for fair admission.
+
+        Returns:
+            dict: The job record.
+
+        Raises:
+            ValueError: If the context doesn't exist.
+            OverflowError: If too many jobs are already queued.
+        """
+        if ctx_id is not None and not self.workflow.context_exists(ctx_id):
+            raise ValueError(f"Context with id {ctx_id} not found.")
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise OverflowError(f"Too many queued jobs ({self.pending}).")
+
+        self.start()
+        job = {
+            "id": str(uuid4()),
+            "status": "queued",
+            "message": message,
+            "ctx_id": ctx_id,
+            "user": user,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "response": None,
+            "error": None,
+            "artifacts": {},
+            "events": [],
+        }
+        self.jobs[job["id"]] = job
+        self._publish(job, {"type": "status", "status": "queued"})
+        self.save(job)
+        self._queue.put_nowait(job["id"])
+        self.stats["submitted"] += 1
+        logger.info(f"Job queued: {job['id']}")
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Returns a job record, or None if there is no such job. Jobs run by other workers are read
+        from the store.
+        """
+        job = self.jobs.get(job_id)
+        return job if job is not None else self._stored(job_id)
+
+    def _stored(self, job_id: str) -> Optional[dict]:
+        try:
+            return self.store.read_job(job_id)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _hand_over(self, job_id: str):
+        """Forgets a job another worker runs; its subscribers here switch to following the stored record."""
+        self.jobs.pop(job_id, None)
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(None)
+
+    def _publish(self, job: dict, event: dict):
+        event = {"seq": len(job["events"]), "time": datetime.now().isoformat(), **event}
+        job["events"].append(event)
+        for queue in self._subscribers.get(job["id"], ()):
+            queue.put_nowait(event)
+
+    async def _persist(self, job: dict):
+        # Write a snapshot, so events published meanwhile don't change the record mid-write
+        await asyncio.to_thread(self.save, {**job, "events": list(job["events"])})
+
+    async def _set_status(self, job: dict, status: str, **fields):
+        job.update(status=status, **fields)
+        self._publish(job, {"type": "status", "status": status})
+        await self._persist(job)
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[dict]:
+        """
+        Yields a job's events: first those already recorded, then new ones as they happen,
+        until the job finishes.
+
+        Args:
+            job_id (str): The job ID.
+        """
+        if job_id not in self.jobs:
+            # Run by another worker; follow its persisted record instead
+            async for event in self._follow_stored(job_id):
+                yield event
+            return
+
+        job = self.jobs[job_id]
+        queue = asyncio.Queue()
+        # Register before replaying, so no event falls between the two
+        self._subscribers[job_id].append(queue)
+        try:
+            replayed = len(job["events"])
+            for event in job["events"][:replayed]:
+                yield event
+            if job["status"] in FINAL_STATUSES:
+                return
+            seen = replayed
+            while True:
+                event = await queue.get()
+                if event is None:
+                    # Another worker took the job over; follow its stored record from here
+                    async for event in self._follow_stored(job_id, seen=seen):
+                        yield event
+                    return
+                if event["seq"] < replayed:
+                    continue
+                yield event
+                seen = event["seq"] + 1
+                if event["type"] == "status" and event["status"] in FINAL_STATUSES:
+                    return
+        finally:
+            self._subscribers[job_id].remove(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    async def _follow_stored(self, job_id: str, seen: int = 0, poll_interval: float = 1.0) -> AsyncIterator[dict]:
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None:
+                return
+            for event in job["events"][seen:]:
+                yield event
+            seen = len(job["events"])
+            if job["status"] in FINAL_STATUSES:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue
+            try:
+                # Claim the job, so a worker resuming stored jobs doesn't run it too
+                async with self.store.lock(self._lock_name(job_id), timeout=0):
+                    stored = await asyncio.to_thread(self._stored, job_id)
+                    if stored is not None and stored["status"] != "queued":
+                        # Another worker resumed and ran it
+                        self._hand_over(job_id)
+                        continue
+                    await self._execute(job)
+            except ContextLocked:
+                # Another worker is running it
+                self._hand_over(job_id)
+                continue
+            except asyncio.CancelledError:
+                await self._set_status(
+                    job,
+                    "interrupted",
+                    error="The server stopped while the job was running.",
+                    finished_at=datetime.now().isoformat(),
+                )
+                raise
+            except Exception as e:
+                # E.g. the store couldn't be written; fail the job, but keep this worker serving the queue
+                logger.exception(f"Error running job {job_id}")
+                if job["status"] not in FINAL_STATUSES:
+                    job.update(status="failed", error=str(e), finished_at=datetime.now().isoformat())
+                    self._publish(job, {"type": "status", "status": "failed"})
+                    self.stats["failed"] += 1
+                try:
+                    await self._persist(job)
+                except Exception:
+                    # Kept in memory, so this worker can still report it
+                    logger.exception(f"Error storing job {job_id}")
+                    continue
+            if job["status"] in FINAL_STATUSES:
+                # Stored with its final status; from now on it is read from the store, like other workers' jobs
+                self.jobs.pop(job_id, None)
+
+    async def _execute(self, job: dict):
+        if self.admission is None:
+            admitted = contextlib.nullcontext()
+        else:
+            # A job takes a workflow slot like a chat request, queued as the user's own background work
+            admitted = self.admission.admit(f"job:{job.get('user') or 'anonymous'}", background=True)
+        async with admitted:
+            await self._run_job(job)
+
+    async def _run_job(self, job: dict):
+        await self._set_status(job, "running", started_at=datetime.now().isoformat())
+        self.stats["started"] += 1
+
+        last_persisted = time.monotonic()
+
+        async def on_event(event):
+            nonlocal last_persisted
+            summary = describe_event(event)
+            if summary is None:
+                return
+            self._publish(job, summary)
+            # Persist progress every few seconds, so it survives a restart
+            if time.monotonic() - last_persisted > self.persist_interval:
+                last_persisted = time.monotonic()
+                await self._persist(job)
+
+        try:
+            if job["ctx_id"] is not None:
+                lock = self.workflow.store.lock(job["ctx_id"])
+            else:
+                lock = contextlib.nullcontext()
+
+            # Hold the conversation's lock, so chat messages to it from any worker wait for the job
+            async with lock:
+                if job["ctx_id"] is not None:
+                    session = await self.workflow.load_session(job["ctx_id"])
+                else:
+                    session = Session()
+
+                response = await self.workflow.run(job["message"], session, on_event=on_event, persist=False)
+                # Store the conversation before reporting success, so its ID and artifacts are final
+                await self.workflow.update_stored_context(session)
+            state = await session.ctx.get("state", default={})
+
+            await self._set_status(
+                job,
+                "succeeded",
+                ctx_id=session.ctx_id,
+                response=response,
+                artifacts={field: state[field] for field in ARTIFACT_FIELDS if state.get(field)},
+                finished_at=datetime.now().isoformat(),
+            )
+            self.stats["succeeded"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Job failed: {job['id']}")
+            await self._set_status(job, "failed", error=str(e), finished_at=datetime.now().isoformat())
+            self.stats["failed"] += 1
+
+    def metrics(self) -> dict:
+        """Returns the job counters, and the number of jobs per status among those this worker holds in memory."""
+        return {**self.stats, "by_status": dict(Counter(job["status"] for job in self.jobs.values()))}
+
+def jobs_from_env(workflow, admission: Optional[AdmissionController] = None) -> JobManager:
+    """
+    Builds the job manager configured by the `JOBS_MAX_CONCURRENT` and `JOBS_MAX_PENDING` environment
+    variables. Job records are kept in the workflow's context store.
+    """
+    return JobManager(
+        workflow,
+        store=workflow.store,
+        admission=admission,
+        concurrency=int(os.getenv("JOBS_MAX_CONCURRENT", "2")),
+        max_pending=int(os.getenv("JOBS_MAX_PENDING", "50")),
+    )
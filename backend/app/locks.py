@@ -0,0 +1,123 @@
+import os
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+from .store import ContextLocked
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+POLICIES = ("queue", "reject", "cancel_previous")
+
+class ContextBusy(ContextLocked):
+    """Raised under the `reject` policy when the conversation already has a run in progress."""
+
+class RunSuperseded(Exception):
+    """Raised under the `cancel_previous` policy for a run cancelled (or skipped) in favour of a newer message."""
+
+class ContextRunGuard:
+    """Makes sure each conversation has at most one workflow run in progress in this worker.
+
+    A message arriving while its conversation is busy is handled by the guard's policy:
+
+    - `queue`: wait for the running message to finish, then run.
+    - `reject`: fail right away with `ContextBusy`.
+    - `cancel_previous`: cancel the running message (and any still waiting), then run. The
+      cancellation reaches the workflow handler, so the superseded run's LLM and tool calls stop.
+    """
+    def __init__(self, policy: str = "queue"):
+        """
+        Args:
+            policy (str): The default policy, one of `queue`, `reject` or `cancel_previous`.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.policy = policy
+        self.stats = Counter()
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._waiters = Counter()
+        self._running: dict[Hashable, asyncio.Task] = {}
+        self._generations = Counter()
+        self._superseded: set[asyncio.Task] = set()
+
+    def is_busy(self, key: Hashable) -> bool:
+        """Whether a conversation has a run in progress."""
+        return key in self._locks and self._locks[key].locked()
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]], policy: Optional[str] = None) -> T:
+        """
+        Runs `fn()` as the conversation's only run, applying the policy if it is busy.
+
+        Args:
+            key (Hashable): The conversation key.
+            fn (Callable[[], Awaitable[T]]): Starts the run.
+            policy (Optional[str]): Overrides the default policy for this message.
+
+        Returns:
+            T: The result of the run.
+
+        Raises:
+            ContextBusy: Under `reject`, if the conversation is busy.
+            RunSuperseded: Under `cancel_previous`, if a newer message cancelled this one.
+        """
+        policy = policy or self.policy
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        if lock.locked():
+            if policy == "reject":
+                self.stats["rejected"] += 1
+                raise ContextBusy(f"Conversation {key} already has a message in progress.")
+            if policy == "cancel_previous":
+                running = self._running.get(key)
+                if running is not None and not running.done():
+                    self._superseded.add(running)
+                    running.cancel()
+                    self.stats["cancelled"] += 1
+                    logger.info(f"Cancelled the run in progress on conversation {key} for a newer message.")
+            self.stats["queued"] += 1
+
+        self._generations[key] += 1
+        generation = self._generations[key]
+        self._waiters[key] += 1
+        try:
+            async with lock:
+                if policy == "cancel_previous" and self._generations[key] != generation:
+                    # A newer message arrived while this one waited; it wins
+                    self.stats["skipped"] += 1
+                    raise RunSuperseded("A newer message replaced this one.")
+
+                task = asyncio.create_task(fn())
+                self._running[key] = task
+                self.stats["runs"] += 1
+                try:
+                    # Cancelling the caller (e.g. on disconnect) cancels the run too
+                    return await task
+                except asyncio.CancelledError:
+                    if task in self._superseded:
+                        raise RunSuperseded("A newer message replaced this one.")
+                    raise
+                finally:
+                    self._superseded.discard(task)
+                    if self._running.get(key) is task:
+                        del self._running[key]
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                # Nobody else holds or waits for the lock; forget the conversation
+                del self._waiters[key]
+                self._locks.pop(key, None)
+                self._generations.pop(key, None)
+
+    def metrics(self) -> dict:
+        """Returns the policy, the guard counters, and the number of conversations with a run in progress."""
+        return {**self.stats, "policy": self.policy, "busy_contexts": len(self._running)}
+
+def run_guard_from_env() -> ContextRunGuard:
+    """Builds the guard with the policy set by the `CONTEXT_OVERLAP_POLICY` environment variable (default `queue`)."""
+    policy = os.getenv("CONTEXT_OVERLAP_POLICY", "queue")
+    if policy not in POLICIES:
+        logger.warning(f"Unknown context overlap policy '{policy}'. Falling back to 'queue'.")
+        policy = "queue"
+    return ContextRunGuard(policy)
@@ -0,0 +1,234 @@
+import os
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+from llama_index.core.workflow import Context
+from .search import tokenize, content_hash
+from .store import ContextStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def topic_terms(topic: str) -> set[str]:
+    """Normalizes a topic (or a brief key such as 'ai_chip_export_rules') into a set of search terms."""
+    return set(tokenize(topic.replace("_", " ")))
+
+class ResearchMemory:
+    """A persistent store of intel briefings shared across conversations, keyed by topic.
+
+    Briefs are recorded whenever a context is saved, with their creation and update times,
+    so a later conversation on the same topic can reuse a fresh brief instead of re-running
+    the research agents and the brief writer.
+
+    The briefs are kept as a shared document of the context store. Each worker holds a copy in
+    memory, picks up the briefs other workers have saved before every lookup, and merges its own
+    into the latest stored copy when it saves, so workers never overwrite each other's briefs.
+    """
+    def __init__(
+        self,
+        store: ContextStore,
+        name: str = "research_memory",
+        max_age_days: float = 7,
+        min_score: float = 0.5,
+    ):
+        """
+        Args:
+            store (ContextStore): The context store the briefs are shared through.
+            name (str): The name of the shared document.
+            max_age_days (float): Age after which a brief is reported as stale.
+            min_score (float): Minimum fraction of the looked up topic's terms a brief's topic must cover to match.
+        """
+        self.store = store
+        self.name = name
+        self.max_age_days = max_age_days
+        self.min_score = min_score
+        self.entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        # Serializes this worker's saves; the store's lock serializes them across workers
+        self._save_lock = threading.Lock()
+        # When the stored copy last merged into `entries` was saved
+        self._loaded_at: Optional[datetime] = None
+        self.refresh()
+
+    def refresh(self):
+        """Merges in the briefs other workers have saved since the stored copy was last read."""
+        try:
+            saved_at = self.store.shared_saved_at(self.name)
+            if saved_at is None or saved_at == self._loaded_at:
+                return
+            stored = self.store.read_shared(self.name)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error loading research memory, keeping the briefs in memory: {e}")
+            return
+
+        with self._lock:
+            for entry_id, entry in stored.items():
+                mine = self.entries.get(entry_id)
+                if mine is None or entry["updated_at"] > mine["updated_at"]:
+                    self.entries[entry_id] = {**entry, "reuses": max(entry["reuses"], mine["reuses"] if mine else 0)}
+                else:
+                    mine["reuses"] = max(mine["reuses"], entry["reuses"])
+            self._loaded_at = saved_at
+
+    def save(self):
+        """Persists the store, merged with the briefs other workers have saved."""
+        with self._save_lock, self.store.hold(f"shared:{self.name}"):
+            self.refresh()
+            with self._lock:
+                entries = dict(self.entries)
+            self.store.write_shared(self.name, entries)
+            self._loaded_at = self.store.shared_saved_at(self.name)
+
+    def record(self, topic: str, brief: str, ctx_id: Optional[str], recorded_at: Optional[datetime] = None) -> bool:
+        """
+        Records a brief under its topic, replacing an older brief on the same topic.
+
+        Args:
+            topic (str): The topic (or brief key) the brief covers.
+            brief (str): The intel brief.
+            ctx_id (Optional[str]): The context the brief was written in.
+            recorded_at (Optional[datetime]): When the brief was written. Defaults to now.
+
+        Returns:
+            bool: True if the store changed.
+        """
+        terms = topic_terms(topic)
+        if not terms:
+            return False
+        entry_id = " ".join(sorted(terms))
+        now = (recorded_at or datetime.now()).isoformat(timespec="seconds")
+        with self._lock:
+            entry = self.entries.get(entry_id)
+            if entry is not None and entry["hash"] == content_hash(brief):
+                return False
+            self.entries[entry_id] = {
+                "topic": topic,
+                "brief": brief,
+                "hash": content_hash(brief),
+                "ctx_id": ctx_id,
+                "created_at": entry["created_at"] if entry else now,
+                "updated_at": now,
+                "reuses": entry["reuses"] if entry else 0,
+            }
+        return True
+
+    def record_state(self, ctx_id: str, state: dict, recorded_at: Optional[datetime] = None) -> bool:
+        """
+        Records every intel briefing of a context's workflow state, using the brief keys as topics.
+
+        Args:
+            ctx_id (str): The context ID.
+            state (dict): The workflow state of the context.
+            recorded_at (Optional[datetime]): When the context was saved. Defaults to now.
+
+        Returns:
+            bool: True if the store changed.
+        """
+        changed = False
+        for key, brief in (state or {}).get("intel_briefing", {}).items():
+            changed = self.record(key, str(brief), ctx_id, recorded_at=recorded_at) or changed
+        return changed
+
+    def find(self, topic: str, max_age_days: Optional[float] = None, limit: int = 3) -> list[dict]:
+        """
+        Finds the briefs matching a topic.
+
+        Args:
+            topic (str): The topic to look up.
+            max_age_days (Optional[float]): Age after which a brief is reported as stale. Defaults to the store's setting.
+            limit (int): The maximum number of matches.
+
+        Returns:
+            list[dict]: The matches, best first, each with its score, age in days and a `fresh` flag.
+        """
+        terms = topic_terms(topic)
+        if not terms:
+            return []
+        self.refresh()
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        now = datetime.now()
+        matches = []
+        with self._lock:
+            for entry_id, entry in self.entries.items():
+                score = len(terms & set(entry_id.split())) / len(terms)
+                if score < self.min_score:
+                    continue
+                age_days = (now - datetime.fromisoformat(entry["updated_at"])).total_seconds() / 86400
+                matches.append({
+                    **entry,
+                    "id": entry_id,
+                    "score": round(score, 2),
+                    "age_days": round(age_days, 1),
+                    "fresh": age_days <= max_age_days,
+                })
+        matches.sort(key=lambda match: (match["score"], match["fresh"], match["updated_at"]), reverse=True)
+        return matches[:limit]
+
+    def lookup_research_memory(self, topic: str, max_age_days: Optional[float]) -> list[dict] | str:
+        """Looks up intel briefings written in earlier conversations on a topic.
+
+        Call this before delegating research. If a fresh brief is found, reuse it with
+        `ReuseResearchBriefTool` instead of researching the topic again.
+
+        Args:
+            topic (str): The topic to look up.
+            max_age_days (Optional[float]): Age in days after which a brief counts as stale (default 7).
+                                            Use a small value for fast-moving news topics.
+
+        Returns:
+            list[dict] | str: The matching briefs (topic, brief, updated_at, age_days, fresh), best first,
+                              or a message if none were found.
+        """
+        matches = self.find(topic, max_age_days=float(max_age_days) if max_age_days is not None else None)
+        if not matches:
+            return f"No briefs found in research memory for '{topic}'."
+        return [
+            {key: match[key] for key in ("topic", "brief", "updated_at", "age_days", "fresh")}
+            for match in matches
+        ]
+
+    async def reuse_research_brief(self, ctx: Context, topic: str, key: Optional[str]) -> str:
+        """Copies the best matching brief from research memory into the current context's intel briefings.
+
+        Downstream agents can then read it with `GetIntelBriefingTool`, exactly like a newly written brief.
+
+        Args:
+            ctx (Context): The context object.
+            topic (str): The topic to look up, as passed to `LookupResearchMemoryTool`.
+            key (Optional[str]): The key to store the brief under. Defaults to the brief's original key.
+
+        Returns:
+            str: Status message with the key the brief was stored under.
+        """
+        try:
+            matches = self.find(topic, limit=1)
+            if not matches:
+                return f"No briefs found in research memory for '{topic}'."
+            match = matches[0]
+            key = key or match["topic"]
+
+            state = await ctx.get("state")
+            if "intel_briefing" not in state:
+                state["intel_briefing"] = {}
+            state["intel_briefing"][key] = match["brief"]
+            await ctx.set("state", state)
+
+            with self._lock:
+                if match["id"] in self.entries:
+                    self.entries[match["id"]]["reuses"] += 1
+            await asyncio.to_thread(self.save)
+
+            result = f"Intel briefing reused from research memory, set under key: {key} (last updated {match['updated_at']})"
+            if not match["fresh"]:
+                result += f"\n\nThe brief is {match['age_days']} days old and may be out of date."
+            return result
+        except Exception as e:
+            return f"Error reusing intel briefing: {str(e)}"
+
+def research_memory_from_env(store: ContextStore) -> ResearchMemory:
+    """Builds the research memory, shared through the context store and configured by the `RESEARCH_MEMORY_MAX_AGE_DAYS` environment variable."""
+    return ResearchMemory(store, max_age_days=float(os.getenv("RESEARCH_MEMORY_MAX_AGE_DAYS", "7")))
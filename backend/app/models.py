@@ -1,7 +1,21 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class ChatRequest(BaseModel):
     message: str
+    # Send (null to start a conversation) to have any worker serve the message from the shared context store
+    ctx_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
-    response: str
\ No newline at end of file
+    response: str
+    ctx_id: Optional[str] = None
+
+class JobRequest(BaseModel):
+    message: str
+    ctx_id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    topics: list[str]
+    # Any of "brief", "blog" and "script"
+    content_types: list[str] = ["brief"]
+    instructions: Optional[str] = None
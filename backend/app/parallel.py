@@ -0,0 +1,171 @@
+import os
+import asyncio
+import logging
+import weakref
+from collections import Counter
+from typing import Optional, Union
+from llama_index.core.agent.workflow import AgentWorkflow, AgentOutput, ToolCall, ToolCallResult
+from llama_index.core.tools import ToolOutput
+from llama_index.core.workflow import Context, StopEvent, step
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upper bound on tool calls in flight per workflow; the effective limits are the per-step caps below
+MAX_TOOL_WORKERS = 32
+# Blogger writes (create, update, delete) are user-visible; keep their order as the agent issued them
+DEFAULT_AGENT_LIMITS = {"BlogAgent": 1}
+
+class ToolConcurrency:
+    """The parallelism caps for the tool calls an agent emits in one step, and their metrics."""
+    def __init__(self, default_limit: int = 4, agent_limits: Optional[dict[str, int]] = None):
+        """
+        Args:
+            default_limit (int): Maximum number of an agent's tool calls from one step that run at once.
+            agent_limits (Optional[dict[str, int]]): Per-agent overrides of `default_limit`.
+        """
+        self.default_limit = max(1, default_limit)
+        self.agent_limits = {agent: max(1, limit) for agent, limit in (agent_limits or {}).items()}
+        self.stats = Counter()
+
+    def limit(self, agent: str) -> int:
+        return min(self.agent_limits.get(agent, self.default_limit), MAX_TOOL_WORKERS)
+
+    def metrics(self) -> dict:
+        return {
+            "default_limit": self.default_limit,
+            "agent_limits": self.agent_limits,
+            "steps": self.stats["steps"],
+            "parallel_steps": self.stats["parallel_steps"],
+            "calls": self.stats["calls"],
+            "peak_in_flight": self.stats["peak_in_flight"],
+        }
+
+class _StepCalls:
+    """The tool calls of one agent step: the agent that made them, its cap, and the next result to release."""
+    def __init__(self, agent: str, limit: int):
+        self.agent = agent
+        self.semaphore = asyncio.Semaphore(limit)
+        self.released = asyncio.Condition()
+        self.next_position = 0
+        self.in_flight = 0
+
+class ParallelAgentWorkflow(AgentWorkflow):
+    """An agent workflow that runs the tool calls an agent emits in one step concurrently.
+
+    Up to the agent's cap run at once; their results are handed back to the agent in the order
+    the calls were made, whatever order they finish in, so the agent's memory (and the next
+    LLM call's prompt) doesn't depend on tool latencies. Every call of a step is attributed to the
+    agent that made it, even if one of them hands off to another agent.
+    """
+    def __init__(self, *args, concurrency: Optional[ToolConcurrency] = None, **kwargs):
+        """
+        Args:
+            concurrency (Optional[ToolConcurrency]): The parallelism caps; four calls at once per agent if None.
+            *args, **kwargs: Passed to `AgentWorkflow`.
+        """
+        super().__init__(*args, **kwargs)
+        self.concurrency = concurrency or ToolConcurrency()
+        # Workflow contexts are serialized, so the step's asyncio primitives are kept here, by context
+        self._step_calls: "weakref.WeakKeyDictionary[Context, _StepCalls]" = weakref.WeakKeyDictionary()
+
+    @step
+    async def parse_agent_output(self, ctx: Context, ev: AgentOutput) -> Union[StopEvent, ToolCall, None]:
+        if not ev.tool_calls:
+            return await super().parse_agent_output(ctx, ev)
+
+        agent = ev.current_agent_name
+        self._step_calls[ctx] = _StepCalls(agent, self.concurrency.limit(agent))
+        self.concurrency.stats["steps"] += 1
+        self.concurrency.stats["calls"] += len(ev.tool_calls)
+        if len(ev.tool_calls) > 1:
+            self.concurrency.stats["parallel_steps"] += 1
+
+        await ctx.set("num_tool_calls", len(ev.tool_calls))
+        for position, tool_call in enumerate(ev.tool_calls):
+            ctx.send_event(
+                ToolCall(
+                    tool_name=tool_call.tool_name,
+                    tool_kwargs=tool_call.tool_kwargs,
+                    tool_id=tool_call.tool_id,
+                    position=position,
+                )
+            )
+        return None
+
+    @step(num_workers=MAX_TOOL_WORKERS)
+    async def call_tool(self, ctx: Context, ev: ToolCall) -> Union[ToolCallResult, None]:
+        """Calls the tool, within the step's cap, and releases the result in call order."""
+        calls = self._step_calls.get(ctx)
+        position = ev.get("position")
+        if calls is None or position is None:
+            # A call that wasn't parsed by this workflow (e.g. sent by a resumed run); run it as is
+            calls, position = None, None
+        agent = calls.agent if calls is not None else await ctx.get("current_agent_name")
+
+        ctx.write_event_to_stream(ToolCall(tool_name=ev.tool_name, tool_kwargs=ev.tool_kwargs, tool_id=ev.tool_id))
+        if calls is None:
+            result_ev = await self._run_tool_call(ctx, agent, ev)
+            ctx.write_event_to_stream(result_ev)
+            return result_ev
+
+        async with calls.semaphore:
+            calls.in_flight += 1
+            self.concurrency.stats["peak_in_flight"] = max(self.concurrency.stats["peak_in_flight"], calls.in_flight)
+            try:
+                result_ev = await self._run_tool_call(ctx, agent, ev)
+            finally:
+                calls.in_flight -= 1
+
+        async with calls.released:
+            await calls.released.wait_for(lambda: calls.next_position == position)
+            # Sent here rather than returned, so no other call's result can overtake it
+            ctx.write_event_to_stream(result_ev)
+            ctx.send_event(result_ev)
+            calls.next_position += 1
+            calls.released.notify_all()
+        return None
+
+    async def _run_tool_call(self, ctx: Context, agent: str, ev: ToolCall) -> ToolCallResult:
+        tools = await self.get_tools(agent, ev.tool_name)
+        tool = next((tool for tool in tools if tool.metadata.name == ev.tool_name), None)
+        if tool is None:
+            result = ToolOutput(
+                content=f"Tool {ev.tool_name} not found. Please select a tool that is available.",
+                tool_name=ev.tool_name,
+                raw_input=ev.tool_kwargs,
+                raw_output=None,
+                is_error=True,
+            )
+        else:
+            result = await self._call_tool(ctx, tool, ev.tool_kwargs)
+        return ToolCallResult(
+            tool_name=ev.tool_name,
+            tool_kwargs=ev.tool_kwargs,
+            tool_id=ev.tool_id,
+            tool_output=result,
+            return_direct=tool.metadata.return_direct if tool else False,
+        )
+
+def tool_concurrency_from_env() -> ToolConcurrency:
+    """
+    Builds the tool call parallelism caps from the `TOOL_CONCURRENCY` (calls per agent step that
+    run at once, default 4) and `TOOL_CONCURRENCY_BY_AGENT` (per-agent overrides, e.g.
+    `NewsAgent=6,BlogAgent=1`; default `BlogAgent=1`) environment variables.
+    """
+    agent_limits = dict(DEFAULT_AGENT_LIMITS)
+    spec = os.getenv("TOOL_CONCURRENCY_BY_AGENT")
+    if spec is not None:
+        agent_limits = {}
+        for item in spec.split(","):
+            if not item.strip():
+                continue
+            try:
+                agent, limit = item.split("=")
+                agent_limits[agent.strip()] = int(limit)
+            except ValueError:
+                logger.warning(f"Ignoring invalid TOOL_CONCURRENCY_BY_AGENT entry '{item}'.")
+    return ToolConcurrency(
+        default_limit=int(os.getenv("TOOL_CONCURRENCY", "4")),
+        agent_limits=agent_limits,
+    )
@@ -0,0 +1,171 @@
+import os
+import re
+import asyncio
+import logging
+import threading
+from collections import Counter, defaultdict, deque
+from tools import arxiv, wikipedia, youtube
+from tools.cache import tool_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+YOUTUBE_URL_PATTERN = re.compile(
+    r"https?://(?:www\.|m\.)?(?:youtube\.com/(?:watch\?v=|shorts/|live/)|youtu\.be/)[\w-]+[^\s,;)>\]]*",
+    re.IGNORECASE,
+)
+WIKIPEDIA_TOPIC_PATTERNS = [
+    re.compile(r"\bwiki(?:pedia)?(?:\s+(?:page|article|entry))?\s+(?:on|about|for|of)\s+(?P<topic>[^.?!,;\n]+)", re.IGNORECASE),
+    re.compile(r"(?:look up|search for|search|about)\s+(?P<topic>[^.?!,;\n]+?)\s+(?:on|in)\s+wiki(?:pedia)?\b", re.IGNORECASE),
+]
+ARXIV_TOPIC_PATTERN = re.compile(
+    r"\b(?:arxiv|papers?|preprints?)\b[^.?!\n]*?\b(?:on|about|for|regarding)\s+(?P<topic>[^.?!,;\n]+)",
+    re.IGNORECASE,
+)
+RECENT_PATTERN = re.compile(r"\b(latest|recent|new|newest|this (week|month|year))\b", re.IGNORECASE)
+
+def predict_tool_calls(message: str) -> list[tuple[str, object, tuple]]:
+    """
+    Predicts the tool calls a specialist agent is likely to make for a user message.
+
+    Args:
+        message (str): The user message.
+
+    Returns:
+        list[tuple[str, object, tuple]]: (tool name, cached tool function, arguments), most certain first.
+    """
+    predictions = []
+    for link in dict.fromkeys(YOUTUBE_URL_PATTERN.findall(message)):
+        predictions.append(("youtube_transcript", youtube.load_transcript, (link,)))
+
+    if re.search(r"\bwiki(pedia)?\b", message, re.IGNORECASE):
+        for pattern in WIKIPEDIA_TOPIC_PATTERNS:
+            match = pattern.search(message)
+            if match:
+                # Agents read pages with `read_page` (`load_data`); `search_page` is only their fallback
+                predictions.append(("wikipedia_load_data", wikipedia.load_data, (match.group("topic").strip(), "en")))
+                break
+
+    if re.search(r"\barxiv\b", message, re.IGNORECASE):
+        match = ARXIV_TOPIC_PATTERN.search(message)
+        if match:
+            sort_by = "recent" if RECENT_PATTERN.search(message) else "relevance"
+            predictions.append(("arxiv_query", arxiv.arxiv_query, (match.group("topic").strip(), sort_by)))
+    return predictions
+
+class PrefetchGate:
+    """Decides, under a lock, whether a prefetch starts in its worker thread or is called off first.
+
+    A thread can't be interrupted once it runs the upstream call, so a prefetch called off before
+    a thread picks it up never starts, and one called off after that is abandoned to finish.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = False
+        self.closed = False
+
+    def enter(self) -> bool:
+        """Called in the worker thread; returns whether the prefetch may start."""
+        with self._lock:
+            if not self.closed:
+                self.started = True
+            return self.started
+
+    def close(self) -> bool:
+        """Calls the prefetch off; returns whether it had already started."""
+        with self._lock:
+            self.closed = True
+            return self.started
+
+class SpeculativePrefetcher:
+    """Warms the tool result cache with the tool calls a message will likely trigger, while the
+    agents are still planning.
+
+    At most `max_calls` prefetches run per message. A tool whose recent prefetches were mostly
+    never used by the agents is paused, capping the upstream calls wasted on bad guesses.
+    """
+    def __init__(self, max_calls: int = 3, min_hit_rate: float = 0.3, window: int = 20, min_samples: int = 5):
+        """
+        Args:
+            max_calls (int): Maximum number of prefetches per message.
+            min_hit_rate (float): A tool is paused while the share of its recent prefetches used by agents is below this.
+            window (int): Number of recent prefetches per tool the hit rate is computed over.
+            min_samples (int): Number of prefetches per tool before it can be paused.
+        """
+        self.max_calls = max_calls
+        self.min_hit_rate = min_hit_rate
+        self.min_samples = min_samples
+        self.stats = Counter()
+        self._outcomes = defaultdict(lambda: deque(maxlen=window))
+
+    def is_paused(self, tool: str) -> bool:
+        outcomes = self._outcomes[tool]
+        return len(outcomes) >= self.min_samples and sum(outcomes) / len(outcomes) < self.min_hit_rate
+
+    def start(self, message: str) -> list[tuple[str, tuple, asyncio.Task, PrefetchGate]]:
+        """
+        Starts prefetching for a user message.
+
+        Args:
+            message (str): The user message.
+
+        Returns:
+            list[tuple[str, tuple, asyncio.Task, PrefetchGate]]: The running prefetches, to pass to `finish`.
+        """
+        prefetches = []
+        for tool, fn, args in predict_tool_calls(message):
+            if len(prefetches) >= self.max_calls:
+                break
+            if self.is_paused(tool):
+                self.stats["skipped_paused"] += 1
+                continue
+            key = fn.cache_key(*args)
+            if tool_cache.is_unused_prefetch(key):
+                continue
+            gate = PrefetchGate()
+            task = asyncio.create_task(asyncio.to_thread(self._prefetch, fn, args, gate))
+            # Failed guesses are expected; they are counted as unused when the run finishes
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            prefetches.append((tool, key, task, gate))
+            self.stats["started"] += 1
+            logger.info(f"Prefetching {tool}{args}")
+        return prefetches
+
+    @staticmethod
+    def _prefetch(fn, args: tuple, gate: PrefetchGate):
+        # Runs in a worker thread, which may only pick the prefetch up after the run has finished
+        if gate.enter():
+            fn.prefetch(*args)
+
+    def finish(self, prefetches: list[tuple[str, tuple, asyncio.Task, PrefetchGate]]):
+        """
+        Settles the prefetches of a finished run: calls off those still pending and records which were used.
+
+        Prefetches that haven't started yet never start (`cancelled`). Those already running in a
+        worker thread can't be interrupted (`abandoned`): their upstream call completes and stays
+        cached for a follow-up call, but counts as spent.
+
+        Args:
+            prefetches (list[tuple[str, tuple, asyncio.Task, PrefetchGate]]): As returned by `start`.
+        """
+        for tool, key, task, gate in prefetches:
+            if not task.done():
+                started = gate.close()
+                task.cancel()
+                self.stats["abandoned" if started else "cancelled"] += 1
+            used = not tool_cache.is_unused_prefetch(key)
+            self._outcomes[tool].append(used)
+            self.stats["used" if used else "wasted"] += 1
+
+    def metrics(self) -> dict:
+        """Returns the prefetch counters, and the tools currently paused for a low hit rate."""
+        return {
+            **self.stats,
+            "paused_tools": [tool for tool in self._outcomes if self.is_paused(tool)],
+        }
+
+def prefetcher_from_env():
+    """Builds the prefetcher, unless `SPECULATIVE_PREFETCH` is set to `off`."""
+    if os.getenv("SPECULATIVE_PREFETCH", "on") == "off":
+        return None
+    return SpeculativePrefetcher(max_calls=int(os.getenv("SPECULATIVE_PREFETCH_MAX_CALLS", "3")))
@@ -0,0 +1,162 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import Optional
+from prompts import ROUTER_PROMPT
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MANAGER_AGENT = "ManagerAgent"
+
+# Clear-cut retrieval intents, each served end to end by a single specialist agent
+ROUTING_RULES = [
+    ("YoutubeAgent", re.compile(r"(youtube\.com/(watch|shorts|live)|youtu\.be/)", re.IGNORECASE)),
+    ("ArxivAgent", re.compile(r"\barxiv\b|\b(research|scientific|academic) papers?\b|\bpreprints?\b", re.IGNORECASE)),
+    ("WikipediaAgent", re.compile(r"\bwiki(pedia)?\b", re.IGNORECASE)),
+    ("NewsAgent", re.compile(r"\b(news|headlines?)\b", re.IGNORECASE)),
+    ("DuckDuckGoAgent", re.compile(r"\bduckduckgo\b|\b(search|look up) the web\b|\bweb search\b", re.IGNORECASE)),
+]
+
+# Requests that involve drafting, reviewing or publishing content always need the manager's orchestration
+ORCHESTRATION_PATTERN = re.compile(
+    r"\b(blog|posts?|publish|scripts?|video script|brief(ing)?s?|campaign|draft|write|review|update|delete)\b",
+    re.IGNORECASE,
+)
+AGENT_PATTERN = re.compile(r"<agent>\s*(\w+)\s*</agent>")
+
+# Short replies ("ok go ahead", "yes please", "no, stop") answer the manager; they never name a lookup
+CONFIRMATION_WORDS = {
+    "yes", "y", "yeah", "yep", "yup", "sure", "ok", "okay", "k", "alright", "go", "ahead", "proceed", "continue",
+    "do", "it", "that", "please", "sounds", "looks", "good", "great", "fine", "perfect", "right", "correct",
+    "confirm", "confirmed", "approve", "approved", "lgtm", "no", "nope", "nah", "not", "now", "cancel", "stop",
+    "thanks", "thank", "you",
+}
+# The previous AI message is waiting on the user: a question, or a request to confirm or choose
+AWAITING_REPLY_PATTERN = re.compile(
+    r"\?\s*$|\b(shall i|should i|would you like|do you want|want me to|let me know|please confirm|confirm)\b",
+    re.IGNORECASE,
+)
+
+def is_confirmation(message: str) -> bool:
+    """Whether a message is only a short confirmation or refusal."""
+    words = re.findall(r"[a-z]+", message.lower())
+    return 0 < len(words) <= 6 and all(word in CONFIRMATION_WORDS for word in words)
+
+def awaits_reply(last_response: Optional[str]) -> bool:
+    """Whether the previous AI message asked the user something, so the next message answers it."""
+    return bool(last_response) and AWAITING_REPLY_PATTERN.search(last_response.strip()[-300:]) is not None
+
+class FastPathRouter:
+    """Routes clear-cut requests straight to a specialist agent, skipping the ManagerAgent's routing hop.
+
+    Rules handle unambiguous cues (YouTube links, arXiv, Wikipedia, news, web search). When no rule
+    applies, an optional cheap classifier model decides; anything it isn't sure about goes to the manager.
+    """
+    def __init__(self, agents: list[str], classifier_llm=None, max_classifier_chars: int = 500):
+        """
+        Args:
+            agents (list[str]): The names of the agents that may be routed to.
+            classifier_llm: A cheap LLM used when no rule applies, or None to route with rules only.
+            max_classifier_chars (int): Longer messages skip the classifier; they are rarely single lookups.
+        """
+        self.agents = set(agents)
+        self.classifier_llm = classifier_llm
+        self.max_classifier_chars = max_classifier_chars
+        self.stats = Counter()
+        self.routes = Counter()
+
+    def match_rules(self, message: str, last_response: Optional[str] = None) -> Optional[str]:
+        """
+        Routes a message with the rules alone.
+
+        Args:
+            message (str): The user message.
+            last_response (Optional[str]): The previous AI message, if any.
+
+        Returns:
+            Optional[str]: The specialist agent, ManagerAgent if the request needs orchestration, is
+                           ambiguous or answers the previous AI message, or None if no rule applies.
+        """
+        if is_confirmation(message) or awaits_reply(last_response):
+            # The manager asked something (or is being answered); its conversation continues
+            return MANAGER_AGENT
+        if ORCHESTRATION_PATTERN.search(message):
+            return MANAGER_AGENT
+        matches = {agent for agent, pattern in ROUTING_RULES if pattern.search(message) and agent in self.agents}
+        if len(matches) > 1:
+            return MANAGER_AGENT
+        return matches.pop() if matches else None
+
+    async def classify(self, message: str, last_response: Optional[str]) -> str:
+        """
+        Routes a message with the classifier model.
+
+        Args:
+            message (str): The user message.
+            last_response (Optional[str]): The previous AI message, so replies to it stay with the manager.
+
+        Returns:
+            str: The agent to route to, ManagerAgent when in doubt.
+        """
+        try:
+            self.stats["classifier_calls"] += 1
+            response = await self.classifier_llm.acomplete(
+                prompt=ROUTER_PROMPT.format(
+                    agents="\n".join(f"- {agent}" for agent in sorted(self.agents - {MANAGER_AGENT})),
+                    last_response=(last_response or "(none)")[-1000:],
+                    message=message,
+                ),
+            )
+            match = AGENT_PATTERN.search(response.text)
+            agent = match.group(1) if match else MANAGER_AGENT
+            return agent if agent in self.agents else MANAGER_AGENT
+        except Exception as e:
+            logger.info(f"Error classifying message: {e}")
+            return MANAGER_AGENT
+
+    async def route(self, message: str, last_response: Optional[str] = None) -> str:
+        """
+        Picks the agent that should handle a user message.
+
+        Args:
+            message (str): The user message.
+            last_response (Optional[str]): The previous AI message, if any.
+
+        Returns:
+            str: The agent to start the run with.
+        """
+        self.stats["messages"] += 1
+        agent = self.match_rules(message, last_response)
+        source = "rules"
+        if agent is None:
+            if self.classifier_llm is not None and len(message) <= self.max_classifier_chars:
+                agent = await self.classify(message, last_response)
+                source = "classifier"
+            else:
+                agent = MANAGER_AGENT
+
+        self.routes[agent] += 1
+        if agent == MANAGER_AGENT:
+            self.stats["fallbacks"] += 1
+        else:
+            # Every direct dispatch saves the ManagerAgent's routing round trip
+            self.stats[f"{source}_routes"] += 1
+            self.stats["llm_hops_saved"] += 1
+            logger.info(f"Fast path ({source}): routing to {agent}")
+        return agent
+
+    def metrics(self) -> dict:
+        """Returns the routing counters, including the number of ManagerAgent LLM hops saved."""
+        return {**self.stats, "routes": dict(self.routes)}
+
+def router_from_env(agents: list[str], classifier_llm) -> Optional[FastPathRouter]:
+    """
+    Builds the router configured by the `FAST_PATH_ROUTER` environment variable:
+    `rules+classifier` (default), `rules`, or `off`.
+    """
+    mode = os.getenv("FAST_PATH_ROUTER", "rules+classifier")
+    if mode == "off":
+        return None
+    return FastPathRouter(agents, classifier_llm=classifier_llm if mode == "rules+classifier" else None)
@@ -0,0 +1,305 @@
+import os
+import re
+import math
+import hashlib
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Optional
+from .store import ContextStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Artifacts stored in the workflow state that are worth searching, with the field holding their text
+ARTIFACT_KINDS = {
+    "intel_briefing": None,
+    "scripts": None,
+    "blog_posts": "content_html",
+}
+DOCUMENT_KINDS = ["chat", *ARTIFACT_KINDS]
+
+TOKEN_PATTERN = re.compile(r"\w+")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "you", "your",
+}
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase search terms, dropping markup and stopwords."""
+    text = TAG_PATTERN.sub(" ", text)
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def extract_documents(ctx_id: str, chat_history: list[str], state: dict) -> dict[str, dict]:
+    """
+    Builds the searchable documents of a context.
+
+    Chat history is indexed one exchange (user message and AI reply) per document;
+    every stored intel briefing, script and blog post is a document of its own.
+
+    Args:
+        ctx_id (str): The context ID.
+        chat_history (list[str]): The chat history, alternating user and AI messages.
+        state (dict): The workflow state of the context.
+
+    Returns:
+        dict[str, dict]: The documents, keyed by document ID.
+    """
+    documents = {}
+    for i in range(0, len(chat_history or []), 2):
+        text = "\n".join(chat_history[i:i + 2])
+        documents[f"{ctx_id}:chat:{i // 2}"] = {"ctx_id": ctx_id, "kind": "chat", "key": str(i // 2), "text": text}
+
+    for kind, field in ARTIFACT_KINDS.items():
+        for key, value in (state or {}).get(kind, {}).items():
+            text = value.get(field, "") if field and isinstance(value, dict) else str(value)
+            documents[f"{ctx_id}:{kind}:{key}"] = {"ctx_id": ctx_id, "kind": kind, "key": key, "text": f"{key}\n{text}"}
+    return documents
+
+class SearchIndex:
+    """A local hybrid search index over saved conversations and their artifacts.
+
+    Lexical matching uses an in-memory BM25 inverted index. When `sentence-transformers` is
+    installed and an embedding model is configured, a dense vector index is kept alongside it
+    and both rankings are merged with reciprocal rank fusion.
+
+    The index is persisted as a shared document of the context store. Before every search, a
+    worker picks up the contexts other workers have indexed; when it saves, it writes the
+    contexts it (re)indexed itself over the latest stored copy and keeps everyone else's.
+    """
+    def __init__(
+        self,
+        store: ContextStore,
+        name: str = "search_index",
+        embed_model: Optional[str] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        """
+        Args:
+            store (ContextStore): The context store the index is shared through.
+            name (str): The name of the shared document.
+            embed_model (Optional[str]): The name of a local sentence-transformers model, or None for lexical search only.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 document length normalization.
+        """
+        self.store = store
+        self.name = name
+        self.k1 = k1
+        self.b = b
+        self.documents: dict[str, dict] = {}
+        self.postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self.total_length = 0
+        self.embedder = None
+        self.vectors: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # Serializes this worker's saves; the store's lock serializes them across workers
+        self._save_lock = threading.Lock()
+        # Contexts indexed or removed here since the last save, whose documents this worker owns
+        self._touched: set[str] = set()
+        # When the stored copy last merged into the index was saved
+        self._loaded_at: Optional[datetime] = None
+
+        if embed_model:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self.embedder = SentenceTransformer(embed_model)
+            except ImportError:
+                logger.warning("`sentence-transformers` is not installed. Search falls back to BM25 only.")
+            except Exception as e:
+                logger.warning(f"Error loading embedding model '{embed_model}': {e}. Search falls back to BM25 only.")
+        self.refresh()
+
+    def refresh(self):
+        """Merges in the contexts other workers have indexed since the stored copy was last read."""
+        try:
+            saved_at = self.store.shared_saved_at(self.name)
+            if saved_at is None or saved_at == self._loaded_at:
+                return
+            data = self.store.read_shared(self.name)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error loading search index, keeping the index in memory: {e}")
+            return
+
+        stored = data.get("documents", {})
+        with self._lock:
+            # Documents of the contexts indexed here since the last save are newer than the stored ones
+            changed = [
+                doc_id for doc_id, document in self.documents.items()
+                if document["ctx_id"] not in self._touched
+                and (doc_id not in stored or stored[doc_id]["hash"] != document["hash"])
+            ]
+            for doc_id in changed:
+                self._remove(doc_id)
+            for doc_id, document in stored.items():
+                if document["ctx_id"] not in self._touched and doc_id not in self.documents:
+                    self._add(doc_id, document)
+            if self.embedder is not None:
+                # Vectors are cheap to persist but tied to the model; they are rebuilt lazily on the next update otherwise
+                for doc_id, vector in data.get("vectors", {}).items():
+                    if doc_id in self.documents and self.documents[doc_id]["ctx_id"] not in self._touched:
+                        self.vectors[doc_id] = vector
+            self._loaded_at = saved_at
+
+    def save(self):
+        """Persists the index, merged with the contexts other workers have indexed."""
+        with self._save_lock, self.store.hold(f"shared:{self.name}"):
+            self.refresh()
+            with self._lock:
+                data = {"documents": dict(self.documents)}
+                if self.embedder is not None:
+                    data["vectors"] = dict(self.vectors)
+                touched = set(self._touched)
+            self.store.write_shared(self.name, data)
+            with self._lock:
+                # Contexts indexed again while writing stay this worker's until the next save
+                self._touched -= touched
+                self._loaded_at = self.store.shared_saved_at(self.name)
+
+    def _add(self, doc_id: str, document: dict):
+        terms = Counter(tokenize(document["text"]))
+        document = {**document, "hash": document.get("hash") or content_hash(document["text"]), "length": sum(terms.values())}
+        self.documents[doc_id] = document
+        self.total_length += document["length"]
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+
+    def _remove(self, doc_id: str):
+        document = self.documents.pop(doc_id)
+        self.total_length -= document["length"]
+        self.vectors.pop(doc_id, None)
+        for term in set(tokenize(document["text"])):
+            self.postings[term].pop(doc_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def index_context(self, ctx_id: str, chat_history: list[str], state: dict) -> int:
+        """
+        Incrementally (re)indexes a context. Only new or changed documents are tokenized and embedded.
+
+        Args:
+            ctx_id (str): The context ID.
+            chat_history (list[str]): The chat history of the context.
+            state (dict): The workflow state of the context.
+
+        Returns:
+            int: The number of documents added or updated.
+        """
+        documents = extract_documents(ctx_id, chat_history, state)
+        with self._lock:
+            stale = [
+                doc_id for doc_id, document in self.documents.items()
+                if document["ctx_id"] == ctx_id and (
+                    doc_id not in documents or document["hash"] != content_hash(documents[doc_id]["text"])
+                )
+            ]
+            for doc_id in stale:
+                self._remove(doc_id)
+            added = [doc_id for doc_id in documents if doc_id not in self.documents]
+            for doc_id in added:
+                self._add(doc_id, documents[doc_id])
+            if stale or added:
+                self._touched.add(ctx_id)
+
+        if self.embedder is not None and added:
+            vectors = self.embedder.encode([documents[doc_id]["text"] for doc_id in added], normalize_embeddings=True)
+            with self._lock:
+                for doc_id, vector in zip(added, vectors):
+                    if doc_id in self.documents:
+                        self.vectors[doc_id] = vector.tolist()
+        return len(added)
+
+    def remove_context(self, ctx_id: str):
+        """Removes every document of a context from the index."""
+        with self._lock:
+            for doc_id in [doc_id for doc_id, document in self.documents.items() if document["ctx_id"] == ctx_id]:
+                self._remove(doc_id)
+            self._touched.add(ctx_id)
+
+    def _bm25(self, query: str, candidates: set[str]) -> list[tuple[str, float]]:
+        n = len(self.documents)
+        avgdl = self.total_length / n if n else 0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term, {})
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                if doc_id not in candidates:
+                    continue
+                length = self.documents[doc_id]["length"]
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / (avgdl or 1)))
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def _dense(self, query: str, candidates: set[str]) -> list[tuple[str, float]]:
+        import numpy as np
+
+        doc_ids = [doc_id for doc_id in self.vectors if doc_id in candidates]
+        if not doc_ids:
+            return []
+        query_vector = self.embedder.encode([query], normalize_embeddings=True)[0]
+        scores = np.asarray([self.vectors[doc_id] for doc_id in doc_ids]) @ query_vector
+        return sorted(zip(doc_ids, scores.tolist()), key=lambda item: item[1], reverse=True)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        kinds: Optional[list[str]] = None,
+        exclude_ctx_id: Optional[str] = None,
+        rrf_k: int = 60,
+    ) -> list[dict]:
+        """
+        Searches the index.
+
+        Args:
+            query (str): The search query.
+            top_k (int): The maximum number of results.
+            kinds (Optional[list[str]]): Restrict results to these document kinds ('chat', 'intel_briefing', 'scripts', 'blog_posts').
+            exclude_ctx_id (Optional[str]): A context to leave out of the results, e.g. the current one.
+            rrf_k (int): The reciprocal rank fusion constant used to merge lexical and dense rankings.
+
+        Returns:
+            list[dict]: The matching documents (ctx_id, kind, key, text, score), best first.
+        """
+        self.refresh()
+        with self._lock:
+            candidates = {
+                doc_id for doc_id, document in self.documents.items()
+                if (not kinds or document["kind"] in kinds) and document["ctx_id"] != exclude_ctx_id
+            }
+            rankings = [self._bm25(query, candidates)]
+            if self.embedder is not None:
+                rankings.append(self._dense(query, candidates))
+
+            if len(rankings) == 1:
+                ranked = rankings[0]
+            else:
+                fused = defaultdict(float)
+                for ranking in rankings:
+                    for rank, (doc_id, _) in enumerate(ranking):
+                        fused[doc_id] += 1 / (rrf_k + rank + 1)
+                ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+            return [
+                {
+                    "ctx_id": self.documents[doc_id]["ctx_id"],
+                    "kind": self.documents[doc_id]["kind"],
+                    "key": self.documents[doc_id]["key"],
+                    "text": self.documents[doc_id]["text"],
+                    "score": round(score, 4),
+                }
+                for doc_id, score in ranked[:top_k]
+            ]
+
+def search_index_from_env(store: ContextStore) -> SearchIndex:
+    """Builds the search index, shared through the context store and configured by the `SEARCH_EMBED_MODEL` environment variable."""
+    return SearchIndex(store, embed_model=os.getenv("SEARCH_EMBED_MODEL") or None)
@@ -0,0 +1,651 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Any, Optional
+from uuid import uuid4
+from filelock import FileLock
+from .codec import BINARY_EXTENSION, JSON_EXTENSION, Codec, decode, find_document, read_document, write_document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ContextLocked(TimeoutError):
+    """Raised when a conversation's lock isn't released before the caller's timeout."""
+
+class ContextStore:
+    """Stores conversations (their workflow context, chat history and title), background job
+    records, and shared documents such as the search index, where every worker can see them.
+
+    Any worker can then serve any message of any conversation, without sticky routing: it loads
+    the conversation under the conversation's lock, runs the message, and stores the result before
+    releasing the lock. Locks are leases that are renewed while held, so a crashed worker's
+    locks expire on their own.
+
+    Subclasses implement the storage and the three lock primitives.
+    """
+    def __init__(self, codec: Optional[Codec] = None, lock_ttl: float = 30, poll_interval: float = 0.1):
+        """
+        Args:
+            codec (Optional[Codec]): The codec documents are encoded with. Defaults to plain JSON.
+            lock_ttl (float): Seconds a lock lease lasts unless renewed.
+            poll_interval (float): Seconds between attempts to take a held lock.
+        """
+        self.codec = codec or Codec("json")
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+
+    def load_index(self) -> dict[str, Optional[str]]:
+        """Returns the ID and title (None while untitled) of every stored conversation."""
+        raise NotImplementedError
+
+    def register(self, ctx_id: str):
+        """Adds a conversation to the index, untitled, unless it is already there."""
+        raise NotImplementedError
+
+    def set_title(self, ctx_id: str, title: str):
+        """Sets the title of a conversation."""
+        raise NotImplementedError
+
+    def exists(self, ctx_id: str) -> bool:
+        """Whether a conversation is stored."""
+        return ctx_id in self.load_index()
+
+    def read(self, ctx_id: str, name: str) -> Any:
+        """
+        Reads one document (`ctx` or `chat_history`) of a conversation.
+
+        Raises:
+            FileNotFoundError: If the document doesn't exist.
+        """
+        raise NotImplementedError
+
+    def write(self, ctx_id: str, documents: dict[str, Any]):
+        """Writes documents of a conversation, by name."""
+        raise NotImplementedError
+
+    def saved_at(self, ctx_id: str) -> Optional[datetime]:
+        """Returns when a conversation was last written, if known."""
+        raise NotImplementedError
+
+    def read_job(self, job_id: str) -> dict:
+        """
+        Reads a background job's record.
+
+        Raises:
+            FileNotFoundError: If there is no such job.
+        """
+        raise NotImplementedError
+
+    def write_job(self, job: dict):
+        """Writes a background job's record, under its `id`."""
+        raise NotImplementedError
+
+    def job_ids(self) -> list[str]:
+        """Returns the IDs of every stored job."""
+        raise NotImplementedError
+
+    def read_shared(self, name: str) -> Any:
+        """
+        Reads a document shared by every worker, such as the search index or the research memory.
+
+        Raises:
+            FileNotFoundError: If the document doesn't exist.
+        """
+        raise NotImplementedError
+
+    def write_shared(self, name: str, obj: Any):
+        """Writes a shared document; see `hold` to merge changes into it safely."""
+        raise NotImplementedError
+
+    def shared_saved_at(self, name: str) -> Optional[datetime]:
+        """Returns when a shared document was last written, if it exists."""
+        raise NotImplementedError
+
+    def _try_lock(self, name: str, token: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def _renew_lock(self, name: str, token: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def _unlock(self, name: str, token: str):
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def lock(self, ctx_id: str, timeout: Optional[float] = None):
+        """
+        Holds a conversation's lock, across all workers sharing the store, for the duration of the block.
+
+        Args:
+            ctx_id (str): The conversation ID.
+            timeout (Optional[float]): Seconds to wait for the lock. Defaults to waiting indefinitely.
+
+        Raises:
+            ContextLocked: If the lock isn't released in time.
+        """
+        name, token = f"ctx:{ctx_id}", str(uuid4())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not await asyncio.to_thread(self._try_lock, name, token, self.lock_ttl):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ContextLocked(f"Conversation {ctx_id} is busy.")
+            await asyncio.sleep(self.poll_interval)
+
+        async def renew():
+            while True:
+                await asyncio.sleep(self.lock_ttl / 3)
+                if not await asyncio.to_thread(self._renew_lock, name, token, self.lock_ttl):
+                    logger.warning(f"Lost the lock of conversation {ctx_id}.")
+                    return
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            await asyncio.to_thread(self._unlock, name, token)
+
+    @contextmanager
+    def hold(self, name: str):
+        """
+        Holds a named lock, across all workers sharing the store, for a short blocking section such as
+        a read-merge-write of a shared document. The lease isn't renewed, so the section must finish
+        well within `lock_ttl`.
+
+        Args:
+            name (str): The lock name.
+        """
+        token = str(uuid4())
+        while not self._try_lock(name, token, self.lock_ttl):
+            time.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            self._unlock(name, token)
+
+class FileContextStore(ContextStore):
+    """Stores conversations in the `contexts` directory, as before. Workers share it through a common volume.
+
+    Locks are lock files holding a token and an expiry time, so they work across processes and hosts.
+    They are only created, broken, renewed or released under a guard (an OS file lock on `locks/.guard`),
+    so two workers never both see a lock as free.
+    """
+    def __init__(self, root: str = "./contexts", **kwargs):
+        """
+        Args:
+            root (str): The directory conversations are stored in.
+            **kwargs: See `ContextStore`.
+        """
+        super().__init__(**kwargs)
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.jobs_root = os.path.join(root, "jobs")
+        self.guard_path = os.path.join(root, "locks", ".guard")
+        os.makedirs(os.path.join(root, "locks"), exist_ok=True)
+
+    def load_index(self) -> dict[str, Optional[str]]:
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.error("Error decoding JSON from contexts index file. Treating it as empty.")
+            return {}
+
+    def _update_index(self, ctx_id: str, title: Optional[str], overwrite: bool):
+        with self.hold("index"):
+            index = self.load_index()
+            if not overwrite and ctx_id in index:
+                return
+            index[ctx_id] = title
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def register(self, ctx_id: str):
+        self._update_index(ctx_id, None, overwrite=False)
+
+    def set_title(self, ctx_id: str, title: str):
+        self._update_index(ctx_id, title, overwrite=True)
+
+    def read(self, ctx_id: str, name: str) -> Any:
+        return read_document(os.path.join(self.root, ctx_id, name))
+
+    def write(self, ctx_id: str, documents: dict[str, Any]):
+        context_dir = os.path.join(self.root, ctx_id)
+        os.makedirs(context_dir, exist_ok=True)
+        for name, obj in documents.items():
+            write_document(os.path.join(context_dir, name), obj, self.codec)
+
+    def saved_at(self, ctx_id: str) -> Optional[datetime]:
+        path = find_document(os.path.join(self.root, ctx_id, "ctx"))
+        return datetime.fromtimestamp(os.path.getmtime(path)) if path else None
+
+    def read_job(self, job_id: str) -> dict:
+        if "/" in job_id or os.sep in job_id:
+            raise FileNotFoundError(f"No job {job_id}")
+        return read_document(os.path.join(self.jobs_root, job_id))
+
+    def write_job(self, job: dict):
+        os.makedirs(self.jobs_root, exist_ok=True)
+        write_document(os.path.join(self.jobs_root, job["id"]), job, self.codec)
+
+    def job_ids(self) -> list[str]:
+        if not os.path.isdir(self.jobs_root):
+            return []
+        return sorted({
+            os.path.splitext(name)[0]
+            for name in os.listdir(self.jobs_root)
+            if name.endswith((JSON_EXTENSION, BINARY_EXTENSION))
+        })
+
+    def read_shared(self, name: str) -> Any:
+        return read_document(os.path.join(self.root, name))
+
+    def write_shared(self, name: str, obj: Any):
+        write_document(os.path.join(self.root, name), obj, self.codec)
+
+    def shared_saved_at(self, name: str) -> Optional[datetime]:
+        path = find_document(os.path.join(self.root, name))
+        return datetime.fromtimestamp(os.path.getmtime(path)) if path else None
+
+    def _lock_path(self, name: str) -> str:
+        return os.path.join(self.root, "locks", name.replace(":", "_") + ".lock")
+
+    def _read_lock(self, path: str) -> tuple[Optional[str], float]:
+        try:
+            with open(path, "r") as f:
+                token, expires_at = f.read().split()
+            return token, float(expires_at)
+        except FileNotFoundError:
+            return None, 0.0
+        except (OSError, ValueError):
+            # Lock files are linked or moved into place whole, so this is a leftover of an older
+            # version; it counts as held until a lease from its last change would have run out
+            try:
+                return "", os.path.getmtime(path) + self.lock_ttl
+            except FileNotFoundError:
+                return None, 0.0
+
+    def _write_lock(self, path: str, token: str, ttl: float) -> str:
+        # A fully written copy, linked or moved into place, so the lock file is never seen half-written
+        tmp_path = f"{path}.{token}"
+        with open(tmp_path, "w") as f:
+            f.write(f"{token} {time.time() + ttl}")
+        return tmp_path
+
+    def _try_lock(self, name: str, token: str, ttl: float) -> bool:
+        path = self._lock_path(name)
+        tmp_path = self._write_lock(path, token, ttl)
+        try:
+            # Breaking, renewing and releasing locks all happen under the guard, so the expired lease
+            # read here is still the one removed, not a lock another worker has just taken
+            with FileLock(self.guard_path):
+                held_by, expires_at = self._read_lock(path)
+                if held_by is not None:
+                    if expires_at > time.time():
+                        return False
+                    logger.warning(f"Breaking the expired lock {name}.")
+                    os.remove(path)
+                try:
+                    os.link(tmp_path, path)
+                except FileExistsError:
+                    return False
+                return True
+        finally:
+            os.remove(tmp_path)
+
+    def _renew_lock(self, name: str, token: str, ttl: float) -> bool:
+        path = self._lock_path(name)
+        with FileLock(self.guard_path):
+            if self._read_lock(path)[0] != token:
+                return False
+            os.replace(self._write_lock(path, token, ttl), path)
+            return True
+
+    def _unlock(self, name: str, token: str):
+        path = self._lock_path(name)
+        with FileLock(self.guard_path):
+            if self._read_lock(path)[0] == token:
+                os.remove(path)
+
+class SQLiteContextStore(ContextStore):
+    """Stores conversations in a single SQLite database, shared by the workers on one host."""
+    def __init__(self, path: str = "./contexts/contexts.db", **kwargs):
+        """
+        Args:
+            path (str): The database file.
+            **kwargs: See `ContextStore`.
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS contexts (ctx_id TEXT PRIMARY KEY, title TEXT);
+                CREATE TABLE IF NOT EXISTS documents (
+                    ctx_id TEXT, name TEXT, data BLOB, saved_at REAL, PRIMARY KEY (ctx_id, name)
+                );
+                CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, token TEXT, expires_at REAL);
+                CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, data BLOB);
+                CREATE TABLE IF NOT EXISTS shared (name TEXT PRIMARY KEY, data BLOB, saved_at REAL);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        # A connection per operation, so the store can be used from any thread
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def load_index(self) -> dict[str, Optional[str]]:
+        with self._connect() as db:
+            return dict(db.execute("SELECT ctx_id, title FROM contexts"))
+
+    def register(self, ctx_id: str):
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO contexts (ctx_id, title) VALUES (?, NULL)", (ctx_id,))
+
+    def set_title(self, ctx_id: str, title: str):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO contexts (ctx_id, title) VALUES (?, ?)", (ctx_id, title))
+
+    def exists(self, ctx_id: str) -> bool:
+        with self._connect() as db:
+            return db.execute("SELECT 1 FROM contexts WHERE ctx_id = ?", (ctx_id,)).fetchone() is not None
+
+    def read(self, ctx_id: str, name: str) -> Any:
+        with self._connect() as db:
+            row = db.execute("SELECT data FROM documents WHERE ctx_id = ? AND name = ?", (ctx_id, name)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No document {name} stored for context {ctx_id}")
+        return decode(row[0])
+
+    def write(self, ctx_id: str, documents: dict[str, Any]):
+        rows = [(ctx_id, name, self.codec.encode(obj), time.time()) for name, obj in documents.items()]
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany("INSERT OR REPLACE INTO documents (ctx_id, name, data, saved_at) VALUES (?, ?, ?, ?)", rows)
+            db.execute("COMMIT")
+
+    def saved_at(self, ctx_id: str) -> Optional[datetime]:
+        with self._connect() as db:
+            row = db.execute("SELECT MAX(saved_at) FROM documents WHERE ctx_id = ?", (ctx_id,)).fetchone()
+        return datetime.fromtimestamp(row[0]) if row and row[0] else None
+
+    def read_job(self, job_id: str) -> dict:
+        with self._connect() as db:
+            row = db.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No job {job_id}")
+        return decode(row[0])
+
+    def write_job(self, job: dict):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO jobs (job_id, data) VALUES (?, ?)", (job["id"], self.codec.encode(job)))
+
+    def job_ids(self) -> list[str]:
+        with self._connect() as db:
+            return [row[0] for row in db.execute("SELECT job_id FROM jobs ORDER BY job_id")]
+
+    def read_shared(self, name: str) -> Any:
+        with self._connect() as db:
+            row = db.execute("SELECT data FROM shared WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No shared document {name}")
+        return decode(row[0])
+
+    def write_shared(self, name: str, obj: Any):
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO shared (name, data, saved_at) VALUES (?, ?, ?)",
+                (name, self.codec.encode(obj), time.time()),
+            )
+
+    def shared_saved_at(self, name: str) -> Optional[datetime]:
+        with self._connect() as db:
+            row = db.execute("SELECT saved_at FROM shared WHERE name = ?", (name,)).fetchone()
+        return datetime.fromtimestamp(row[0]) if row else None
+
+    def _try_lock(self, name: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM locks WHERE name = ? AND expires_at < ?", (name, now))
+            acquired = db.execute(
+                "INSERT OR IGNORE INTO locks (name, token, expires_at) VALUES (?, ?, ?)", (name, token, now + ttl)
+            ).rowcount == 1
+            db.execute("COMMIT")
+        return acquired
+
+    def _renew_lock(self, name: str, token: str, ttl: float) -> bool:
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE locks SET expires_at = ? WHERE name = ? AND token = ?", (time.time() + ttl, name, token)
+            ).rowcount == 1
+
+    def _unlock(self, name: str, token: str):
+        with self._connect() as db:
+            db.execute("DELETE FROM locks WHERE name = ? AND token = ?", (name, token))
+
+class RedisContextStore(ContextStore):
+    """Stores conversations in Redis (or any server speaking its protocol), shared by workers on any host.
+
+    Only basic string, hash and transaction commands are used, so an in-process stand-in such as
+    `fakeredis.FakeRedis()` can be passed as the client for local testing.
+    """
+    def __init__(self, client, prefix: str = "acc:", **kwargs):
+        """
+        Args:
+            client: A synchronous `redis.Redis` client, or a compatible stand-in.
+            prefix (str): Prefix of every key written.
+            **kwargs: See `ContextStore`.
+        """
+        super().__init__(**kwargs)
+        self.client = client
+        self.prefix = prefix
+        self.index_key = f"{prefix}contexts"
+        self.saved_at_key = f"{prefix}saved_at"
+        self.jobs_key = f"{prefix}jobs"
+        self.shared_saved_at_key = f"{prefix}shared_saved_at"
+
+    def _key(self, *parts: str) -> str:
+        return self.prefix + ":".join(parts)
+
+    @staticmethod
+    def _str(value) -> Optional[str]:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def load_index(self) -> dict[str, Optional[str]]:
+        # Untitled conversations are stored with an empty title
+        return {
+            self._str(ctx_id): self._str(title) or None
+            for ctx_id, title in self.client.hgetall(self.index_key).items()
+        }
+
+    def register(self, ctx_id: str):
+        self.client.hsetnx(self.index_key, ctx_id, "")
+
+    def set_title(self, ctx_id: str, title: str):
+        self.client.hset(self.index_key, ctx_id, title)
+
+    def exists(self, ctx_id: str) -> bool:
+        return bool(self.client.hexists(self.index_key, ctx_id))
+
+    def read(self, ctx_id: str, name: str) -> Any:
+        data = self.client.get(self._key("ctx", ctx_id, name))
+        if data is None:
+            raise FileNotFoundError(f"No document {name} stored for context {ctx_id}")
+        return decode(data)
+
+    def write(self, ctx_id: str, documents: dict[str, Any]):
+        pipeline = self.client.pipeline(transaction=True)
+        for name, obj in documents.items():
+            pipeline.set(self._key("ctx", ctx_id, name), self.codec.encode(obj))
+        pipeline.hset(self.saved_at_key, ctx_id, str(time.time()))
+        pipeline.execute()
+
+    def saved_at(self, ctx_id: str) -> Optional[datetime]:
+        value = self.client.hget(self.saved_at_key, ctx_id)
+        return datetime.fromtimestamp(float(value)) if value else None
+
+    def read_job(self, job_id: str) -> dict:
+        data = self.client.hget(self.jobs_key, job_id)
+        if data is None:
+            raise FileNotFoundError(f"No job {job_id}")
+        return decode(data)
+
+    def write_job(self, job: dict):
+        self.client.hset(self.jobs_key, job["id"], self.codec.encode(job))
+
+    def job_ids(self) -> list[str]:
+        return sorted(self._str(job_id) for job_id in self.client.hkeys(self.jobs_key))
+
+    def read_shared(self, name: str) -> Any:
+        data = self.client.get(self._key("shared", name))
+        if data is None:
+            raise FileNotFoundError(f"No shared document {name}")
+        return decode(data)
+
+    def write_shared(self, name: str, obj: Any):
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.set(self._key("shared", name), self.codec.encode(obj))
+        pipeline.hset(self.shared_saved_at_key, name, str(time.time()))
+        pipeline.execute()
+
+    def shared_saved_at(self, name: str) -> Optional[datetime]:
+        value = self.client.hget(self.shared_saved_at_key, name)
+        return datetime.fromtimestamp(float(value)) if value else None
+
+    def _try_lock(self, name: str, token: str, ttl: float) -> bool:
+        return bool(self.client.set(self._key("lock", name), token, nx=True, px=int(ttl * 1000)))
+
+    def _compare_and(self, name: str, token: str, action) -> bool:
+        # Check-and-act in a WATCH transaction, so a lock taken over by another worker is left alone
+        key = self._key("lock", name)
+        with self.client.pipeline() as pipeline:
+            try:
+                pipeline.watch(key)
+                if self._str(pipeline.get(key)) != token:
+                    pipeline.unwatch()
+                    return False
+                pipeline.multi()
+                action(pipeline, key)
+                pipeline.execute()
+                return True
+            except Exception as e:
+                logger.warning(f"Error updating lock {name}: {e}")
+                return False
+
+    def _renew_lock(self, name: str, token: str, ttl: float) -> bool:
+        return self._compare_and(name, token, lambda pipeline, key: pipeline.pexpire(key, int(ttl * 1000)))
+
+    def _unlock(self, name: str, token: str):
+        self._compare_and(name, token, lambda pipeline, key: pipeline.delete(key))
+
+class SessionCache:
+    """Keeps the documents of recently used conversations in memory, in front of a context store.
+
+    A cached conversation is only served while the store's copy hasn't been written since (by
+    this worker or another), so the cache never hides newer messages. Documents are kept encoded
+    with the store's codec, so every load gets its own copy and large contexts stay compact.
+    """
+    def __init__(self, store: ContextStore, max_entries: int = 32):
+        """
+        Args:
+            store (ContextStore): The context store.
+            max_entries (int): Maximum number of cached conversations; the least recently used are evicted.
+        """
+        self.store = store
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._entries: OrderedDict[str, tuple[Optional[datetime], bytes, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, ctx_id: str) -> tuple[dict, list[str]]:
+        """
+        Reads a conversation's context and chat history, from the cache if it is current.
+
+        Raises:
+            FileNotFoundError: If the conversation isn't stored.
+        """
+        saved_at = self.store.saved_at(ctx_id)
+        with self._lock:
+            entry = self._entries.get(ctx_id)
+            if entry is not None and saved_at is not None and entry[0] == saved_at:
+                self._entries.move_to_end(ctx_id)
+                self.stats["hits"] += 1
+                return decode(entry[1]), decode(entry[2])
+        self.stats["misses"] += 1
+        context = self.store.read(ctx_id, "ctx")
+        chat_history = self.store.read(ctx_id, "chat_history")
+        self._put(ctx_id, saved_at, context, chat_history)
+        return context, chat_history
+
+    def written(self, ctx_id: str, context: dict, chat_history: list[str]):
+        """Caches a conversation just written to the store."""
+        self._put(ctx_id, self.store.saved_at(ctx_id), context, chat_history)
+
+    def preload(self, ctx_ids: list[str]) -> int:
+        """
+        Loads conversations into the cache, e.g. the most recently active ones while warming up.
+
+        Returns:
+            int: The number of conversations loaded.
+        """
+        loaded = 0
+        for ctx_id in ctx_ids[:self.max_entries]:
+            try:
+                self.read(ctx_id)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Could not preload context {ctx_id}: {e}")
+        return loaded
+
+    def recent(self, limit: int) -> list[str]:
+        """Returns the IDs of the `limit` most recently saved conversations."""
+        saved = [(self.store.saved_at(ctx_id), ctx_id) for ctx_id in self.store.load_index()]
+        return [ctx_id for saved_at, ctx_id in sorted((item for item in saved if item[0]), reverse=True)[:limit]]
+
+    def _put(self, ctx_id: str, saved_at: Optional[datetime], context: dict, chat_history: list[str]):
+        if saved_at is None or not self.max_entries:
+            return
+        entry = (saved_at, self.store.codec.encode(context), self.store.codec.encode(chat_history))
+        with self._lock:
+            self._entries[ctx_id] = entry
+            self._entries.move_to_end(ctx_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def metrics(self) -> dict:
+        """Returns the hit and miss counters and the number of cached conversations."""
+        return {**self.stats, "entries": len(self._entries)}
+
+def store_from_env(codec: Optional[Codec] = None) -> ContextStore:
+    """
+    Builds the context store configured by the `CONTEXT_STORE` environment variable:
+    `file` (default, the `contexts` directory), `sqlite:///<path>`, or a `redis://` / `rediss://` URL.
+    """
+    spec = os.getenv("CONTEXT_STORE", "file")
+    if spec.startswith("sqlite:///"):
+        return SQLiteContextStore(spec[len("sqlite:///"):], codec=codec)
+    if spec.startswith(("redis://", "rediss://")):
+        import redis
+        return RedisContextStore(redis.Redis.from_url(spec), codec=codec)
+    if spec != "file":
+        logger.warning(f"Unknown context store '{spec}'. Falling back to the contexts directory.")
+    return FileContextStore(codec=codec)
+
+def session_cache_from_env(store: ContextStore) -> SessionCache:
+    """Builds the session cache, holding up to `SESSION_CACHE_SIZE` (default 32; 0 disables it) conversations."""
+    return SessionCache(store, max_entries=int(os.getenv("SESSION_CACHE_SIZE", "32")))
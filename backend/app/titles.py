@@ -0,0 +1,148 @@
+import re
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+from prompts import TITLE_GEN_PROMPT
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TITLE_PATTERN = re.compile(r'<title id="([^"]+)">(.*?)</title>', re.DOTALL)
+
+def truncate_chat(
+    chat: list[str],
+    head_messages: int = 2,
+    tail_messages: int = 2,
+    max_message_chars: int = 500,
+) -> str:
+    """
+    Formats a chat history for the title prompt, keeping only a head/tail window.
+
+    Args:
+        chat (list[str]): The chat history, alternating user and AI messages.
+        head_messages (int): Number of messages to keep from the start of the chat.
+        tail_messages (int): Number of messages to keep from the end of the chat.
+        max_message_chars (int): Maximum number of characters kept per message.
+
+    Returns:
+        str: The formatted chat, with omitted messages marked by a "..." line.
+    """
+    indexed = list(enumerate(chat))
+    if len(indexed) > head_messages + tail_messages:
+        indexed = indexed[:head_messages] + [(None, "...")] + indexed[len(indexed) - tail_messages:]
+
+    lines = []
+    for i, message in indexed:
+        if i is None:
+            lines.append(message)
+            continue
+        if len(message) > max_message_chars:
+            message = message[:max_message_chars] + "..."
+        lines.append(f"User: {message}" if i % 2 == 0 else f"AI: {message}")
+    return "\n".join(lines)
+
+class TitleGenerator:
+    """Generates context titles in the background, batching pending contexts into one LLM request.
+
+    Each context is titled at most once per process. Submitting a context that is
+    already waiting only refreshes its chat snapshot, so the title is generated from
+    the latest messages available when the batch is sent.
+    """
+    def __init__(
+        self,
+        llm,
+        on_title: Callable[[str, Optional[str]], Awaitable[None]],
+        batch_size: int = 8,
+        batch_delay: float = 2.0,
+        head_messages: int = 2,
+        tail_messages: int = 2,
+        max_message_chars: int = 500,
+    ):
+        """
+        Args:
+            llm: The (cheap) LLM used to generate titles.
+            on_title: Coroutine called with the context ID and its title (None if no title was produced).
+            batch_size (int): Maximum number of contexts titled in a single LLM request.
+            batch_delay (float): Seconds to wait for more contexts before sending a batch.
+            head_messages (int): Number of leading messages sent per chat.
+            tail_messages (int): Number of trailing messages sent per chat.
+            max_message_chars (int): Maximum number of characters sent per message.
+        """
+        self.llm = llm
+        self.on_title = on_title
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.head_messages = head_messages
+        self.tail_messages = tail_messages
+        self.max_message_chars = max_message_chars
+        self._pending: dict[str, list[str]] = {}
+        self._attempted: set[str] = set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, ctx_id: str, chat: list[str]) -> None:
+        """
+        Queues a context for title generation, unless it has already been titled.
+
+        Args:
+            ctx_id (str): The context ID.
+            chat (list[str]): The chat history of the context.
+        """
+        if ctx_id in self._attempted or not chat:
+            return
+        self._pending[ctx_id] = list(chat)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Drains the pending queue, one batch per LLM request."""
+        while self._pending:
+            await asyncio.sleep(self.batch_delay)
+            batch = dict(list(self._pending.items())[:self.batch_size])
+            for ctx_id in batch:
+                del self._pending[ctx_id]
+                self._attempted.add(ctx_id)
+
+            titles = await self.generate_titles(batch)
+            for ctx_id in batch:
+                try:
+                    await self.on_title(ctx_id, titles.get(ctx_id))
+                except Exception:
+                    logger.exception(f"Error storing title for context {ctx_id}.")
+
+    async def generate_titles(self, chats: dict[str, list[str]]) -> dict[str, Optional[str]]:
+        """
+        Generate titles for several chats with a single LLM request.
+
+        Args:
+            chats (dict[str, list[str]]): The chat histories, keyed by context ID.
+
+        Returns:
+            dict[str, Optional[str]]: The generated titles keyed by context ID. Chats without
+                                      a clear topic, or missing from the response, are omitted.
+        """
+        try:
+            # Number the conversations, so the model never has to echo the context IDs
+            ids = list(chats)
+            conversations = "\n\n".join([
+                f'<conversation id="{i + 1}">\n' + truncate_chat(
+                    chats[ctx_id],
+                    head_messages=self.head_messages,
+                    tail_messages=self.tail_messages,
+                    max_message_chars=self.max_message_chars,
+                ) + "\n</conversation>"
+                for i, ctx_id in enumerate(ids)
+            ])
+            response = await self.llm.acomplete(
+                prompt=TITLE_GEN_PROMPT.format(conversations=conversations),
+            )
+
+            titles = {}
+            for number, title in TITLE_PATTERN.findall(response.text):
+                title = title.strip()
+                if not number.isdigit() or not 0 < int(number) <= len(ids) or title == "NONE":
+                    continue
+                titles[ids[int(number) - 1]] = title
+            return titles
+        except Exception as e:
+            logger.info(f"Error generating titles: {e}")
+            return {}
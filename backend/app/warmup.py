@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+from tools import arxiv, blog, duckduckgo, wikipedia, youtube
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STEPS = ("contexts", "agents", "models", "tools")
+# Steps a worker can't serve without; they are retried until they succeed
+REQUIRED_STEPS = {"contexts", "agents"}
+
+class Warmup:
+    """Pays a worker's cold-start costs before it reports ready, so the first users after a deploy don't.
+
+    The steps, each optional:
+
+    - `contexts`: loads the contexts index, and the most recently active conversations into the session cache.
+    - `agents`: builds the tools and agents (rendering their system prompts) and the agents' Gemini clients.
+    - `models`: builds the Gemini clients of the other tasks (titles, routing, reviews, ...).
+    - `tools`: imports the tool SDKs and builds their clients (NewsAPI, article and transcript readers,
+      search tool specs, and the Blogger service if it is already authorized).
+
+    Building a Gemini client looks its model up, which opens the client's pooled connection.
+    """
+    def __init__(
+        self,
+        workflow,
+        steps: tuple[str, ...] = STEPS,
+        preload_contexts: int = 10,
+        step_timeout: float = 60,
+        retry_interval: float = 10,
+    ):
+        """
+        Args:
+            workflow (Workflow): The workflow to warm up.
+            steps (tuple[str, ...]): The steps to run, in order.
+            preload_contexts (int): Number of recently active conversations to load into the session cache.
+            step_timeout (float): Seconds after which a step is given up on (and, if required, retried).
+            retry_interval (float): Seconds between attempts of a failed required step.
+        """
+        unknown = set(steps) - set(STEPS)
+        if unknown:
+            raise ValueError(f"Unknown warm-up steps: {sorted(unknown)}")
+        self.workflow = workflow
+        self.steps = steps
+        self.preload_contexts = preload_contexts
+        self.step_timeout = step_timeout
+        self.retry_interval = retry_interval
+        self.results = {step: {"status": "pending"} for step in steps}
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the warm-up has finished (every required step succeeded)."""
+        return self.finished_at is not None
+
+    def start(self):
+        """Runs the warm-up in the background. Needs a running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Cancels a warm-up still in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def run(self):
+        """Runs the steps in order, retrying failed required steps, then marks the worker ready."""
+        self.started_at = datetime.now().isoformat()
+        start = time.monotonic()
+        for step in self.steps:
+            while not await self._run_step(step) and step in REQUIRED_STEPS:
+                await asyncio.sleep(self.retry_interval)
+        self.finished_at = datetime.now().isoformat()
+        logger.info(f"Warm-up finished in {time.monotonic() - start:.1f}s.")
+
+    async def _run_step(self, step: str) -> bool:
+        result = self.results[step]
+        result.update(status="running", attempts=result.get("attempts", 0) + 1)
+        start = time.monotonic()
+        try:
+            # The steps block on imports and network calls; keep them off the event loop
+            details = await asyncio.wait_for(asyncio.to_thread(getattr(self, f"_warm_{step}")), timeout=self.step_timeout)
+            result.update(status="ok", error=None, **details)
+            return True
+        except Exception as e:
+            logger.warning(f"Warm-up step '{step}' failed: {e!r}")
+            result.update(status="failed", error=repr(e))
+            return False
+        finally:
+            result["seconds"] = round(time.monotonic() - start, 3)
+
+    def _warm_contexts(self) -> dict:
+        index = self.workflow.refresh_contexts_index()
+        cache = self.workflow.session_cache
+        preloaded = cache.preload(cache.recent(self.preload_contexts)) if self.preload_contexts else 0
+        return {"contexts": len(index), "preloaded": preloaded}
+
+    def _warm_agents(self) -> dict:
+        self.workflow.workflow
+        return {"agents": len(self.workflow.agents), "tools": sum(len(tools) for tools in self.workflow.tools.values())}
+
+    def _warm_models(self) -> dict:
+        router = self.workflow.model_router
+        for task in router.task_tiers:
+            router.llm_for_task(task)
+        return {"tasks": len(router.task_tiers)}
+
+    def _warm_tools(self) -> dict:
+        clients: dict[str, Callable[[], object]] = {
+            "news": lambda: self.workflow.news_obj.newsapi_client,
+            "news_reader": lambda: self.workflow.news_obj.reader,
+            "youtube": youtube.get_reader,
+            "arxiv": arxiv.get_tool_spec,
+            "wikipedia": wikipedia.get_tool_spec,
+            "duckduckgo": duckduckgo.get_tool_spec,
+            # Never start the browser authorization flow from a warm-up
+            "blogger": lambda: blog.get_blogger_service(interactive=False),
+        }
+        warmed, unavailable = [], []
+        for name, build in clients.items():
+            try:
+                (warmed if build() is not None else unavailable).append(name)
+            except Exception as e:
+                logger.warning(f"Could not warm up the {name} client: {e!r}")
+                unavailable.append(name)
+        return {"warmed": warmed, "unavailable": unavailable}
+
+    def report(self) -> dict:
+        """Returns the warm-up status and the outcome of each step."""
+        return {
+            "status": "ready" if self.ready else "warming",
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.results,
+        }
+
+def warmup_from_env(workflow) -> Warmup:
+    """
+    Builds the warm-up configured by the `WARMUP` (comma-separated steps, default all; `none`
+    to skip warming up), `WARMUP_PRELOAD_CONTEXTS` (default 10) and `WARMUP_STEP_TIMEOUT`
+    (default 60) environment variables.
+    """
+    spec = os.getenv("WARMUP", ",".join(STEPS)).strip().lower()
+    steps = () if spec in ("", "none", "off") else tuple(step.strip() for step in spec.split(",") if step.strip())
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        logger.warning(f"Unknown warm-up steps {sorted(unknown)} ignored.")
+        steps = tuple(step for step in steps if step in STEPS)
+    return Warmup(
+        workflow,
+        steps=steps,
+        preload_contexts=int(os.getenv("WARMUP_PRELOAD_CONTEXTS", "10")),
+        step_timeout=float(os.getenv("WARMUP_STEP_TIMEOUT", "60")),
+    )
@@ -1,7 +1,7 @@
 from llama_index.core.tools import FunctionTool
 from llama_index.core import Settings
-from llama_index.llms.google_genai import GoogleGenAI
 from llama_index.core.agent.workflow import (
+    AgentInput,
     AgentOutput,
     ToolCall,
     ToolCallResult,
@@ -10,7 +10,14 @@ from llama_index.core.agent.workflow import (
 )
 from llama_index.core.workflow import Context
 from datetime import datetime
-from tools import news, youtube, blog, duckduckgo, briefs, arxiv, wikipedia, manager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from tools import news, youtube, blog, duckduckgo, briefs, arxiv, wikipedia, manager, digest, render, revisions
+from tools.blog_mirror import get_blog_mirror
+from tools.cache import tool_cache
+from tools.deadline import with_deadline
+from llms import get_model_router, usage_from_raw
+from prompt_cache import get_prompt_cache
 from prompts import (
     ARXIV_AGENT_PROMPT,
     MANAGER_AGENT_PROMPT,
@@ -20,17 +27,39 @@ from prompts import (
     YOUTUBE_AGENT_PROMPT,
     BLOG_AGENT_PROMPT,
     BRIEF_WRITER_AGENT_PROMPT,
-    TITLE_GEN_PROMPT
 )
+from .titles import TitleGenerator
+from .codec import codec_from_env
+from .store import ContextLocked, session_cache_from_env, store_from_env
+from .locks import RunSuperseded, run_guard_from_env
+from .search import search_index_from_env
+from .memory import research_memory_from_env
+from .router import MANAGER_AGENT, router_from_env
+from .prefetch import prefetcher_from_env
+from .parallel import tool_concurrency_from_env
+from .handoffs import GuardedAgentWorkflow, handoff_budget_from_env
+import copy
 import json
-import os
 import logging
 import asyncio
+import time
 from uuid import uuid4
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# The agents built by `Workflow.create_agents`
+AGENT_NAMES = [
+    "NewsAgent",
+    "YoutubeAgent",
+    "ArxivAgent",
+    "DuckDuckGoAgent",
+    "WikipediaAgent",
+    "BlogAgent",
+    "BriefWriterAgent",
+    MANAGER_AGENT,
+]
+
 # Helper function to run a coroutine in the background and log errors
 async def _run_and_log_errors(coro, task_name="Background task"):
     """Runs a coroutine and logs any exceptions."""
@@ -39,33 +68,92 @@ async def _run_and_log_errors(coro, task_name="Background task"):
     except Exception:
         logger.exception(f"{task_name} failed.")
 
+@dataclass
+class Session:
+    """The state of one conversation: its workflow context, ID and chat history."""
+    ctx: Optional[Context] = None
+    ctx_id: Optional[str] = None
+    chat_history: Optional[list[str]] = None
+    # Whether the last message skipped the ManagerAgent via the fast-path router
+    fast_pathed: bool = False
+    # The agent workflow `ctx` is bound to; it changes when agents are rebuilt
+    workflow: Optional[AgentWorkflow] = None
+    # When the stored copy this session was loaded from, or last wrote, was saved
+    stored_at: Optional[datetime] = None
+
 class Workflow():
     def __init__(self):        
-        Settings.llm = GoogleGenAI(
-            api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=1.0
-        )
-        self.title_gen_llm = GoogleGenAI(
-            model="gemini-2.0-flash-lite",
-            api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.1,
+        self.model_router = get_model_router()
+        self.title_gen_llm = self.model_router.task_llm("title")
+        self.title_generator = TitleGenerator(
+            llm=self.title_gen_llm,
+            on_title=self.set_context_title,
         )
-        self.news_obj = news.News()
-        self.tools = self.create_tools()
-        self.agents = self.create_agents()
-        self.workflow = AgentWorkflow(
-            agents=self.agents,
-            root_agent="ManagerAgent",
+        self.codec = codec_from_env()
+        self.store = store_from_env(self.codec)
+        self.session_cache = session_cache_from_env(self.store)
+        self.run_guard = run_guard_from_env()
+        self.search_index = search_index_from_env(self.store)
+        self.research_memory = research_memory_from_env(self.store)
+        self.indexes_backfilled = False
+        self.news_obj = news.news_from_env()
+        # The tools, agents and their LLM clients are built on first use (see `workflow`)
+        self._tools = None
+        self._workflow = None
+        self.agents = []
+        self.agent_tiers = {}
+        self.router = router_from_env(
+            agents=AGENT_NAMES,
+            classifier_llm=self.model_router.task_llm("router"),
         )
-        self.ctx = None
-        self.ctx_id = None
+        self.prefetcher = prefetcher_from_env()
+        self.tool_concurrency = tool_concurrency_from_env()
+        self.handoff_budget = handoff_budget_from_env()
+        # The interactive conversation, served by `/chat`
+        self.session = Session()
         self.ctx_index = self.load_contexts_index()
-        self.reverse_ctx_index = {v: k for k, v in self.ctx_index.items()}
-        self.chat_history = None
 
-    def load_contexts_index(self):
+    @property
+    def tools(self) -> dict[str, list[FunctionTool]]:
+        """The agents' tools, by agent group, created on first use."""
+        if self._tools is None:
+            self._tools = self.create_tools()
+        return self._tools
+
+    @property
+    def workflow(self) -> AgentWorkflow:
+        """The agent workflow, built (with its agents and their LLM clients) on first use."""
+        if self._workflow is None:
+            self.build_workflow()
+        return self._workflow
+
+    @property
+    def ctx(self) -> Optional[Context]:
+        return self.session.ctx
+
+    @ctx.setter
+    def ctx(self, ctx: Optional[Context]):
+        self.session.ctx = ctx
+
+    @property
+    def ctx_id(self) -> Optional[str]:
+        return self.session.ctx_id
+
+    @ctx_id.setter
+    def ctx_id(self, ctx_id: Optional[str]):
+        self.session.ctx_id = ctx_id
+
+    @property
+    def chat_history(self) -> Optional[list[str]]:
+        return self.session.chat_history
+
+    @chat_history.setter
+    def chat_history(self, chat_history: Optional[list[str]]):
+        self.session.chat_history = chat_history
+
+    def load_contexts_index(self) -> dict:
         """
-        Loads the contexts index from the `contexts` directory.
+        Loads the contexts index from the context store.
 
         Args:
             None
@@ -73,18 +161,7 @@ class Workflow():
             dict: A dictionary containing the context IDs and their corresponding titles.
         """
         try:
-            # If the directory and the index file don't exist, create them
-            if not os.path.exists("./contexts"):
-                os.makedirs("./contexts")
-            if not os.path.exists("./contexts/index.json"):
-                with open("./contexts/index.json", "w") as f:
-                    json.dump({}, f)
-
-            ctx_index = {}
-            
-            # Load the index file
-            with open("./contexts/index.json", "r") as f:
-                ctx_index = json.load(f)
+            ctx_index = self.store.load_index()
 
             # Check if the index is empty
             if not ctx_index:
@@ -92,126 +169,319 @@ class Workflow():
                 return {}
             
             return ctx_index
-        except FileNotFoundError:
-            logger.warning("Contexts index file not found. Creating a new one.")
-            return {}
-        except json.JSONDecodeError:
-            logger.error("Error decoding JSON from contexts index file. Creating a new one.")
+        except Exception as e:
+            logger.error(f"Error loading contexts index: {e}")
             return {}
 
+    def refresh_contexts_index(self) -> dict:
+        """
+        Reloads the contexts index, picking up contexts stored (or titled) by other workers.
+
+        Returns:
+            dict: The contexts index.
+        """
+        self.ctx_index = self.load_contexts_index()
+        return self.ctx_index
+
+    def context_exists(self, ctx_id: str) -> bool:
+        """Whether a context is stored, by this worker or another."""
+        return ctx_id in self.ctx_index or ctx_id in self.refresh_contexts_index()
+
+    async def set_context_title(self, ctx_id: str, title: str | None):
+        """
+        Stores a generated title in the contexts index.
+
+        Args:
+            ctx_id (str): The context ID.
+            title (str | None): The generated title, or None if no title could be generated.
+        """
+        if title is None:
+            logger.info(f"No title generated for context: {ctx_id}")
+            return
+        self.ctx_index[ctx_id] = title
+        await asyncio.to_thread(self.store.set_title, ctx_id, title)
+        logger.info(f"Title generated: {title}")
+
+    def save_context_files(self, ctx_id: str, context: dict, chat_history: list[str]):
+        """
+        Writes a context and its chat history to the context store, using the configured codec.
+
+        Args:
+            ctx_id (str): The context ID.
+            context (dict): The serialized workflow context.
+            chat_history (list[str]): The chat history.
+        """
+        self.store.write(ctx_id, {"ctx": context, "chat_history": chat_history})
+        self.session_cache.written(ctx_id, context, chat_history)
+
+    def index_context(self, ctx_id: str, chat_history: list[str], state: dict):
+        """
+        Updates the search index and the research memory with a context's chat history and artifacts, and persists them.
+
+        Args:
+            ctx_id (str): The context ID.
+            chat_history (list[str]): The chat history.
+            state (dict): The workflow state of the context.
+        """
+        if self.search_index.index_context(ctx_id, chat_history, state):
+            self.search_index.save()
+        if self.research_memory.record_state(ctx_id, state):
+            self.research_memory.save()
+
+    def backfill_indexes(self):
+        """
+        Indexes stored contexts that are missing from the search index, e.g. ones saved before it existed,
+        and records their intel briefings in the research memory.
+        """
+        self.indexes_backfilled = True
+        indexed = {document["ctx_id"] for document in self.search_index.documents.values()}
+        for ctx_id in [ctx_id for ctx_id in self.refresh_contexts_index() if ctx_id not in indexed]:
+            try:
+                context = self.store.read(ctx_id, "ctx")
+                chat_history = self.store.read(ctx_id, "chat_history")
+                # The state is stored JSON-serialized inside the context's globals
+                state = json.loads(context.get("globals", {}).get("state", "{}"))
+                self.search_index.index_context(ctx_id, chat_history, state)
+                self.research_memory.record_state(ctx_id, state, recorded_at=self.store.saved_at(ctx_id))
+            except Exception as e:
+                logger.warning(f"Error indexing stored context {ctx_id}: {e}")
+        self.search_index.save()
+        self.research_memory.save()
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        kinds: Optional[list[str]] = None,
+        exclude_ctx_id: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Searches saved conversations and their artifacts.
+
+        Args:
+            query (str): The search query.
+            top_k (int): The maximum number of results.
+            kinds (Optional[list[str]]): Restrict results to these kinds ('chat', 'intel_briefing', 'scripts', 'blog_posts').
+            exclude_ctx_id (Optional[str]): A context to leave out of the results.
+
+        Returns:
+            list[dict]: The results, best first, each with the title of its context.
+        """
+        if not self.indexes_backfilled:
+            self.backfill_indexes()
+
+        results = self.search_index.search(query, top_k=top_k, kinds=kinds, exclude_ctx_id=exclude_ctx_id)
+        for result in results:
+            result["title"] = self.ctx_index.get(result["ctx_id"])
+        return results
+
+    def search_past_work(self, query: str, kinds: Optional[list[str]], top_k: Optional[int]) -> list[dict] | str:
+        """Searches past conversations and their stored intel briefings, video scripts and blog posts.
+
+        Use this before researching a topic from scratch: a brief or script written in an earlier
+        conversation can be reused instead of fetching the same sources again.
+
+        Args:
+            query (str): The search query, e.g. the topic being researched.
+            kinds (Optional[list[str]]): Restrict results to these kinds: 'chat', 'intel_briefing', 'scripts', 'blog_posts'. None for all.
+            top_k (Optional[int]): The maximum number of results (default 5).
+
+        Returns:
+            list[dict] | str: The matching documents (title, kind, key, text), best first,
+                              or a message if nothing was found.
+        """
+        results = self.search(query, top_k=int(top_k or 5), kinds=kinds or None, exclude_ctx_id=self.ctx_id)
+        if not results:
+            return f"No past work found for '{query}'."
+        return [
+            {
+                "title": result["title"],
+                "kind": result["kind"],
+                "key": result["key"],
+                "text": result["text"][:4000],
+            }
+            for result in results
+        ]
+
     def create_tools(self) -> dict[str, list[FunctionTool]]:
+        # Every tool call is bounded by the deadline of the request it serves
         news_articles_reader_tool = FunctionTool.from_defaults(
-            fn=self.news_obj.read_news_articles,
+            async_fn=with_deadline(self.news_obj.read_news_articles),
             name="NewsArticlesReaderTool",
             description="Read news articles by passing their URL's",
         )
         news_headlines_search_tool = FunctionTool.from_defaults(
-            fn=self.news_obj.get_top_headlines,
+            async_fn=with_deadline(self.news_obj.get_top_headlines),
             name="NewsHeadlinesSearchTool",
             description="Get the latest news headlines",
         )
         news_sources_search_tool = FunctionTool.from_defaults(
-            fn=self.news_obj.get_sources,
+            async_fn=with_deadline(self.news_obj.get_sources),
             name="NewsSourcesSearchTool",
             description="Fetch the subset of news publishers that /top-headlines are available from.",
         )
         news_everything_search_tool = FunctionTool.from_defaults(
-            fn=self.news_obj.get_everything,
+            async_fn=with_deadline(self.news_obj.get_everything),
             name="NewsEverythingSearchTool",
             description="Get the latest news articles.",
         )
+        news_search_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(self.news_obj.search_news),
+            name="NewsSearchTool",
+            description="Search all news articles for a query, several pages at once, newest first. Repeated searches only return newer articles.",
+        )
         youtube_videos_trancript_reader_tool = FunctionTool.from_defaults(
-            fn=youtube.get_youtube_transcripts,
+            async_fn=with_deadline(youtube.get_youtube_transcripts),
             name="YoutubeVideosTranscriptReaderTool",
             description="Read youtube video transcripts by passing their URL's",
         )
         youtube_video_script_writer_tool = FunctionTool.from_defaults(
-            fn=youtube.write_video_script,
+            async_fn=with_deadline(youtube.write_video_script),
             name="YoutubeVideoScriptWriterTool",
             description="Write a youtube video script, by providing the video title and descriptive information.",
         )
         youtube_video_script_reader_tool = FunctionTool.from_defaults(
-            fn=youtube.read_video_script,
+            async_fn=with_deadline(youtube.read_video_script),
             name="YoutubeVideoScriptReaderTool",
             description="Read a youtube video script from the context, set previously.",
         )
+        revise_video_script_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(revisions.revise_video_script),
+            name="ReviseVideoScriptTool",
+            description="Revise a stored video script with targeted edits (find/replace snippets or whole sections) instead of rewriting it. Returns the new version and a diff.",
+        )
+        revise_blog_post_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(revisions.revise_blog_post),
+            name="ReviseBlogPostTool",
+            description="Revise a prepared blog post's Markdown with targeted edits (find/replace snippets or whole sections) instead of preparing it again. Returns the new version and a diff.",
+        )
+        revision_history_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(revisions.get_revision_history),
+            name="RevisionHistoryTool",
+            description="List the versions of a blog post ('blog_posts') or video script ('scripts') draft.",
+        )
+        restore_revision_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(revisions.restore_revision),
+            name="RestoreRevisionTool",
+            description="Restore an earlier version of a blog post ('blog_posts') or video script ('scripts') draft.",
+        )
         fetch_user_blogs_tool = FunctionTool.from_defaults(
-            fn=blog.fetch_user_blogs,
+            async_fn=with_deadline(blog.fetch_user_blogs),
             name="FetchUserBlogsTool",
             description="Fetch the latest blogs from a user.",
         )
         search_blog_posts_tool = FunctionTool.from_defaults(
-            fn=blog.search_blog_posts,
+            async_fn=with_deadline(blog.search_blog_posts),
             name="SearchBlogPostsTool",
             description="Search blog posts by passing a query.",
         )
+        find_blog_post_by_title_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(blog.find_blog_posts_by_title),
+            name="FindBlogPostByTitleTool",
+            description="Find the posts of a blog with exactly a given title (ignoring case and punctuation), to get a post ID or avoid creating a duplicate.",
+        )
         prepare_blog_post_tool = FunctionTool.from_defaults(
-            fn=blog.prepare_blog_post,
+            async_fn=with_deadline(blog.prepare_blog_post),
             name="PrepareBlogPostTool",
-            description="Prepares blog post content (title, html) for user confirmation before actual creation or update. Returns a dict with a 'blog' key.",
+            description="Prepares blog post content (title, Markdown, optional template) for user confirmation before actual creation or update. The Markdown is rendered to HTML locally.",
         )
         read_prepared_blog_post_tool = FunctionTool.from_defaults(
-            fn=blog.read_prepared_blog_post,
+            async_fn=with_deadline(blog.read_prepared_blog_post),
             name="ReadPreparedBlogPostTool",
-            description="Reads the prepared blog post content (title, html) for user confirmation before actual creation or update.",
+            description="Reads the prepared blog post content (title, Markdown) for user confirmation before actual creation or update.",
         )
         create_blog_post_tool = FunctionTool.from_defaults(
-            fn=blog.create_blog_post,
+            async_fn=with_deadline(blog.create_blog_post, verify_with="FindBlogPostByTitleTool"),
             name="CreateBlogPostTool",
-            description="Create a blog post by passing the title and content. Use ONLY after user confirmation via ManagerAgent.",
+            description="Create a blog post by passing the title and Markdown content (rendered to HTML locally). Use ONLY after user confirmation via ManagerAgent.",
         )
         update_blog_post_tool = FunctionTool.from_defaults(
-            fn=blog.update_blog_post,
+            async_fn=with_deadline(blog.update_blog_post, verify_with="FindBlogPostByTitleTool"),
             name="UpdateBlogPostTool",
-            description="Update a blog post by passing the post ID and new content. Use ONLY after user confirmation via ManagerAgent.",
+            description="Update a blog post by passing the post ID and new Markdown content (rendered to HTML locally). Use ONLY after user confirmation via ManagerAgent.",
         )
         delete_blog_post_tool = FunctionTool.from_defaults(
-            fn=blog.delete_blog_post,
+            async_fn=with_deadline(blog.delete_blog_post, verify_with="FindBlogPostByTitleTool"),
             name="DeleteBlogPostTool",
             description="Deletes a blog post by passing the blog ID and post ID. Use ONLY after user confirmation via ManagerAgent.",
         )
+        create_blog_posts_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(blog.create_blog_posts, verify_with="FindBlogPostByTitleTool"),
+            name="CreateBlogPostsTool",
+            description="Publish several prepared blog posts at once by passing the blog ID and their titles. Returns per-post results. Use ONLY after user confirmation via ManagerAgent.",
+        )
+        update_blog_posts_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(blog.update_blog_posts, verify_with="FindBlogPostByTitleTool"),
+            name="UpdateBlogPostsTool",
+            description="Update several blog posts at once by passing the blog ID, their post IDs and the titles of the prepared posts replacing them. Returns per-post results. Use ONLY after user confirmation via ManagerAgent.",
+        )
+        delete_blog_posts_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(blog.delete_blog_posts, verify_with="FindBlogPostByTitleTool"),
+            name="DeleteBlogPostsTool",
+            description="Delete several blog posts at once by passing the blog ID and their post IDs. Returns per-post results. Use ONLY after user confirmation via ManagerAgent.",
+        )
         get_blop_post_titles_tool = FunctionTool.from_defaults(
-            fn=blog.get_blop_post_titles,
+            async_fn=with_deadline(blog.get_blop_post_titles),
             name="GetBlogPostTitlesTool",
             description="Get the titles of all blog posts.",
         )
         duckduckgo_instant_search_tool = FunctionTool.from_defaults(
-            fn=duckduckgo.duckduckgo_instant_search,
+            async_fn=with_deadline(duckduckgo.duckduckgo_instant_search),
             name="DuckDuckGoInstantSearchTool",
             description="Perform an instant search using DuckDuckGo.",
         )
         duckduckgo_full_search_tool = FunctionTool.from_defaults(
-            fn=duckduckgo.duckduckgo_full_search,
+            async_fn=with_deadline(duckduckgo.duckduckgo_full_search),
             name="DuckDuckGoFullSearchTool",
             description="Perform a full search using DuckDuckGo.",
         )
         write_intel_briefing_tool = FunctionTool.from_defaults(
-            fn=briefs.write_intel_briefing,
+            async_fn=with_deadline(briefs.write_intel_briefing),
             name="WriteIntelBriefingTool",
             description="Write the intel briefing under a particular key, after researching the topic(s) or preparing content.",
         )
         get_intel_briefing_tool = FunctionTool.from_defaults(
-            fn=briefs.get_intel_briefing,
+            async_fn=with_deadline(briefs.get_intel_briefing),
             name="GetIntelBriefingTool",
             description="Get the intel briefing under a particular key.",
         )
         arxiv_query_tool = FunctionTool.from_defaults(
-            fn=arxiv.arxiv_query,
+            async_fn=with_deadline(arxiv.arxiv_query),
             name="ArxivQueryTool",
             description="Get the latest arxiv papers.",
         )
         wikipedia_load_data_tool = FunctionTool.from_defaults(
-            fn=wikipedia.load_data,
+            async_fn=with_deadline(wikipedia.read_page),
             name="WikipediaQueryTool",
             description="Load a Wikipedia page by passing the page title and language.",
         )
         wikipedia_search_data_tool = FunctionTool.from_defaults(
-            fn=wikipedia.search_data,
+            async_fn=with_deadline(wikipedia.search_page),
             name="WikipediaSearchTool",
             description="Search Wikipedia for a page related to the given query.",
         )
+        read_source_chunk_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(digest.read_source_chunk),
+            name="ReadSourceChunkTool",
+            description="Read the full text of one chunk of a long transcript or Wikipedia page that was returned as a digest.",
+        )
+        search_past_work_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(self.search_past_work),
+            name="SearchPastWorkTool",
+            description="Search past conversations and their stored intel briefings, video scripts and blog posts, to reuse earlier research.",
+        )
+        lookup_research_memory_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(self.research_memory.lookup_research_memory),
+            name="LookupResearchMemoryTool",
+            description="Look up intel briefings written in earlier conversations on a topic, with their age and freshness.",
+        )
+        reuse_research_brief_tool = FunctionTool.from_defaults(
+            async_fn=with_deadline(self.research_memory.reuse_research_brief),
+            name="ReuseResearchBriefTool",
+            description="Copy a brief from research memory into the current context's intel briefings, under a given key.",
+        )
         review_content_tool = FunctionTool.from_defaults(
-            fn=manager.review_content,
+            async_fn=with_deadline(manager.review_content),
             name="ReviewContentTool",
             description="Review the content of a specific type and key in the context.",
         )
@@ -223,27 +493,40 @@ class Workflow():
         wikipedia_query_tools = [
             wikipedia_load_data_tool,
             wikipedia_search_data_tool,
+            read_source_chunk_tool,
         ]
         youtube_tools = [
             youtube_videos_trancript_reader_tool,
+            read_source_chunk_tool,
             youtube_video_script_reader_tool,
             youtube_video_script_writer_tool,
+            revise_video_script_tool,
+            revision_history_tool,
+            restore_revision_tool,
             get_intel_briefing_tool,
         ]
         news_tools = [
             # news_articles_reader_tool,
             # news_headlines_search_tool,
             # news_sources_search_tool,
+            news_search_tool,
             news_everything_search_tool,
         ]
         blog_tools = [
             fetch_user_blogs_tool,
             search_blog_posts_tool,
+            find_blog_post_by_title_tool,
             prepare_blog_post_tool,
             create_blog_post_tool,
             update_blog_post_tool,
             delete_blog_post_tool,
+            create_blog_posts_tool,
+            update_blog_posts_tool,
+            delete_blog_posts_tool,
             read_prepared_blog_post_tool,
+            revise_blog_post_tool,
+            revision_history_tool,
+            restore_revision_tool,
             get_intel_briefing_tool,
             get_blop_post_titles_tool,
         ]
@@ -251,9 +534,14 @@ class Workflow():
             youtube_video_script_reader_tool,
             read_prepared_blog_post_tool,
             review_content_tool,
+            search_past_work_tool,
+            lookup_research_memory_tool,
+            reuse_research_brief_tool,
         ]
         brief_writer_tools = [
-            write_intel_briefing_tool
+            write_intel_briefing_tool,
+            search_past_work_tool,
+            read_source_chunk_tool,
         ]
         tools = {
             "arxiv": arxiv_query_tools,
@@ -267,12 +555,65 @@ class Workflow():
         }
         return tools
 
+    def build_workflow(self):
+        """
+        Builds the agents, on the model tiers currently assigned to them, and the agent workflow.
+        """
+        Settings.llm = self.model_router.llm_for_task("default")
+        self.agents = self.create_agents()
+        self.agent_tiers = self.model_router.agent_assignments([agent.name for agent in self.agents])
+        self._workflow = GuardedAgentWorkflow(
+            agents=self.agents,
+            root_agent="ManagerAgent",
+            concurrency=self.tool_concurrency,
+            budget=self.handoff_budget,
+        )
+
+    def refresh_model_tiers(self):
+        """
+        Rebuilds the agents if a model tier fell back (or recovered) since they were built.
+        Sessions are moved over to the new workflow on their next run.
+        """
+        if self._workflow is None or self.model_router.agent_assignments(list(self.agent_tiers)) == self.agent_tiers:
+            return
+        logger.info("Model tier assignments changed; rebuilding agents.")
+        self.build_workflow()
+
+    def bind_session(self, session: Session):
+        """
+        Makes sure a session's context belongs to the current agent workflow, creating it if needed.
+
+        Args:
+            session (Session): The session to bind.
+        """
+        if session.ctx is None:
+            session.ctx = Context(self.workflow)
+        elif session.workflow is not self.workflow:
+            session.ctx = Context.from_dict(workflow=self.workflow, data=session.ctx.to_dict())
+        session.workflow = self.workflow
+
+    def record_agent_hop(self, event: AgentOutput, latency: float):
+        """
+        Records the latency and token usage of one agent LLM call against the agent's model tier.
+
+        Args:
+            event (AgentOutput): The agent's output event.
+            latency (float): Seconds since the agent's input event.
+        """
+        input_tokens, output_tokens = usage_from_raw(event.raw)
+        self.model_router.record(
+            self.agent_tiers.get(event.current_agent_name, self.model_router.tier_for_agent(event.current_agent_name)),
+            latency,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens if output_tokens is not None else len(event.response.content or "") // 4,
+        )
+
     def create_agents(self) -> list[FunctionAgent]:
         news_agent = FunctionAgent(
             name="NewsAgent",
             description="Get the latest news regarding a topic, read news articles, and get the latest news headlines.",
             tools=self.tools["news"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("NewsAgent"),
             can_handoff_to=["ManagerAgent", "BriefWriterAgent"],
             system_prompt=NEWS_AGENT_PROMPT.format(
                 current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -282,7 +623,7 @@ class Workflow():
             name="YoutubeAgent",
             description="Get youtube video transcripts and write video scripts",
             tools=self.tools["youtube"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("YoutubeAgent"),
             can_handoff_to=["ManagerAgent", "BriefWriterAgent"],
             system_prompt=YOUTUBE_AGENT_PROMPT,
         )
@@ -290,7 +631,7 @@ class Workflow():
             name="ArxivAgent",
             description="Get the latest arxiv papers",
             tools=self.tools["arxiv"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("ArxivAgent"),
             can_handoff_to=["ManagerAgent", "BriefWriterAgent"],
             system_prompt=ARXIV_AGENT_PROMPT,
         )
@@ -298,7 +639,7 @@ class Workflow():
             name="DuckDuckGoAgent",
             description="Search the web using DuckDuckGo",
             tools=self.tools["duckduckgo"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("DuckDuckGoAgent"),
             can_handoff_to=["ManagerAgent", "BriefWriterAgent"],
             system_prompt=DUCKDUCKGO_AGENT_PROMPT,
         )
@@ -306,7 +647,7 @@ class Workflow():
             name="WikipediaAgent",
             description="Get the latest wikipedia articles",
             tools=self.tools["wikipedia"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("WikipediaAgent"),
             can_handoff_to=["ManagerAgent", "BriefWriterAgent"],
             system_prompt=WIKIPEDIA_AGENT_PROMPT,
         )
@@ -314,7 +655,7 @@ class Workflow():
             name="BlogAgent",
             description="Handles interactions with Blogger, including fetching, searching, preparing, creating, and updating posts.",
             tools=self.tools["blog"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("BlogAgent"),
             can_handoff_to=["ManagerAgent", "BriefWriterAgent"],
             system_prompt=BLOG_AGENT_PROMPT,
         )
@@ -322,14 +663,14 @@ class Workflow():
             name="BriefWriterAgent",
             description="Synthesizes raw research findings or stores prepared content into structured briefs using WriteIntelBriefingTool.",
             tools=self.tools["brief_writer"],
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("BriefWriterAgent"),
             can_handoff_to=["ManagerAgent"],
             system_prompt=BRIEF_WRITER_AGENT_PROMPT,
         )
         manager_agent = FunctionAgent(
             name="ManagerAgent",
             description="Manage the workflow, including user confirmation steps for actions.",
-            llm=Settings.llm,
+            llm=self.model_router.llm_for_agent("ManagerAgent"),
             tools=self.tools["manager"],
             can_handoff_to=["NewsAgent", "YoutubeAgent", "ArxivAgent", "DuckDuckGoAgent", "WikipediaAgent", "BlogAgent"],
             system_prompt=MANAGER_AGENT_PROMPT.format(
@@ -347,70 +688,201 @@ class Workflow():
             manager_agent,
         ]
     
-    async def update_stored_context(self):
+    async def update_stored_context(self, session: Optional[Session] = None):
         """
-        Updates the stored context in the `contexts` directory.
-        Generates a title if it's a new context.
+        Updates the stored context in the context store.
+        Queues background title generation if the context has no title yet, and indexes the
+        context in the background.
+
+        Args:
+            session (Optional[Session]): The session to store. Defaults to the interactive one.
         """
+        session = session or self.session
         try:
-            if self.ctx is None:
+            if session.ctx is None:
                 raise ValueError("Handler context is not set. Cannot update stored context.")
             
-            if self.ctx_id is None:
-                # Generate title and update index, using the chat history
-                title = await self.generate_title(self.chat_history)
-                self.ctx_id = str(uuid4())
-                self.reverse_ctx_index[title] = self.ctx_id
-                self.ctx_index[self.ctx_id] = title
-                with open("./contexts/index.json", "w") as f:
-                    json.dump(self.ctx_index, f)
-                logger.info(f"Title generated: {title}")
-
-            elif self.ctx_index[self.ctx_id] is None:
-                # Generate title and update index
-                title = await self.generate_title(self.chat_history)
-                self.reverse_ctx_index[title] = self.ctx_id
-                self.ctx_index[self.ctx_id] = title
-                with open("./contexts/index.json", "w") as f:
-                    json.dump(self.ctx_index, f)
-                logger.info(f"Title generated: {title}")
-            
-            context = self.ctx.to_dict()
+            if session.ctx_id is None:
+                session.ctx_id = str(uuid4())
+            if session.ctx_id not in self.ctx_index:
+                # Register the new context right away; its title is generated in the background
+                self.ctx_index[session.ctx_id] = None
+                await asyncio.to_thread(self.store.register, session.ctx_id)
+
+            if self.ctx_index.get(session.ctx_id) is None:
+                self.title_generator.submit(session.ctx_id, session.chat_history)
             
-            # Create the directory if it doesn't exist
-            context_dir = f"./contexts/{self.ctx_id}"
-            os.makedirs(context_dir, exist_ok=True)
+            context = session.ctx.to_dict()
+            chat_history = list(session.chat_history)
+            state = copy.deepcopy(await session.ctx.get("state", default={}))
 
-            # Save the context to a single JSON file
-            with open(f"{context_dir}/ctx.json", "w") as f:
-                json.dump(context, f)
+            # Encode and write off the event loop; large contexts take a while to serialize
+            await asyncio.to_thread(self.save_context_files, session.ctx_id, context, chat_history)
+            session.stored_at = await asyncio.to_thread(self.store.saved_at, session.ctx_id)
 
-            # Save the chat history to a separate JSON file
-            with open(f"{context_dir}/chat_history.json", "w") as f:
-                json.dump(self.chat_history, f)
+            index_coro = asyncio.to_thread(self.index_context, session.ctx_id, chat_history, state)
+            asyncio.create_task(_run_and_log_errors(index_coro, f"Indexing context {session.ctx_id}"))
             
-            logger.info(f"Context updated successfully: {self.ctx_id}")
+            logger.info(f"Context updated successfully: {session.ctx_id}")
         except Exception as e:
             logger.error(f"Error updating context: {e}")
             raise e
     
+    async def persist_session(self, session: Session):
+        """
+        Stores an interactive session under its conversation's lock, unless another request stored a
+        newer copy of the conversation since this session loaded (or last stored) it; the newer copy
+        is kept, rather than overwritten with this worker's stale one.
+
+        Args:
+            session (Session): The session to store.
+        """
+        if session.ctx_id is None:
+            # A new conversation; nothing else can have stored it yet
+            await self.update_stored_context(session)
+            return
+
+        async with self.store.lock(session.ctx_id):
+            stored_at = await asyncio.to_thread(self.store.saved_at, session.ctx_id)
+            if stored_at is not None and session.stored_at is not None and stored_at > session.stored_at:
+                logger.warning(
+                    f"Not storing context {session.ctx_id}: it was updated elsewhere after it was loaded here. "
+                    "Reload it to continue from the stored copy."
+                )
+                return
+            await self.update_stored_context(session)
+
     async def chat(self, message: str) -> str:
         """Process a user message through the agent workflow."""
         try:
-            if self.chat_history is None:
-                self.chat_history = []
+            # One run at a time on the in-memory conversation; overlapping messages follow the guard's policy
+            return await self.run_guard.run("interactive", lambda: self.run(message, self.session))
+        except (ContextLocked, RunSuperseded):
+            raise
+        except Exception as e:
+            logger.error(f"Error in agent workflow: {str(e)}")
+            return f"I encountered an error while processing your request: {str(e)}"
+
+    async def chat_in_context(self, message: str, ctx_id: Optional[str], lock_timeout: Optional[float] = None) -> tuple[str, str]:
+        """
+        Processes a user message in a stored conversation, without relying on this worker's memory,
+        so any worker can serve any message.
+
+        The conversation is loaded from the context store under its lock, and stored again before
+        the lock is released.
+
+        Args:
+            message (str): The user message.
+            ctx_id (Optional[str]): The conversation to continue, or None to start a new one.
+            lock_timeout (Optional[float]): Seconds to wait while another request holds the conversation.
+
+        Returns:
+            tuple[str, str]: The response, and the conversation ID.
+
+        Raises:
+            ValueError: If the conversation doesn't exist.
+            ContextLocked: If the conversation stays busy past `lock_timeout`, or is busy under the `reject` policy.
+            RunSuperseded: If a newer message to the conversation cancelled this one, under the `cancel_previous` policy.
+        """
+        if ctx_id is None:
+            session = Session(ctx_id=str(uuid4()))
+            try:
+                response = await self.run(message, session, persist=False)
+                await self.update_stored_context(session)
+            except Exception as e:
+                logger.error(f"Error in agent workflow: {str(e)}")
+                response = f"I encountered an error while processing your request: {str(e)}"
+            return response, session.ctx_id
+
+        if not self.context_exists(ctx_id):
+            raise ValueError(f"Context with id {ctx_id} not found.")
+
+        async def run_locked() -> str:
+            # Overlaps within this worker are settled by the guard; the store lock covers other workers
+            async with self.store.lock(ctx_id, timeout=lock_timeout):
+                try:
+                    session = await self.load_session(ctx_id)
+                    response = await self.run(message, session, persist=False)
+                    await self.update_stored_context(session)
+                    return response
+                except Exception as e:
+                    logger.error(f"Error in agent workflow: {str(e)}")
+                    return f"I encountered an error while processing your request: {str(e)}"
+
+        return await self.run_guard.run(ctx_id, run_locked), ctx_id
+
+    async def run(
+        self,
+        message: str,
+        session: Session,
+        on_event: Optional[Callable[[object], Awaitable[None]]] = None,
+        persist: bool = True,
+    ) -> str:
+        """
+        Runs a user message through the agent workflow, in the given session.
+
+        Args:
+            message (str): The user message.
+            session (Session): The conversation to run the message in; updated in place.
+            on_event (Optional[Callable[[object], Awaitable[None]]]): Called with every workflow event.
+            persist (bool): Whether to store the context in the background; if False, the caller stores it.
+
+        Returns:
+            str: The final response.
+        """
+        prefetches = []
+        handler = None
+        snapshot = None
+        try:
+            if session.chat_history is None:
+                session.chat_history = []
+
+            if not self.indexes_backfilled:
+                backfill_coro = asyncio.to_thread(self.backfill_indexes)
+                asyncio.create_task(_run_and_log_errors(backfill_coro, "Index Backfill"))
+
+            self.refresh_model_tiers()
+            self.bind_session(session)
+            if not await session.ctx.get("state", default=None):
+                # The agent workflow would start every new conversation from one shared initial state
+                # dict, which the tools mutate in place; give this one its own
+                await session.ctx.set("state", {"intel_briefing": {}})
+            # Kept to roll the session back if the run fails or is cancelled midway
+            snapshot = (session.ctx.to_dict(), len(session.chat_history), session.fast_pathed)
+
+            # Warm the tool cache for the lookups this message will likely need, while the agents plan
+            if self.prefetcher is not None:
+                prefetches = self.prefetcher.start(message)
+
+            # Route clear-cut requests straight to a specialist, skipping the manager's routing hop
+            if self.router is not None:
+                agent = await self.router.route(message, last_response=session.chat_history[-1] if session.chat_history else None)
+                if agent != MANAGER_AGENT or session.fast_pathed:
+                    await session.ctx.set("current_agent_name", agent)
+                session.fast_pathed = agent != MANAGER_AGENT
 
             # Append the user message to the chat history
-            self.chat_history.append(message)
+            session.chat_history.append(message)
             current_agent = None
             
             handler = self.workflow.run(
-                ctx=self.ctx,
+                ctx=session.ctx,
                 user_msg=message
             )
             complete_response = None
 
+            hop_started = None
+
             async for event in handler.stream_events():
+                if on_event is not None:
+                    await on_event(event)
+
+                if isinstance(event, AgentInput):
+                    hop_started = time.monotonic()
+                elif isinstance(event, AgentOutput) and hop_started is not None:
+                    self.record_agent_hop(event, time.monotonic() - hop_started)
+                    hop_started = None
+
                 if (
                     hasattr(event, "current_agent_name")
                     and event.current_agent_name != current_agent
@@ -434,9 +906,13 @@ class Workflow():
                 elif isinstance(event, ToolCall):
                     logging.info(f"🔨 Calling Tool: {event.tool_name}")
                     logging.info(f"  With arguments: {event.tool_kwargs}")
-            
+
+            # The event stream ends before the run has wound down; wait for it, so the context
+            # is no longer marked running when it is stored (and any error surfaces here)
+            await handler
+
             # Set the handler to the current handler for the next request
-            self.ctx = handler.ctx
+            session.ctx = handler.ctx
 
             if complete_response is None:
                 # If no response was generated, return a default message
@@ -446,47 +922,86 @@ class Workflow():
             elif complete_response.startswith("assistant: "):
                 complete_response = complete_response[len("assistant: "):]
 
-            self.chat_history.append(complete_response)
+            session.chat_history.append(complete_response)
 
-            # Update the stored context asynchronously
-            update_coro = self.update_stored_context()
-            asyncio.create_task(_run_and_log_errors(asyncio.shield(update_coro), "Context Update"))
+            if persist:
+                # Update the stored context asynchronously
+                update_coro = self.persist_session(session)
+                asyncio.create_task(_run_and_log_errors(asyncio.shield(update_coro), "Context Update"))
 
             return complete_response or "I'm sorry, I couldn't process your request."
-            
-        except Exception as e:
-            logger.error(f"Error in agent workflow: {str(e)}")
-            return f"I encountered an error while processing your request: {str(e)}"
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError) and handler is not None and not handler.done():
+                # Stop the agents' remaining LLM and tool calls, not just our reading of their events
+                try:
+                    await asyncio.shield(handler.cancel_run())
+                except Exception:
+                    logger.exception("Error cancelling the workflow run.")
+            if snapshot is not None:
+                context, history_length, fast_pathed = snapshot
+                session.ctx = Context.from_dict(workflow=self.workflow, data=context)
+                del session.chat_history[history_length:]
+                session.fast_pathed = fast_pathed
+            raise
+        finally:
+            if self.prefetcher is not None:
+                self.prefetcher.finish(prefetches)
+
+    def metrics(self) -> dict:
+        """
+        Collects runtime metrics of the workflow components.
+
+        Returns:
+            dict: The metrics, keyed by component.
+        """
+        return {
+            "router": self.router.metrics() if self.router is not None else None,
+            "model_tiers": self.model_router.metrics(),
+            "prompt_cache": get_prompt_cache().metrics() if get_prompt_cache() is not None else None,
+            "prefetch": self.prefetcher.metrics() if self.prefetcher is not None else None,
+            "context_runs": self.run_guard.metrics(),
+            "tool_cache": tool_cache.metrics(),
+            "digests": digest.digester.metrics(),
+            "news": self.news_obj.metrics(),
+            "blog_mirror": get_blog_mirror().metrics() if get_blog_mirror() is not None else None,
+            "rendering": render.renderer.metrics(),
+            "tool_concurrency": self.tool_concurrency.metrics(),
+            "handoffs": self.handoff_budget.metrics(),
+            "session_cache": self.session_cache.metrics(),
+        }
 
     async def reset_context(self):
         """
         Resets the chat context and agent workflow.
+
+        The current conversation is not written back: every run already stores it when it finishes,
+        and writing the in-memory copy again could overwrite a newer one stored by another request.
         """
-        # If the context is not None, save it to the context file
-        if self.ctx is not None:
-            try:
-                # Get the context and save it to a file
-                context = self.ctx.to_dict()
-                with open(f"contexts/{self.ctx_id}/ctx.json", "w") as f:
-                    json.dump(context, f)
+        self.session = Session()
+        self.build_workflow()
 
-                with open(f"contexts/{self.ctx_id}/chat_history.json", "w") as f:
-                    json.dump(self.chat_history, f)
-            except Exception as e:
-                logger.error(f"Error saving context: {e}")
+    async def load_session(self, id: str) -> Session:
+        """
+        Loads a stored conversation from the context store (or the session cache) into a new session.
 
-        self.ctx = None
-        self.ctx_id = None
-        self.chat_history = None
-        Settings.llm = GoogleGenAI(
-            api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=1.0
-        )
-        self.agents = self.create_agents()
-        self.workflow = AgentWorkflow(
-            agents=self.agents,
-            root_agent="ManagerAgent",
+        Args:
+            id (str): The context ID.
+        Returns:
+            Session: The loaded session, bound to the current agent workflow.
+        """
+        if not self.context_exists(id):
+            raise ValueError(f"Context with id {id} not found.")
+
+        # Stamped before reading, so a write landing in between makes the session look stale, not fresh
+        stored_at = await asyncio.to_thread(self.store.saved_at, id)
+        context, chat_history = await asyncio.to_thread(self.session_cache.read, id)
+
+        # Create a new context
+        ctx = Context.from_dict(
+            workflow=self.workflow,
+            data=context,
         )
+        return Session(ctx=ctx, ctx_id=id, chat_history=chat_history, workflow=self.workflow, stored_at=stored_at)
 
     async def load_context(self, id: str) -> list[str]:
         """
@@ -498,22 +1013,13 @@ class Workflow():
             list[str]: A list of strings representing the chat history.
         """
         try:
-            if id not in self.ctx_index:
+            if not self.context_exists(id):
                 raise ValueError(f"Context with id {id} not found.")
             
             # Reset the current context, then load the new context
             await self.reset_context()
+            self.session = await self.load_session(id)
 
-            context = json.load(open(f"./contexts/{id}/ctx.json", "r"))
-            self.chat_history = json.load(open(f"./contexts/{id}/chat_history.json", "r"))
-
-            # Create a new context
-            self.ctx = Context.from_dict(
-                workflow=self.workflow,
-                data=context,
-            )
-
-            self.ctx_id = id
             logger.info(f"Context loaded successfully: {self.ctx_id}")
 
             return self.chat_history
@@ -521,40 +1027,3 @@ class Workflow():
         except Exception as e:
             logger.error(f"Error loading context: {e}")
             raise e
-        
-    async def generate_title(self, chat: list[str]) -> str:
-        """
-        Generate a title for the given chat using the LLM.
-
-        Args:
-            chat (list[str]): The chat history as a list of strings.
-            
-        Returns:
-            str: The generated title.
-        """
-
-        try:
-            # Format the chat history for the prompt
-            chat = "\n".join([
-                f"User: {message}" if i % 2 == 0 else f"AI: {message}"
-                for i, message in enumerate(chat)
-            ])
-            prompt = TITLE_GEN_PROMPT.format(chat=chat)
-
-            # Generate the title using the LLM
-            title = await self.title_gen_llm.acomplete(
-                prompt=prompt,
-            )
-
-            title = title.text.strip()
-
-            # Extract the title from the response
-            if title.startswith("<title>") and title.endswith("</title>"):
-                title = title[7:-8].strip()
-            else:
-                raise ValueError("Invalid title format.")
-            
-            return None if title == "NONE" else title
-        except Exception as e:
-            logging.info(f"Error generating title: {e}")
-            return None
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""Benchmarks the stored context codecs against the legacy stdlib JSON format.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.codec_benchmark [--contexts ./contexts] [--repeat 5]
+
+Every stored `ctx` document under the contexts directory is encoded and decoded with
+each codec available in this environment; size and timings are reported against the
+legacy stdlib `json` format.
+"""
+import os
+import json
+import time
+import argparse
+import importlib.util
+
+# Load the codec module directly: importing the `app` package would build the whole workflow
+_spec = importlib.util.spec_from_file_location("codec", os.path.join(os.path.dirname(__file__), "..", "app", "codec.py"))
+codec = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(codec)
+
+def load_samples(contexts_dir: str) -> list[dict]:
+    """Loads every stored context document under the contexts directory."""
+    samples = []
+    for entry in sorted(os.listdir(contexts_dir)):
+        stem = os.path.join(contexts_dir, entry, "ctx")
+        if os.path.isdir(os.path.join(contexts_dir, entry)):
+            try:
+                samples.append(codec.read_document(stem))
+            except FileNotFoundError:
+                continue
+    return samples
+
+def best_of(fn, repeat: int) -> float:
+    """Returns the fastest of `repeat` runs of `fn`, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contexts", default="./contexts", help="Directory holding the stored contexts.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best run is reported.")
+    args = parser.parse_args()
+
+    samples = load_samples(args.contexts)
+    if not samples:
+        raise SystemExit(f"No stored contexts found in {args.contexts}")
+
+    specs = [
+        serializer if compression == "none" else f"{serializer}+{compression}"
+        for serializer in codec.available_serializers()
+        for compression in codec.available_compressions()
+    ]
+
+    print(f"{len(samples)} context(s), {sum(len(json.dumps(s)) for s in samples) / 1024:.0f} KiB as JSON\n")
+    print(f"{'codec':<16}{'size KiB':>10}{'ratio':>8}{'encode ms':>12}{'decode ms':>12}")
+
+    # The legacy format: stdlib `json.dump` / `json.load`, uncompressed
+    encoded = [json.dumps(sample).encode("utf-8") for sample in samples]
+    baseline = sum(len(data) for data in encoded)
+    encode_ms = best_of(lambda: [json.dumps(sample).encode("utf-8") for sample in samples], args.repeat)
+    decode_ms = best_of(lambda: [json.loads(data) for data in encoded], args.repeat)
+    print(f"{'legacy':<16}{baseline / 1024:>10.0f}{1:>7.1f}x{encode_ms:>12.1f}{decode_ms:>12.1f}")
+
+    for spec in specs:
+        document_codec = codec.Codec(spec)
+        encoded = [document_codec.encode(sample) for sample in samples]
+        size = sum(len(data) for data in encoded)
+        encode_ms = best_of(lambda: [document_codec.encode(sample) for sample in samples], args.repeat)
+        decode_ms = best_of(lambda: [codec.decode(data) for data in encoded], args.repeat)
+        print(f"{spec:<16}{size / 1024:>10.0f}{baseline / size:>7.1f}x{encode_ms:>12.1f}{decode_ms:>12.1f}")
+
+if __name__ == "__main__":
+    main()
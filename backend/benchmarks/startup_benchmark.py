@@ -0,0 +1,69 @@
+"""Benchmarks the API's cold start.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.startup_benchmark [--repeat 5] [--top 15] [--first-use]
+
+Each run starts a fresh interpreter and times importing the `app` package, which is
+everything the server does before it accepts requests; the best run is reported, along with
+the slowest imports of an extra `-X importtime` run. With `--first-use`, the time the first
+message spends building the tools, agents and LLM clients is measured too (this constructs
+the Gemini clients, so it needs `GEMINI_API_KEY` and network access).
+"""
+import sys
+import json
+import argparse
+import subprocess
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import app
+ready = time.perf_counter() - start
+first_use = None
+if {first_use}:
+    start = time.perf_counter()
+    app.wflw.workflow
+    first_use = time.perf_counter() - start
+print(json.dumps({{"ready": ready, "first_use": first_use}}))
+"""
+
+def run_child(first_use: bool, importtime: bool = False) -> tuple[dict, str]:
+    """Starts the app in a fresh interpreter; returns its timings and its stderr."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD.format(first_use=first_use)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Starting the app failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(importtime_log: str, top: int) -> list[tuple[int, str]]:
+    """Parses `-X importtime` output into the `top` modules with the largest cumulative import time (µs)."""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+    return sorted(imports, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts to time; the best is reported.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list.")
+    parser.add_argument("--first-use", action="store_true", help="Also time building the agents on first use.")
+    args = parser.parse_args()
+
+    runs = [run_child(args.first_use)[0] for _ in range(args.repeat)]
+    ready = min(run["ready"] for run in runs)
+    print(f"ready to serve: {ready * 1000:.0f} ms (best of {args.repeat})")
+    if args.first_use:
+        first_use = min(run["first_use"] for run in runs)
+        print(f"first use (tools, agents, LLM clients): {first_use * 1000:.0f} ms")
+
+    _, log = run_child(False, importtime=True)
+    print(f"\n{'cumulative ms':>14}  module")
+    for cumulative, name in slowest_imports(log, args.top):
+        print(f"{cumulative / 1000:>14.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
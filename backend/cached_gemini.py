@@ -0,0 +1,125 @@
+import json
+import logging
+from typing import Any, Optional, Sequence
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import ChatMessage, ChatResponse, ChatResponseAsyncGen, MessageRole
+from llama_index.llms.google_genai import GoogleGenAI
+from llms import usage_counts
+from prompt_cache import CachedPrefix, PromptCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class CachedPrefixGemini(GoogleGenAI):
+    """A Gemini LLM that sends an agent's system prompt and tool definitions as cached content.
+
+    Once the prefix is cached, calls send only the conversation, referencing the cached content
+    instead of repeating the system prompt and tool schemas. Calls without a system prompt, on
+    clients without caching (e.g. local or mock models), or whose prefix isn't cached (yet), go
+    out unchanged. A call whose cached content has disappeared is retried uncached.
+    """
+    _prompt_cache: Optional[PromptCache] = PrivateAttr(default=None)
+
+    def __init__(self, *args, prompt_cache: Optional[PromptCache] = None, **kwargs):
+        """
+        Args:
+            prompt_cache (Optional[PromptCache]): The prefix registry; calls are never cached if None.
+            *args, **kwargs: Passed to `GoogleGenAI`.
+        """
+        super().__init__(*args, **kwargs)
+        self._prompt_cache = prompt_cache
+
+    async def _with_cached_prefix(self, messages: Sequence[ChatMessage], kwargs: dict) -> tuple[Sequence[ChatMessage], dict, Optional[str]]:
+        """Rewrites a call to reference its cached prefix; returns the messages, kwargs and prefix key (None if uncached)."""
+        cache = self._prompt_cache
+        client = getattr(self, "_client", None)
+        if cache is None or not messages or messages[0].role != MessageRole.SYSTEM or not hasattr(client, "aio"):
+            return messages, kwargs, None
+
+        from google.genai import types
+
+        system = messages[0].content or ""
+        tools = kwargs.get("tools")
+        tool_config = kwargs.get("tool_config")
+        tools_json = json.dumps([tool.model_dump(mode="json", exclude_none=True) for tool in tools or []], sort_keys=True)
+        tool_config_json = tool_config.model_dump_json(exclude_none=True) if tool_config is not None else ""
+        key = cache.key(self.model, system, tools_json, tool_config_json)
+
+        async def create(ttl: int) -> CachedPrefix:
+            cached = await client.aio.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system,
+                    tools=tools,
+                    tool_config=tool_config,
+                    ttl=f"{ttl}s",
+                    display_name=f"prefix-{key[:16]}",
+                ),
+            )
+            return CachedPrefix(name=cached.name, expires_at=cached.expire_time.timestamp())
+
+        async def extend(name: str, ttl: int) -> float:
+            cached = await client.aio.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{ttl}s"))
+            return cached.expire_time.timestamp()
+
+        name = await cache.lookup(key, (len(system) + len(tools_json)) // 4, create, extend)
+        if name is None:
+            return messages, kwargs, None
+
+        # The cached content carries the system prompt and tools; the request must not repeat them
+        cached_kwargs = {k: v for k, v in kwargs.items() if k not in ("tools", "tool_config")}
+        cached_kwargs["generation_config"] = {**kwargs.get("generation_config", {}), "cached_content": name}
+        return messages[1:], cached_kwargs, key
+
+    def _record_usage(self, response: ChatResponse):
+        if self._prompt_cache is None:
+            return
+        # The raw response is a dict or an SDK object, depending on the client version
+        prompt_tokens, cached_tokens = usage_counts(response.raw, "prompt_token_count", "cached_content_token_count")
+        if prompt_tokens is not None or cached_tokens is not None:
+            self._prompt_cache.record_usage(prompt_tokens, cached_tokens)
+
+    def _cache_gone(self, key: str, error: Exception) -> bool:
+        """Whether a cached call failed because its cached content is gone; if so, forgets it."""
+        from google.genai import errors
+
+        if isinstance(error, errors.ClientError) and error.code in (400, 403, 404):
+            logger.warning(f"Cached prompt prefix unusable ({error}); retrying uncached.")
+            self._prompt_cache.invalidate(key)
+            return True
+        return False
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        cached_messages, cached_kwargs, key = await self._with_cached_prefix(messages, kwargs)
+        if key is None:
+            response = await super().achat(messages, **kwargs)
+        else:
+            try:
+                response = await super().achat(cached_messages, **cached_kwargs)
+            except Exception as e:
+                if not self._cache_gone(key, e):
+                    raise
+                response = await super().achat(messages, **kwargs)
+        self._record_usage(response)
+        return response
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        cached_messages, cached_kwargs, key = await self._with_cached_prefix(messages, kwargs)
+
+        async def gen() -> ChatResponseAsyncGen:
+            response = None
+            try:
+                async for response in await super(CachedPrefixGemini, self).astream_chat(
+                    cached_messages if key else messages, **(cached_kwargs if key else kwargs)
+                ):
+                    yield response
+            except Exception as e:
+                # Only a failure before anything was streamed can be retried transparently
+                if key is None or response is not None or not self._cache_gone(key, e):
+                    raise
+                async for response in await super(CachedPrefixGemini, self).astream_chat(messages, **kwargs):
+                    yield response
+            if response is not None:
+                self._record_usage(response)
+
+        return gen()
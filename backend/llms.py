@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Optional
+from tools.deadline import DeadlineExceeded, remaining
+from prompt_cache import get_prompt_cache
+
+if TYPE_CHECKING:
+    from llama_index.llms.google_genai import GoogleGenAI
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Model tiers. Costs are USD per million tokens and only used for reporting.
+# A tier whose calls time out (or exceed `timeout` seconds) is degraded to its `fallback` for `cooldown` seconds.
+MODEL_TIERS = {
+    "fast": {
+        "model": "gemini-2.0-flash-lite",
+        "temperature": 0.1,
+        "timeout": 30,
+        "fallback": None,
+        "input_cost": 0.075,
+        "output_cost": 0.30,
+    },
+    "standard": {
+        "model": "gemini-2.0-flash",
+        "temperature": 1.0,
+        "timeout": 90,
+        "fallback": "fast",
+        "input_cost": 0.10,
+        "output_cost": 0.40,
+    },
+}
+
+# Agents that mostly pick a tool and pass its results on run on the fast tier
+AGENT_TIERS = {
+    "NewsAgent": "fast",
+    "ArxivAgent": "fast",
+    "WikipediaAgent": "fast",
+    "DuckDuckGoAgent": "fast",
+    "YoutubeAgent": "standard",
+    "BlogAgent": "standard",
+    "BriefWriterAgent": "standard",
+    "ManagerAgent": "standard",
+}
+
+# LLM calls made outside the agents, by task. Values are a tier name, or a dict with a
+# `tier` and overrides for it (e.g. a different temperature).
+TASK_TIERS = {
+    "default": "standard",
+    "title": "fast",
+    "router": "fast",
+    "review": {"tier": "fast", "temperature": 1.0},
+    "video_script": "standard",
+    "summarize": "fast",
+}
+
+def usage_counts(raw: Any, *fields: str) -> tuple[Optional[int], ...]:
+    """
+    Reads token counts from the usage metadata of a raw Gemini response, if it reports them.
+
+    Args:
+        raw (Any): The raw response (object or dict) attached to a llama-index response.
+        *fields (str): The usage metadata fields to read, e.g. `prompt_token_count`.
+
+    Returns:
+        tuple[Optional[int], ...]: One count per field, None where it isn't reported.
+    """
+    usage = raw.get("usage_metadata") if isinstance(raw, dict) else getattr(raw, "usage_metadata", None)
+    if usage is None:
+        return tuple(None for _ in fields)
+    if isinstance(usage, dict):
+        return tuple(usage.get(field) for field in fields)
+    return tuple(getattr(usage, field, None) for field in fields)
+
+def usage_from_raw(raw: Any) -> tuple[Optional[int], Optional[int]]:
+    """
+    Extracts the prompt and output token counts from a raw Gemini response, if it reports them.
+
+    Args:
+        raw (Any): The raw response (object or dict) attached to a llama-index response.
+
+    Returns:
+        tuple[Optional[int], Optional[int]]: The input and output token counts.
+    """
+    return usage_counts(raw, "prompt_token_count", "candidates_token_count")
+
+class TaskLLM:
+    """Exposes one task of a ModelRouter through the `acomplete` interface of an LLM."""
+    def __init__(self, router: "ModelRouter", task: str):
+        self.router = router
+        self.task = task
+
+    async def acomplete(self, prompt: str, **kwargs):
+        return await self.router.complete(self.task, prompt)
+
+class ModelRouter:
+    """Assigns models to agents and tasks by tier, with fallback to a faster tier on timeouts.
+
+    Latency, token usage and estimated cost are recorded per tier.
+    """
+    def __init__(
+        self,
+        tiers: dict = MODEL_TIERS,
+        agent_tiers: dict = AGENT_TIERS,
+        task_tiers: dict = TASK_TIERS,
+        cooldown: float = 120,
+    ):
+        """
+        Args:
+            tiers (dict): The model tiers.
+            agent_tiers (dict): The tier of each agent; unlisted agents use the `default` task tier.
+            task_tiers (dict): The tier of each task.
+            cooldown (float): Seconds a tier stays degraded after a timeout.
+        """
+        self.tiers = tiers
+        self.agent_tiers = agent_tiers
+        self.task_tiers = task_tiers
+        self.cooldown = cooldown
+        self._llms: dict[tuple, "GoogleGenAI"] = {}
+        self._degraded_until: dict[str, float] = {}
+        self._stats = defaultdict(lambda: defaultdict(float))
+        self._latencies = defaultdict(list)
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """
+        Builds the router, merging the JSON file at `MODEL_ROUTING_CONFIG` (with optional
+        `tiers`, `agents` and `tasks` sections) over the defaults.
+        """
+        tiers, agent_tiers, task_tiers = dict(MODEL_TIERS), dict(AGENT_TIERS), dict(TASK_TIERS)
+        path = os.getenv("MODEL_ROUTING_CONFIG")
+        if path:
+            try:
+                with open(path, "r") as f:
+                    config = json.load(f)
+                for name, tier in config.get("tiers", {}).items():
+                    tiers[name] = {**tiers.get(name, {}), **tier}
+                agent_tiers.update(config.get("agents", {}))
+                task_tiers.update(config.get("tasks", {}))
+            except Exception as e:
+                logger.error(f"Error loading model routing config from {path}: {e}. Using the defaults.")
+        return cls(tiers, agent_tiers, task_tiers)
+
+    def effective_tier(self, tier: str) -> str:
+        """Follows the fallback chain past tiers that are currently degraded."""
+        seen = set()
+        while tier not in seen and self._degraded_until.get(tier, 0) > time.monotonic():
+            seen.add(tier)
+            fallback = self.tiers[tier].get("fallback")
+            if fallback is None:
+                break
+            tier = fallback
+        return tier
+
+    def _resolve(self, assignment: str | dict) -> tuple[str, dict]:
+        if isinstance(assignment, str):
+            assignment = {"tier": assignment}
+        tier = self.effective_tier(assignment["tier"])
+        overrides = {key: value for key, value in assignment.items() if key != "tier"}
+        return tier, overrides
+
+    def llm(self, tier: str, **overrides) -> "GoogleGenAI":
+        """
+        Returns the (cached) LLM of a tier. Clients are only built when first used, so the
+        Gemini SDK isn't imported, nor its model lookup made, for tiers nothing runs on.
+
+        Args:
+            tier (str): The tier name.
+            **overrides: Settings overriding the tier's, e.g. `temperature`.
+        """
+        config = {**self.tiers[tier], **overrides}
+        key = (config["model"], config.get("temperature"))
+        if key not in self._llms:
+            prompt_cache = get_prompt_cache()
+            if prompt_cache is not None:
+                from cached_gemini import CachedPrefixGemini
+
+                self._llms[key] = CachedPrefixGemini(
+                    model=config["model"],
+                    api_key=os.getenv("GEMINI_API_KEY"),
+                    temperature=config.get("temperature"),
+                    prompt_cache=prompt_cache,
+                )
+            else:
+                from llama_index.llms.google_genai import GoogleGenAI
+
+                self._llms[key] = GoogleGenAI(
+                    model=config["model"],
+                    api_key=os.getenv("GEMINI_API_KEY"),
+                    temperature=config.get("temperature"),
+                )
+        return self._llms[key]
+
+    def tier_for_agent(self, agent_name: str) -> str:
+        """Returns the tier an agent currently runs on, after fallbacks."""
+        return self._resolve(self.agent_tiers.get(agent_name, self.task_tiers["default"]))[0]
+
+    def llm_for_agent(self, agent_name: str) -> "GoogleGenAI":
+        """Returns the LLM an agent should currently run on."""
+        tier, overrides = self._resolve(self.agent_tiers.get(agent_name, self.task_tiers["default"]))
+        return self.llm(tier, **overrides)
+
+    def llm_for_task(self, task: str) -> "GoogleGenAI":
+        """Returns the LLM a task should currently run on."""
+        tier, overrides = self._resolve(self.task_tiers.get(task, self.task_tiers["default"]))
+        return self.llm(tier, **overrides)
+
+    def task_llm(self, task: str) -> TaskLLM:
+        """Returns an LLM-like object whose completions are routed, timed and recorded under a task."""
+        return TaskLLM(self, task)
+
+    def agent_assignments(self, agent_names: list[str]) -> dict[str, str]:
+        """Returns the current tier of each agent; a change means the agents should be rebuilt."""
+        return {name: self.tier_for_agent(name) for name in agent_names}
+
+    def record(
+        self,
+        tier: str,
+        latency: float,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        timed_out: bool = False,
+    ):
+        """
+        Records one LLM call, degrading the tier if it timed out or ran over its latency budget.
+
+        Args:
+            tier (str): The tier the call ran on.
+            latency (float): The call's latency in seconds.
+            input_tokens (Optional[int]): The prompt tokens, if known.
+            output_tokens (Optional[int]): The output tokens, if known.
+            timed_out (bool): Whether the call timed out.
+        """
+        stats = self._stats[tier]
+        stats["calls"] += 1
+        stats["timeouts"] += int(timed_out)
+        stats["input_tokens"] += input_tokens or 0
+        stats["output_tokens"] += output_tokens or 0
+        latencies = self._latencies[tier]
+        latencies.append(latency)
+        del latencies[:-500]
+
+        if timed_out or latency > self.tiers[tier].get("timeout", float("inf")):
+            if self.tiers[tier].get("fallback"):
+                logger.warning(f"Model tier '{tier}' is slow ({latency:.1f}s); falling back for {self.cooldown:.0f}s.")
+                self._degraded_until[tier] = time.monotonic() + self.cooldown
+
+    async def complete(self, task: str, prompt: str):
+        """
+        Completes a prompt on the task's tier, retrying on the fallback tier if the call times out.
+        The call is cut short at the current request's deadline, without degrading the tier.
+
+        Args:
+            task (str): The task name (a key of the task tiers).
+            prompt (str): The prompt.
+
+        Returns:
+            CompletionResponse: The LLM response.
+        """
+        assignment = self.task_tiers.get(task, self.task_tiers["default"])
+        while True:
+            tier, overrides = self._resolve(assignment)
+            tier_timeout = self.tiers[tier].get("timeout")
+            deadline_left = remaining()
+            if deadline_left is not None and deadline_left <= 0:
+                raise DeadlineExceeded("The request ran past its deadline.")
+            start = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self.llm(tier, **overrides).acomplete(prompt=prompt),
+                    timeout=tier_timeout if deadline_left is None else min(tier_timeout or deadline_left, deadline_left),
+                )
+            except asyncio.TimeoutError:
+                if deadline_left is not None and (tier_timeout is None or deadline_left < tier_timeout):
+                    # The request's deadline cut the call short; that says nothing about the tier
+                    raise DeadlineExceeded("The request ran past its deadline.") from None
+                self.record(tier, time.monotonic() - start, timed_out=True)
+                if self.effective_tier(tier) == tier:
+                    raise
+                self._stats[tier]["fallbacks"] += 1
+                continue
+
+            input_tokens, output_tokens = usage_from_raw(response.raw)
+            self.record(
+                tier,
+                time.monotonic() - start,
+                input_tokens=input_tokens if input_tokens is not None else len(prompt) // 4,
+                output_tokens=output_tokens if output_tokens is not None else len(response.text) // 4,
+            )
+            return response
+
+    def metrics(self) -> dict:
+        """Returns per-tier call counts, latencies, token usage and estimated cost."""
+        metrics = {}
+        for tier, stats in self._stats.items():
+            latencies = sorted(self._latencies[tier])
+            config = self.tiers[tier]
+            metrics[tier] = {
+                "model": config["model"],
+                "calls": int(stats["calls"]),
+                "timeouts": int(stats["timeouts"]),
+                "fallbacks": int(stats["fallbacks"]),
+                "degraded": self.effective_tier(tier) != tier,
+                "avg_latency_s": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "p95_latency_s": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+                "input_tokens": int(stats["input_tokens"]),
+                "output_tokens": int(stats["output_tokens"]),
+                "estimated_cost_usd": round(
+                    stats["input_tokens"] / 1e6 * config.get("input_cost", 0)
+                    + stats["output_tokens"] / 1e6 * config.get("output_cost", 0),
+                    6,
+                ),
+            }
+        return metrics
+
+_model_router: Optional[ModelRouter] = None
+
+def get_model_router() -> ModelRouter:
+    """Returns the shared model router, built from the environment on first use."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter.from_env()
+    return _model_router
@@ -0,0 +1,187 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedPrefix:
+    """A prompt prefix registered with the provider: its cached content name and expiry (epoch seconds)."""
+    name: str
+    expires_at: float
+
+class PromptCache:
+    """Registers stable prompt prefixes (an agent's system prompt and tool definitions) with the
+    provider's cached-content feature, so each agent hop only sends what changed since.
+
+    The registry is provider-agnostic: callers pass in how to create and extend a cached prefix.
+    A prefix is created in the background on its first use, which goes out uncached, and extended
+    while it keeps being used. Prefixes below the provider's minimum size are sent uncached; the
+    size is checked on every lookup, so a prefix that grows (new prompts or tools after the agents
+    are rebuilt) is cached once it is large enough. Prefixes the provider refuses to cache (e.g.
+    models without caching) are sent uncached for a while, then tried again.
+    """
+    def __init__(
+        self,
+        ttl: int = 3600,
+        min_tokens: int = 4096,
+        refresh_margin: float = 300,
+        retry_interval: float = 600,
+    ):
+        """
+        Args:
+            ttl (int): Seconds a cached prefix lives after being created or extended.
+            min_tokens (int): Estimated size below which prefixes aren't cached (the provider's minimum).
+            refresh_margin (float): A prefix used within this many seconds of its expiry is extended.
+            retry_interval (float): Seconds before retrying a prefix whose creation failed transiently.
+                                    Prefixes the provider refused are retried after `ttl` seconds.
+        """
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.stats = Counter()
+        self._prefixes: dict[str, CachedPrefix] = {}
+        # Prefix key -> monotonic time until which it is sent uncached
+        self._unavailable: dict[str, float] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+        # Prefixes found too small (logged once each), and the largest prefix seen, to tell whether caching can kick in
+        self._too_small: set[str] = set()
+        self._largest_prefix = 0
+
+    @staticmethod
+    def key(model: str, *parts: str) -> str:
+        """Returns the key of a prompt prefix: a hash of the model and the prefix's parts."""
+        digest = hashlib.sha256(model.encode())
+        for part in parts:
+            digest.update(b"\0" + part.encode())
+        return digest.hexdigest()
+
+    async def lookup(
+        self,
+        key: str,
+        estimated_tokens: int,
+        create: Callable[[int], Awaitable[CachedPrefix]],
+        extend: Callable[[str, int], Awaitable[float]],
+    ) -> Optional[str]:
+        """
+        Returns the cached content name of a prefix, or None if the call should go out uncached.
+
+        Args:
+            key (str): The prefix key (see `key`).
+            estimated_tokens (int): The prefix's estimated size in tokens.
+            create (Callable[[int], Awaitable[CachedPrefix]]): Creates the cached prefix, given its TTL.
+            extend (Callable[[str, int], Awaitable[float]]): Extends a cached prefix by a TTL; returns its new expiry.
+        """
+        now = time.time()
+        prefix = self._prefixes.get(key)
+        if prefix is not None and prefix.expires_at - now > 30:
+            self.stats["hits"] += 1
+            if prefix.expires_at - now < self.refresh_margin:
+                self._start(key, self._extend(key, prefix, extend))
+            return prefix.name
+
+        self._prefixes.pop(key, None)
+        if self._unavailable.get(key, 0) > time.monotonic():
+            self.stats["uncached"] += 1
+            return None
+        self._largest_prefix = max(self._largest_prefix, estimated_tokens)
+        if estimated_tokens < self.min_tokens:
+            self.stats["too_small"] += 1
+            if key not in self._too_small:
+                self._too_small.add(key)
+                logger.info(
+                    f"Prompt prefix of ~{estimated_tokens} tokens is below the {self.min_tokens}-token caching minimum; sending it uncached."
+                )
+            return None
+        self.stats["misses"] += 1
+        self._start(key, self._create(key, create))
+        return None
+
+    def _start(self, key: str, coro: Awaitable):
+        # One creation or extension per prefix at a time
+        if key in self._pending:
+            coro.close()
+            return
+        task = asyncio.create_task(coro)
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def _create(self, key: str, create: Callable[[int], Awaitable[CachedPrefix]]):
+        try:
+            self._prefixes[key] = await create(self.ttl)
+            self.stats["created"] += 1
+        except Exception as e:
+            self.stats["failures"] += 1
+            # Client errors (too small, model without caching, ...) won't go away soon; back off for longer
+            refused = 400 <= getattr(e, "code", 0) < 500
+            self._unavailable[key] = time.monotonic() + (self.ttl if refused else self.retry_interval)
+            logger.warning(f"Could not cache a prompt prefix, will retry: {e}")
+
+    async def _extend(self, key: str, prefix: CachedPrefix, extend: Callable[[str, int], Awaitable[float]]):
+        try:
+            prefix.expires_at = await extend(prefix.name, self.ttl)
+            self.stats["extended"] += 1
+        except Exception as e:
+            logger.warning(f"Could not extend cached prompt prefix {prefix.name}: {e}")
+            self.invalidate(key)
+
+    def invalidate(self, key: str):
+        """Forgets a cached prefix (e.g. the provider no longer has it); it is created again on its next use."""
+        self._prefixes.pop(key, None)
+        self.stats["invalidated"] += 1
+
+    def record_usage(self, prompt_tokens: Optional[int], cached_tokens: Optional[int]):
+        """Records the prompt and cached token counts a response reported."""
+        self.stats["prompt_tokens"] += prompt_tokens or 0
+        self.stats["cached_tokens"] += cached_tokens or 0
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["uncached"] + self.stats["too_small"]
+        return {
+            "ttl_s": self.ttl,
+            "min_tokens": self.min_tokens,
+            "largest_prefix_tokens": self._largest_prefix,
+            "too_small": self.stats["too_small"],
+            "prefixes": len(self._prefixes),
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "uncached": self.stats["uncached"] + self.stats["too_small"],
+            "created": self.stats["created"],
+            "extended": self.stats["extended"],
+            "failures": self.stats["failures"],
+            "invalidated": self.stats["invalidated"],
+            "prompt_tokens": self.stats["prompt_tokens"],
+            "cached_tokens": self.stats["cached_tokens"],
+        }
+
+def prompt_cache_from_env() -> Optional[PromptCache]:
+    """
+    Builds the prompt prefix cache from the `PROMPT_CACHE` (`on`, the default, or `off`),
+    `PROMPT_CACHE_TTL` (seconds, default 3600) and `PROMPT_CACHE_MIN_TOKENS` (default 4096)
+    environment variables. Returns None if it is disabled.
+    """
+    if os.getenv("PROMPT_CACHE", "on").strip().lower() in ("off", "false", "0", "none"):
+        return None
+    return PromptCache(
+        ttl=int(os.getenv("PROMPT_CACHE_TTL", "3600")),
+        min_tokens=int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "4096")),
+    )
+
+_prompt_cache: Optional[PromptCache] = None
+_prompt_cache_loaded = False
+
+def get_prompt_cache() -> Optional[PromptCache]:
+    """Returns the shared prompt prefix cache, built from the environment on first use (None if disabled)."""
+    global _prompt_cache, _prompt_cache_loaded
+    if not _prompt_cache_loaded:
+        _prompt_cache = prompt_cache_from_env()
+        _prompt_cache_loaded = True
+    return _prompt_cache
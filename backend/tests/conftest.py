@@ -0,0 +1,20 @@
+import os
+import sys
+
+# The backend's modules (`app`, `llms`, `tools`, ...) are imported from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.codec import Codec
+from app.store import FileContextStore, RedisContextStore, SQLiteContextStore
+
+@pytest.fixture(params=["file", "sqlite", "redis"])
+def store(request, tmp_path):
+    """A context store of each backend, with short leases; Redis is stood in for by fakeredis."""
+    kwargs = {"codec": Codec("auto"), "lock_ttl": 0.5, "poll_interval": 0.01}
+    if request.param == "file":
+        return FileContextStore(str(tmp_path / "contexts"), **kwargs)
+    if request.param == "sqlite":
+        return SQLiteContextStore(str(tmp_path / "contexts.db"), **kwargs)
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisContextStore(fakeredis.FakeRedis(), **kwargs)
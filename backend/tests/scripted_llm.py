@@ -0,0 +1,79 @@
+import asyncio
+from typing import Any, Callable, Optional, Sequence, Union
+from llama_index.core.llms import ChatMessage, ChatResponse, CompletionResponse, LLMMetadata, MessageRole
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import ToolSelection
+from pydantic import PrivateAttr
+
+# A reply is either the assistant's text, or the tool calls it makes
+Reply = Union[str, list[ToolSelection]]
+
+def tool_call(name: str, **kwargs) -> ToolSelection:
+    """Builds a tool call for a scripted reply."""
+    return ToolSelection(tool_id=name, tool_name=name, tool_kwargs=kwargs)
+
+def handoff(to_agent: str, reason: str = "next") -> ToolSelection:
+    """Builds a hand-off for a scripted reply."""
+    return tool_call("handoff", to_agent=to_agent, reason=reason)
+
+class ScriptedLLM(FunctionCallingLLM):
+    """A mock function-calling LLM for workflow tests: each call is answered by `script`, given the
+    messages sent, with the assistant's text or the tool calls it makes."""
+    _script: Callable[[Sequence[ChatMessage]], Reply] = PrivateAttr()
+
+    def __init__(self, script: Callable[[Sequence[ChatMessage]], Reply], **kwargs: Any):
+        super().__init__(**kwargs)
+        self._script = script
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(is_function_calling_model=True, model_name="scripted")
+
+    def _prepare_chat_with_tools(self, tools, user_msg=None, chat_history=None, **kwargs) -> dict:
+        messages = list(chat_history or [])
+        if user_msg is not None:
+            messages.append(user_msg if isinstance(user_msg, ChatMessage) else ChatMessage(role="user", content=user_msg))
+        return {"messages": messages, "tools": tools}
+
+    def get_tool_calls_from_response(self, response: ChatResponse, error_on_no_tool_call: bool = True, **kwargs) -> list[ToolSelection]:
+        return response.message.additional_kwargs.get("tool_calls", [])
+
+    def _reply(self, messages: Sequence[ChatMessage]) -> ChatResponse:
+        reply = self._script(messages)
+        calls = [] if isinstance(reply, str) else reply
+        message = ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=reply if isinstance(reply, str) else "",
+            additional_kwargs={"tool_calls": calls},
+        )
+        return ChatResponse(message=message, raw={})
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        await asyncio.sleep(0)
+        return self._reply(messages)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        response = await self.achat(messages)
+
+        async def stream():
+            yield ChatResponse(message=response.message, delta=response.message.content, raw={})
+
+        return stream()
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=self._reply([ChatMessage(role="user", content=prompt)]).message.content or "")
+
+    def chat(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def complete(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def stream_chat(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def stream_complete(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def astream_complete(self, *args, **kwargs):
+        raise NotImplementedError
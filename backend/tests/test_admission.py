@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import app as api
+from app.admission import AdmissionController, AdmissionRejected
+
+async def hold(controller: AdmissionController, user: str, release: asyncio.Event, admitted: list[str], **kwargs):
+    async with controller.admit(user, **kwargs):
+        admitted.append(user)
+        await release.wait()
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_waiters_are_admitted_round_robin_across_users():
+    async def main():
+        controller = AdmissionController(max_concurrent=1, max_queue=8, max_queue_per_user=4)
+        release, admitted = asyncio.Event(), []
+        holder = asyncio.create_task(hold(controller, "holder", release, admitted))
+        await settle()
+        # One user's burst, then another user's single request
+        waiters = [asyncio.create_task(hold(controller, user, release, admitted)) for user in ["a", "a", "a", "b"]]
+        await settle()
+        assert controller.metrics()["queue_depth_by_user"] == {"a": 3, "b": 1}
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return admitted, controller.metrics()
+
+    admitted, metrics = asyncio.run(main())
+    assert admitted == ["holder", "a", "b", "a", "a"]
+    assert (metrics["active"], metrics["queue_depth"], metrics["admitted"]) == (0, 0, 5)
+
+def test_full_queues_are_rejected_up_front():
+    async def main():
+        controller = AdmissionController(max_concurrent=1, max_queue=3, max_queue_per_user=1)
+        release, admitted = asyncio.Event(), []
+        tasks = [asyncio.create_task(hold(controller, user, release, admitted)) for user in ["holder", "a", "b"]]
+        await settle()
+        with pytest.raises(AdmissionRejected) as user_full:
+            async with controller.admit("a"):
+                pass
+        tasks.append(asyncio.create_task(hold(controller, "d", release, admitted)))
+        await settle()
+        with pytest.raises(AdmissionRejected) as queue_full:
+            async with controller.admit("c"):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return user_full.value, queue_full.value, controller.metrics()
+
+    user_full, queue_full, metrics = asyncio.run(main())
+    assert user_full.reason == "user_queue_full"
+    assert queue_full.reason == "queue_full"
+    assert queue_full.retry_after >= 1
+    assert (metrics["rejected_user_queue_full"], metrics["rejected_queue_full"]) == (1, 1)
+
+def test_requests_that_would_miss_their_deadline_are_rejected():
+    async def main():
+        controller = AdmissionController(max_concurrent=1)
+        controller.avg_run_time = 60
+        release, admitted = asyncio.Event(), []
+        holder = asyncio.create_task(hold(controller, "holder", release, admitted))
+        await settle()
+        with pytest.raises(AdmissionRejected) as deadline:
+            async with controller.admit("a", timeout=10):
+                pass
+        # A request that can wait long enough queues, and gives up when its own timeout passes
+        controller.avg_run_time = 0.01
+        with pytest.raises(AdmissionRejected) as timeout:
+            async with controller.admit("a", timeout=0.05):
+                pass
+        queue_depth = controller.queue_depth
+        release.set()
+        await holder
+        return deadline.value, timeout.value, queue_depth
+
+    deadline, timeout, queue_depth = asyncio.run(main())
+    assert deadline.reason == "deadline"
+    assert timeout.reason == "timeout"
+    assert queue_depth == 0
+
+def test_background_work_waits_instead_of_being_rejected():
+    async def main():
+        controller = AdmissionController(max_concurrent=1, max_queue=0)
+        controller.avg_run_time = 0.01
+        release, admitted = asyncio.Event(), []
+        holder = asyncio.create_task(hold(controller, "holder", release, admitted))
+        await settle()
+        background = asyncio.create_task(hold(controller, "job:a", release, admitted, background=True))
+        await settle()
+        assert admitted == ["holder"]
+        release.set()
+        await asyncio.wait_for(asyncio.gather(holder, background), timeout=5)
+        return admitted, controller.metrics()
+
+    admitted, metrics = asyncio.run(main())
+    assert admitted == ["holder", "job:a"]
+    assert metrics["background_deferred"] >= 1
+    assert metrics["admitted_background"] == 1
+
+def test_chat_is_turned_away_with_retry_after(monkeypatch):
+    async def chat(message: str):
+        raise AssertionError("A rejected request must not run")
+
+    # Every slot is taken and there is no room to queue
+    monkeypatch.setattr(api.admission, "active", api.admission.max_concurrent)
+    monkeypatch.setattr(api.admission, "max_queue", 0)
+    monkeypatch.setattr(api.admission, "avg_run_time", 42)
+    monkeypatch.setattr(api.wflw, "chat", chat)
+
+    response = TestClient(api.app).post("/chat", json={"message": "hi"})
+    assert response.status_code == 503
+    assert "queue_full" in response.json()["detail"]
+    assert int(response.headers["Retry-After"]) >= 1
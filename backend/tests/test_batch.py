@@ -0,0 +1,84 @@
+import asyncio
+import re
+import pytest
+from llama_index.core.agent.workflow import AgentWorkflow, FunctionAgent
+from llama_index.core.workflow import Context
+from app.batch import BatchRunner
+from scripted_llm import ScriptedLLM
+
+class ResearchMemory:
+    """An empty research memory, so every topic starts without a stored brief."""
+    def find(self, topic: str, limit: int = 1) -> list[dict]:
+        return []
+
+class BatchWorkflow:
+    """Stands in for `Workflow`: runs batch items by writing the state their agents would, and records the research."""
+    def __init__(self, fail_research_for: tuple[str, ...] = ()):
+        agent = FunctionAgent(name="ManagerAgent", description="Manages.", llm=ScriptedLLM(lambda messages: "done"))
+        self.workflow = AgentWorkflow(agents=[agent])
+        self.research_memory = ResearchMemory()
+        self.fail_research_for = fail_research_for
+        self.researched = []
+        self.messages = []
+
+    async def run(self, message: str, session, persist: bool = True) -> str:
+        self.messages.append(message)
+        if session.ctx is None:
+            session.ctx = Context(self.workflow)
+        state = await session.ctx.get("state", default={"intel_briefing": {}})
+        key = re.search(r"key `(\w+)`", message).group(1)
+        if "Research the topic" in message:
+            self.researched.append(key)
+            # Long enough for the other items on the topic to be waiting on it
+            await asyncio.sleep(0.05)
+            if key in self.fail_research_for:
+                raise RuntimeError("research failed")
+            state["intel_briefing"][key] = f"brief on {key}"
+        if "blog post draft" in message:
+            state.setdefault("blog_posts", {})[key] = f"post from {state['intel_briefing'][key]}"
+        await session.ctx.set("state", state)
+        return "done"
+
+    async def update_stored_context(self, session):
+        pass
+
+async def collect(runner: BatchRunner, topics: list[str], content_types: list[str]) -> list[dict]:
+    return sorted([result async for result in runner.run(topics, content_types)], key=lambda result: result["index"])
+
+def test_items_on_one_topic_share_research_without_asking_for_the_brief():
+    workflow = BatchWorkflow()
+    runner = BatchRunner(workflow, concurrency=4)
+    results = asyncio.run(collect(runner, ["Solar power", "solar power", "Wind farms"], ["blog"]))
+
+    assert sorted(workflow.researched) == ["solar_power", "wind_farms"]
+    assert [result["status"] for result in results] == ["succeeded"] * 3
+    assert [result["reused_research"] for result in results] == [False, True, False]
+    assert results[1]["artifacts"] == {"blog_posts": {"solar_power": "post from brief on solar_power"}}
+    # Only the requested content is returned
+    assert all("brief" not in result and "intel_briefing" not in result["artifacts"] for result in results)
+    assert runner.metrics()["research_runs"] == 2
+    assert runner.metrics()["research_reused"] == 1
+
+def test_brief_only_followers_reuse_the_brief_without_running():
+    workflow = BatchWorkflow()
+    runner = BatchRunner(workflow, concurrency=4)
+    results = asyncio.run(collect(runner, ["Solar power", "solar power"], ["brief"]))
+
+    assert len(workflow.messages) == 1
+    assert results[1]["reused_research"]
+    assert results[1]["artifacts"] == {"intel_briefing": {"solar_power": "brief on solar_power"}}
+
+def test_followers_research_when_the_leader_fails():
+    workflow = BatchWorkflow(fail_research_for=("solar_power",))
+    runner = BatchRunner(workflow, concurrency=4)
+    results = asyncio.run(collect(runner, ["Solar power", "solar power"], ["blog"]))
+
+    assert results[0]["status"] == "failed"
+    assert workflow.researched == ["solar_power", "solar_power"]
+    assert results[1]["status"] == "failed"
+    assert runner.metrics()["items_failed"] == 2
+
+@pytest.mark.parametrize("topics,content_types", [([], ["blog"]), (["a"], ["poem"]), (["a", "b", "c"], ["blog"])])
+def test_invalid_batches_are_rejected(topics, content_types):
+    with pytest.raises(ValueError):
+        BatchRunner(BatchWorkflow(), max_items=2).validate(topics, content_types)
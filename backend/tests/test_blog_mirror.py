@@ -0,0 +1,119 @@
+import pytest
+from tools.blog_mirror import BlogMirror, title_key
+
+errors = pytest.importorskip("googleapiclient.errors")
+httplib2 = pytest.importorskip("httplib2")
+
+def post(post_id: str, title: str, content: str, updated: str) -> dict:
+    return {"id": post_id, "title": title, "content": content, "updated": updated, "status": "LIVE", "labels": ["energy"]}
+
+class FakeBlogger:
+    """Serves a blog's posts the way `posts().list` does: newest update first, paged, with an ETag."""
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self.requests = []
+
+    def posts(self):
+        return self
+
+    def list(self, blogId, orderBy, maxResults, pageToken=None, **kwargs):
+        return FakeRequest(self, int(pageToken or 0), maxResults)
+
+    @property
+    def etag(self) -> str:
+        return str(hash(tuple((item["id"], item["updated"]) for item in self.items)))
+
+class FakeRequest:
+    def __init__(self, blog: FakeBlogger, start: int, size: int):
+        self.blog = blog
+        self.start = start
+        self.size = size
+        self.headers = {}
+
+    def execute(self):
+        self.blog.requests.append(self.start)
+        if self.headers.get("If-None-Match") == self.blog.etag:
+            raise errors.HttpError(httplib2.Response({"status": 304}), b"")
+        items = sorted(self.blog.items, key=lambda item: item["updated"], reverse=True)
+        response = {"items": items[self.start:self.start + self.size], "etag": self.blog.etag}
+        if self.start + self.size < len(items):
+            response["nextPageToken"] = str(self.start + self.size)
+        return response
+
+POSTS = [
+    post("1", "Solar Power Explained", "<p>Panels turn <b>sunlight</b> into electricity.</p>", "2026-01-01T00:00:00Z"),
+    post("2", "Wind Farms", "<p>Turbines work best offshore, with steady wind.</p>", "2026-01-02T00:00:00Z"),
+    post("3", "Storage", "<p>Batteries smooth out solar and wind output.</p>", "2026-01-03T00:00:00Z"),
+]
+
+@pytest.fixture
+def mirror(tmp_path):
+    return BlogMirror(path=str(tmp_path / "mirror.db"), page_size=2)
+
+def test_search_ranks_title_matches_first(mirror):
+    mirror.sync(FakeBlogger(list(POSTS)), "blog")
+
+    results = mirror.search("blog", "solar")
+    assert [item["id"] for item in results] == ["1", "3"]
+    # Markup is stripped before indexing, and bodies are only searched, not returned
+    assert "<b>" not in results[0]["snippet"] and "sunlight" in results[0]["snippet"]
+    assert "body" not in results[0]
+    assert results[0]["labels"] == ["energy"]
+    assert mirror.search("other-blog", "solar") == []
+
+def test_title_lookup_ignores_case_and_punctuation(mirror):
+    mirror.sync(FakeBlogger(list(POSTS)), "blog")
+
+    assert title_key("  Solar power,  EXPLAINED! ") == "solar power explained"
+    assert [item["id"] for item in mirror.find_by_title("blog", "solar power explained")] == ["1"]
+    assert mirror.find_by_title("blog", "Solar") == []
+
+def test_unchanged_blog_costs_one_not_modified_request(mirror):
+    blog = FakeBlogger(list(POSTS))
+    mirror.sync(blog, "blog")
+    blog.requests.clear()
+
+    assert mirror.sync(blog, "blog")
+    assert blog.requests == [0]
+    assert mirror.metrics()["not_modified"] == 1
+
+def test_incremental_sync_stops_at_mirrored_posts(mirror):
+    older = [post(f"0{day}", f"Archive {day}", "<p>Old news.</p>", f"2025-12-0{day}T00:00:00Z") for day in (1, 2)]
+    blog = FakeBlogger(older + POSTS)
+    mirror.sync(blog, "blog")
+    blog.items.append(post("4", "Hydro", "<p>Dams store energy.</p>", "2026-01-04T00:00:00Z"))
+    blog.requests.clear()
+
+    assert mirror.sync(blog, "blog")
+    # The second page reaches posts older than the last sync; the third is never listed
+    assert blog.requests == [0, 2]
+    assert [item["id"] for item in mirror.search("blog", "dams")] == ["4"]
+    assert mirror.metrics()["posts"] == 6
+
+def test_full_sync_drops_posts_deleted_elsewhere(mirror):
+    blog = FakeBlogger(list(POSTS))
+    mirror.sync(blog, "blog")
+    blog.items = [item for item in blog.items if item["id"] != "2"]
+
+    mirror.sync(blog, "blog", full=True)
+    assert mirror.search("blog", "turbines") == []
+    assert mirror.metrics()["posts"] == 2
+
+def test_writes_through_the_app_update_the_index(mirror):
+    mirror.sync(FakeBlogger(list(POSTS)), "blog")
+
+    mirror.record_write("blog", post("2", "Offshore Wind", "<p>Floating turbines.</p>", "2026-01-05T00:00:00Z"))
+    assert [item["title"] for item in mirror.search("blog", "floating")] == ["Offshore Wind"]
+    assert mirror.search("blog", "steady") == []
+
+    mirror.record_delete("blog", "2")
+    assert mirror.search("blog", "floating") == []
+    assert mirror.find_by_title("blog", "Offshore Wind") == []
+
+def test_stale_mirror_is_served_when_sync_fails(mirror, monkeypatch):
+    mirror.max_staleness = 0
+    assert not mirror.ensure_fresh(None, "blog")
+    mirror.sync(FakeBlogger(list(POSTS)), "blog")
+
+    monkeypatch.setattr(mirror, "sync", lambda service, blog_id: False)
+    assert mirror.ensure_fresh(object(), "blog")
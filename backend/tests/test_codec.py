@@ -0,0 +1,97 @@
+import json
+import os
+import pytest
+from app.codec import (
+    BINARY_EXTENSION,
+    JSON_EXTENSION,
+    MAGIC,
+    Codec,
+    available_compressions,
+    available_serializers,
+    codec_from_env,
+    decode,
+    read_document,
+    write_document,
+)
+
+SPECS = [
+    f"{serializer}+{compression}" if compression != "none" else serializer
+    for serializer in available_serializers()
+    for compression in available_compressions()
+]
+DOCUMENT = {
+    "state": {"intel_briefing": {"solar": "Panels ☀️ convert sunlight."}, "scripts": {}},
+    "history": ["Human: hi", "AI: hello"],
+    "numbers": [0, -1, 2.5, 10 ** 12],
+    "flags": [True, False, None],
+}
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_round_trip(spec):
+    codec = Codec(spec)
+    data = codec.encode(DOCUMENT)
+
+    assert decode(data) == DOCUMENT
+    assert codec.spec == spec
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_header_names_the_format(spec):
+    codec = Codec(spec)
+    data = codec.encode(DOCUMENT)
+
+    if spec == "json":
+        # Plain JSON stays readable by versions without codecs
+        assert not data.startswith(MAGIC)
+        assert json.loads(data) == DOCUMENT
+    else:
+        assert data.startswith(MAGIC)
+
+def test_legacy_json_is_detected():
+    assert decode(json.dumps(DOCUMENT).encode()) == DOCUMENT
+
+@pytest.mark.parametrize("data", [MAGIC + bytes([9, 0]) + b"{}", MAGIC + bytes([0, 9]) + b"{}"])
+def test_unknown_format_ids_are_rejected(data):
+    with pytest.raises(ValueError):
+        decode(data)
+
+def test_unavailable_codec_is_rejected():
+    with pytest.raises(ValueError):
+        Codec("pickle")
+    with pytest.raises(ValueError):
+        Codec("json+brotli")
+
+def test_documents_switch_format_in_place(tmp_path):
+    stem = str(tmp_path / "ctx")
+    assert write_document(stem, {"v": 1}, Codec("json")) == stem + JSON_EXTENSION
+
+    # Rewriting with a binary codec replaces the JSON copy, and reading finds whichever exists
+    assert write_document(stem, {"v": 2}, Codec("json+zlib")) == stem + BINARY_EXTENSION
+    assert not os.path.exists(stem + JSON_EXTENSION)
+    assert read_document(stem) == {"v": 2}
+
+    write_document(stem, {"v": 3}, Codec("json"))
+    assert not os.path.exists(stem + BINARY_EXTENSION)
+    assert read_document(stem) == {"v": 3}
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == ["ctx.json"]
+
+def test_missing_document_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_document(str(tmp_path / "ctx"))
+
+def test_failed_write_keeps_the_old_document(tmp_path):
+    stem = str(tmp_path / "ctx")
+    write_document(stem, {"v": 1}, Codec("json"))
+
+    with pytest.raises(TypeError):
+        write_document(stem, {"v": object()}, Codec("json"))
+    assert read_document(stem) == {"v": 1}
+    assert sorted(os.listdir(tmp_path)) == ["ctx.json"]
+
+def test_invalid_env_codec_falls_back_to_json(monkeypatch):
+    monkeypatch.setenv("CONTEXT_CODEC", "pickle")
+    assert codec_from_env().spec == "json"
+    monkeypatch.setenv("CONTEXT_CODEC", "json+zlib")
+    monkeypatch.setenv("CONTEXT_CODEC_LEVEL", "9")
+    codec = codec_from_env()
+    assert (codec.spec, codec.level) == ("json+zlib", 9)
@@ -0,0 +1,86 @@
+import time
+import asyncio
+import pytest
+from tools.deadline import DeadlineExceeded, deadline_scope, enforce_deadline, remaining, timeout_for, with_deadline
+
+def publish(title: str) -> str:
+    time.sleep(0.2)
+    return f"published {title}"
+
+async def search(query: str) -> str:
+    await asyncio.sleep(0.2)
+    return f"results for {query}"
+
+def test_without_a_deadline_calls_run_to_completion():
+    assert remaining() is None
+    assert timeout_for(30) == 30
+    assert asyncio.run(with_deadline(search)("solar")) == "results for solar"
+
+def test_nested_scopes_only_tighten_the_deadline():
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining() <= 10
+            assert timeout_for(30) <= 10
+            assert timeout_for(1) == 1
+        with deadline_scope(1):
+            assert remaining() <= 1
+        with deadline_scope(None):
+            assert 1 < remaining() <= 10
+    assert remaining() is None
+
+@pytest.mark.parametrize("fn", [publish, search])
+def test_overrunning_calls_return_an_error(fn):
+    async def main():
+        with deadline_scope(0.05):
+            return await with_deadline(fn)("solar")
+
+    assert asyncio.run(main()) == f"Error: {fn.__name__} did not finish before the request's deadline."
+
+def test_side_effect_tools_say_to_verify_before_retrying():
+    async def main():
+        with deadline_scope(0.05):
+            return await with_deadline(publish, verify_with="list_blog_posts")("solar")
+
+    result = asyncio.run(main())
+    assert "may have completed" in result
+    assert "Verify with list_blog_posts before retrying." in result
+
+def test_calls_after_the_deadline_never_start():
+    calls = []
+
+    def lookup(topic: str) -> str:
+        calls.append(topic)
+        return topic
+
+    async def main():
+        with deadline_scope(0):
+            return await with_deadline(lookup)("solar")
+
+    assert asyncio.run(main()) == "Error: the request's deadline passed before lookup could run."
+    assert not calls
+
+def test_enforce_deadline_cancels_the_block():
+    async def main():
+        with deadline_scope(0.05):
+            async with enforce_deadline():
+                await asyncio.sleep(1)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert time.monotonic() - started < 0.5
+
+def test_enforce_deadline_leaves_other_cancellations_alone():
+    async def main():
+        with deadline_scope(10):
+            async with enforce_deadline():
+                await asyncio.sleep(1)
+
+    async def cancel():
+        task = asyncio.create_task(main())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
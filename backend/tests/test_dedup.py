@@ -0,0 +1,51 @@
+import pytest
+from tools.dedup import article_shingles, cluster_near_duplicates, dedupe_articles
+
+pytest.importorskip("numpy")
+
+WIRE = "Global solar capacity grew by a record amount last year as panel prices kept falling, according to a new industry report."
+
+def article(title: str, description: str, source: str, published: str = "2026-01-01T00:00:00Z", content: str = "") -> dict:
+    return {"title": title, "description": description, "source": {"name": source}, "publishedAt": published, "content": content}
+
+ARTICLES = [
+    article("Solar capacity hits a record - Reuters", WIRE, "Reuters", "2026-01-02T00:00:00Z"),
+    article("Central bank holds rates steady", "The central bank left interest rates unchanged on Tuesday.", "BBC"),
+    article("Solar capacity hits a record | Yahoo News", WIRE, "Yahoo News", "2026-01-01T00:00:00Z"),
+    article("Solar capacity hits a record - MSN", WIRE, "MSN", "2026-01-03T00:00:00Z", content="Full text of the story."),
+]
+
+def test_outlet_suffixes_are_ignored():
+    assert article_shingles(ARTICLES[0]) == article_shingles(ARTICLES[2])
+    assert "a record" in article_shingles(ARTICLES[0])
+    assert not any("reuters" in shingle for shingle in article_shingles(ARTICLES[0]))
+
+def test_syndicated_copies_are_clustered():
+    assert cluster_near_duplicates(ARTICLES) == [[0, 2, 3], [1]]
+
+def test_clusters_span_comparison_blocks():
+    assert cluster_near_duplicates(ARTICLES, block=1) == [[0, 2, 3], [1]]
+
+def test_the_most_detailed_copy_represents_its_cluster():
+    kept, dropped = dedupe_articles(ARTICLES)
+
+    assert dropped == 2
+    # Representatives keep the position of their cluster's first article
+    assert [item["source"]["name"] for item in kept] == ["MSN", "BBC"]
+    assert kept[0]["duplicates"] == 2
+    assert kept[0]["also_reported_by"] == ["Reuters", "Yahoo News"]
+    assert "duplicates" not in kept[1]
+
+def test_earliest_copy_wins_among_equals():
+    kept, _ = dedupe_articles(ARTICLES[:3])
+    assert kept[0]["source"]["name"] == "Yahoo News"
+
+def test_articles_without_text_are_kept():
+    articles = [article("", "", "A"), article("", "", "B"), ARTICLES[1]]
+    kept, dropped = dedupe_articles(articles)
+    assert (len(kept), dropped) == (3, 0)
+
+def test_distinct_stories_stay_apart_at_a_strict_threshold():
+    rewrite = article("Solar capacity hits a record", WIRE.replace("grew by", "rose by"), "AP")
+    assert cluster_near_duplicates([ARTICLES[0], rewrite], threshold=0.6) == [[0, 1]]
+    assert cluster_near_duplicates([ARTICLES[0], rewrite], threshold=1.0) == [[0], [1]]
@@ -0,0 +1,119 @@
+import asyncio
+from llama_index.core.agent.workflow import FunctionAgent
+from llama_index.core.tools import FunctionTool
+from app.handoffs import PARTIAL_ANSWER, GuardedAgentWorkflow, HandoffBudget
+from scripted_llm import ScriptedLLM, handoff, tool_call
+
+def fetch_news(topic: str) -> str:
+    """Fetches the headlines on a topic."""
+    return f"headlines about {topic}"
+
+def escalated(messages) -> bool:
+    return "hand-off budget for this request is exhausted" in str(messages[-1].content)
+
+def has_tool_output(messages) -> bool:
+    return any(message.role == "tool" and "headlines" in str(message.content) for message in messages)
+
+def build(budget: HandoffBudget, manager_script, news_script) -> GuardedAgentWorkflow:
+    manager = FunctionAgent(
+        name="ManagerAgent",
+        description="Plans the work and answers the user.",
+        system_prompt="You are the manager.",
+        llm=ScriptedLLM(manager_script),
+        can_handoff_to=["NewsAgent"],
+    )
+    news = FunctionAgent(
+        name="NewsAgent",
+        description="Fetches news.",
+        system_prompt="You fetch news.",
+        tools=[FunctionTool.from_defaults(fn=fetch_news)],
+        llm=ScriptedLLM(news_script),
+        can_handoff_to=["ManagerAgent"],
+    )
+    return GuardedAgentWorkflow(agents=[manager, news], root_agent="ManagerAgent", budget=budget)
+
+def run(workflow: GuardedAgentWorkflow, message: str = "what's new in AI?") -> str:
+    async def main() -> str:
+        return str(await workflow.run(user_msg=message))
+
+    return asyncio.run(main())
+
+def bouncing_manager(messages):
+    # Keeps sending the request back to the news agent, and answers once escalated
+    return "final answer" if escalated(messages) else [handoff("NewsAgent")]
+
+def bouncing_news(messages):
+    # Hands straight back without fetching anything
+    return [handoff("ManagerAgent")]
+
+def test_progress_resets_idle_cycles():
+    def manager(messages):
+        return "here is the summary" if has_tool_output(messages) else [handoff("NewsAgent")]
+
+    def news(messages):
+        return [handoff("ManagerAgent")] if has_tool_output(messages) else [tool_call("fetch_news", topic="AI")]
+
+    budget = HandoffBudget(max_hops=6, max_idle_cycles=0)
+    response = run(build(budget, manager, news))
+
+    assert "here is the summary" in response
+    assert dict(budget.outcomes) == {"completed": 1}
+    last = budget.recent[-1]
+    assert last["path"] == ["ManagerAgent", "NewsAgent", "ManagerAgent"]
+    assert last["hops"] == 2
+    assert budget.stats["idle_cycles"] == 0
+
+def test_idle_cycles_escalate_to_root_agent():
+    budget = HandoffBudget(max_hops=10, max_idle_cycles=1)
+    response = run(build(budget, bouncing_manager, bouncing_news))
+
+    assert "final answer" in response
+    assert dict(budget.outcomes) == {"escalated": 1}
+    last = budget.recent[-1]
+    # Manager -> News is fine; News -> Manager is the first idle cycle, Manager -> News the second
+    assert last["path"] == ["ManagerAgent", "NewsAgent", "ManagerAgent", "NewsAgent"]
+    assert budget.stats["idle_cycles"] == 2
+    assert budget.handoffs["ManagerAgent -> NewsAgent"] == 2
+
+def test_tool_calls_in_escalation_step_stop_the_run():
+    def manager(messages):
+        # Tries to hand off again even after the escalation note
+        return [handoff("NewsAgent")]
+
+    budget = HandoffBudget(max_hops=10, max_idle_cycles=1)
+    response = run(build(budget, manager, bouncing_news))
+
+    assert response.startswith(PARTIAL_ANSWER.format(reason="agents kept handing off without new tool output"))
+    assert dict(budget.outcomes) == {"stopped": 1}
+
+def test_stop_without_escalation():
+    budget = HandoffBudget(max_hops=10, max_idle_cycles=1, escalate=False)
+    response = run(build(budget, bouncing_manager, bouncing_news))
+
+    assert response.startswith("I had to stop before finishing this request")
+    assert "final answer" not in response
+    assert dict(budget.outcomes) == {"stopped": 1}
+
+def test_hop_limit_escalates():
+    def manager(messages):
+        if escalated(messages):
+            return "answer with what I have"
+        return [handoff("NewsAgent")]
+
+    def news(messages):
+        return [handoff("ManagerAgent")] if has_tool_output(messages) else [tool_call("fetch_news", topic="AI")]
+
+    budget = HandoffBudget(max_hops=1, max_idle_cycles=10)
+    response = run(build(budget, manager, news))
+
+    assert "answer with what I have" in response
+    assert dict(budget.outcomes) == {"escalated": 1}
+    assert budget.recent[-1]["hops"] == 2
+
+def test_token_budget_escalates():
+    budget = HandoffBudget(max_hops=10, max_tokens=1, max_idle_cycles=10)
+    response = run(build(budget, bouncing_manager, bouncing_news))
+
+    assert "final answer" in response
+    assert dict(budget.outcomes) == {"escalated": 1}
+    assert budget.recent[-1]["hops"] == 1
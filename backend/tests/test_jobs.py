@@ -0,0 +1,83 @@
+import asyncio
+from llama_index.core.agent.workflow import AgentWorkflow, FunctionAgent
+from llama_index.core.workflow import Context
+from app.jobs import JobManager
+from app.store import FileContextStore
+from scripted_llm import ScriptedLLM
+
+class JobWorkflow:
+    """Stands in for `Workflow`: answers every message and stores a brief, without running agents."""
+    def __init__(self, store):
+        agent = FunctionAgent(name="ManagerAgent", description="Manages.", llm=ScriptedLLM(lambda messages: "done"))
+        self.workflow = AgentWorkflow(agents=[agent])
+        self.store = store
+
+    def context_exists(self, ctx_id: str) -> bool:
+        return self.store.exists(ctx_id)
+
+    async def run(self, message: str, session, on_event=None, persist: bool = True) -> str:
+        session.ctx = Context(self.workflow)
+        session.ctx_id = session.ctx_id or f"ctx-{message}"
+        await session.ctx.set("state", {"intel_briefing": {message: f"brief on {message}"}})
+        return f"answered {message}"
+
+    async def update_stored_context(self, session):
+        pass
+
+class FlakyStore(FileContextStore):
+    """A file store whose job writes fail while `failing` is set."""
+    failing = False
+
+    def write_job(self, job: dict):
+        if self.failing:
+            raise OSError("disk full")
+        super().write_job(job)
+
+async def wait_for(manager: JobManager, job_id: str, timeout: float = 2) -> dict:
+    async with asyncio.timeout(timeout):
+        while True:
+            job = manager.get(job_id)
+            if job["status"] in ("succeeded", "failed", "interrupted"):
+                return job
+            await asyncio.sleep(0.01)
+
+def test_finished_jobs_are_read_from_the_store(tmp_path):
+    async def main():
+        store = FileContextStore(str(tmp_path))
+        manager = JobManager(JobWorkflow(store), store)
+        job_id = manager.submit("solar")["id"]
+        job = await wait_for(manager, job_id)
+        # A late subscriber replays the stored events
+        events = [event async for event in manager.subscribe(job_id)]
+        await manager.stop()
+        return manager, job, events
+
+    manager, job, events = asyncio.run(main())
+    assert job["status"] == "succeeded"
+    assert job["response"] == "answered solar"
+    assert job["artifacts"] == {"intel_briefing": {"solar": "brief on solar"}}
+    assert manager.jobs == {}
+    assert [event["status"] for event in events] == ["queued", "running", "succeeded"]
+
+def test_store_errors_fail_the_job_and_keep_the_worker(tmp_path):
+    async def main():
+        store = FlakyStore(str(tmp_path))
+        manager = JobManager(JobWorkflow(store), store, concurrency=1)
+        first = manager.submit("solar")["id"]
+        # Storing the `running` status fails, and so does storing the failure
+        store.failing = True
+        failed = await wait_for(manager, first)
+        store.failing = False
+
+        second = manager.submit("wind")["id"]
+        succeeded = await wait_for(manager, second)
+        await manager.stop()
+        return manager, failed, succeeded
+
+    manager, failed, succeeded = asyncio.run(main())
+    assert failed["status"] == "failed"
+    assert "disk full" in failed["error"]
+    assert succeeded["status"] == "succeeded"
+    # The failure couldn't be stored, so it stays in memory to be reported
+    assert list(manager.jobs) == [failed["id"]]
+    assert manager.metrics()["failed"] == 1
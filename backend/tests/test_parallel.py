@@ -0,0 +1,86 @@
+import asyncio
+import time
+from llama_index.core.agent.workflow import FunctionAgent, ToolCall, ToolCallResult
+from llama_index.core.tools import FunctionTool
+from llama_index.core.workflow import Context
+from app.parallel import ParallelAgentWorkflow, ToolConcurrency
+from scripted_llm import ScriptedLLM, tool_call
+
+async def lookup(x: int) -> str:
+    """Looks something up; later calls finish first."""
+    await asyncio.sleep(0.4 - x * 0.1)
+    return f"result {x}"
+
+def build(agent_limits=None, calls: int = 4) -> tuple[ParallelAgentWorkflow, ToolConcurrency]:
+    def script(messages):
+        # One step with several calls, then an answer once their results are in
+        if any(message.role == "tool" for message in messages):
+            return "done"
+        return [tool_call("lookup", x=x) for x in range(calls)]
+
+    agent = FunctionAgent(
+        name="ResearchAgent",
+        description="Looks things up.",
+        tools=[FunctionTool.from_defaults(async_fn=lookup)],
+        llm=ScriptedLLM(script),
+    )
+    concurrency = ToolConcurrency(default_limit=4, agent_limits=agent_limits)
+    return ParallelAgentWorkflow(agents=[agent], root_agent="ResearchAgent", concurrency=concurrency), concurrency
+
+async def run(workflow: ParallelAgentWorkflow) -> tuple[list[str], list[str], str]:
+    handler = workflow.run(user_msg="look these up")
+    streamed = [str(event.tool_output.content) async for event in handler.stream_events() if isinstance(event, ToolCallResult)]
+    result = await handler
+    memory = await handler.ctx.get("memory")
+    remembered = [message.content for message in await memory.aget_all() if message.role == "tool"]
+    return streamed, remembered, str(result)
+
+def test_results_are_released_in_call_order():
+    workflow, concurrency = build()
+    started = time.monotonic()
+    streamed, remembered, response = asyncio.run(run(workflow))
+    elapsed = time.monotonic() - started
+
+    expected = [f"result {x}" for x in range(4)]
+    assert streamed == expected
+    assert remembered == expected
+    assert "done" in response
+    # The calls overlapped: together they took about as long as the slowest one
+    assert elapsed < 0.8
+    metrics = concurrency.metrics()
+    assert metrics["peak_in_flight"] == 4
+    assert (metrics["steps"], metrics["parallel_steps"], metrics["calls"]) == (1, 1, 4)
+
+def test_agent_limit_serializes_calls():
+    workflow, concurrency = build(agent_limits={"ResearchAgent": 1})
+    streamed, remembered, _ = asyncio.run(run(workflow))
+
+    assert streamed == [f"result {x}" for x in range(4)]
+    assert remembered == streamed
+    assert concurrency.metrics()["peak_in_flight"] == 1
+
+def test_call_without_position_runs_as_is():
+    # A resumed run's pending tool calls weren't parsed by this workflow: they carry no position
+    workflow, concurrency = build()
+
+    async def call() -> ToolCallResult:
+        ctx = Context(workflow)
+        await ctx.set("current_agent_name", "ResearchAgent")
+        return await workflow.call_tool(ctx, ToolCall(tool_name="lookup", tool_kwargs={"x": 3}, tool_id="lookup"))
+
+    result = asyncio.run(call())
+    assert isinstance(result, ToolCallResult)
+    assert str(result.tool_output.content) == "result 3"
+    assert concurrency.metrics()["peak_in_flight"] == 0
+
+def test_unknown_tool_is_reported_to_the_agent():
+    workflow, _ = build()
+
+    async def call() -> ToolCallResult:
+        ctx = Context(workflow)
+        await ctx.set("current_agent_name", "ResearchAgent")
+        return await workflow.call_tool(ctx, ToolCall(tool_name="missing", tool_kwargs={}, tool_id="missing"))
+
+    result = asyncio.run(call())
+    assert result.tool_output.is_error
+    assert "not found" in str(result.tool_output.content)
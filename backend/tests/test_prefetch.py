@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import app.prefetch
+from app.prefetch import SpeculativePrefetcher
+from tools.cache import tool_cache
+
+running = threading.Event()
+release = threading.Event()
+calls = []
+
+@tool_cache.cached("test_lookup")
+def lookup(topic: str) -> str:
+    calls.append(topic)
+    running.set()
+    release.wait(timeout=2)
+    return f"about {topic}"
+
+def predict(topic: str):
+    return lambda message: [("test_lookup", lookup, (topic,))]
+
+def test_prefetch_settled_before_it_starts_never_runs(monkeypatch):
+    monkeypatch.setattr(app.prefetch, "predict_tool_calls", predict("solar"))
+    prefetcher = SpeculativePrefetcher()
+
+    async def main():
+        # The run ends before the prefetch task gets to a worker thread
+        prefetcher.finish(prefetcher.start("look up solar"))
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert "solar" not in calls
+    assert prefetcher.metrics()["cancelled"] == 1
+    assert "abandoned" not in prefetcher.metrics()
+
+def test_running_prefetch_is_abandoned_and_completes(monkeypatch):
+    monkeypatch.setattr(app.prefetch, "predict_tool_calls", predict("wind"))
+    prefetcher = SpeculativePrefetcher()
+    running.clear()
+    release.clear()
+
+    async def main():
+        prefetches = prefetcher.start("look up wind")
+        await asyncio.to_thread(running.wait, 2)
+        prefetcher.finish(prefetches)
+        release.set()
+
+    asyncio.run(main())
+    assert calls.count("wind") == 1
+    assert prefetcher.metrics()["abandoned"] == 1
+    assert prefetcher.metrics()["wasted"] == 1
+    assert "cancelled" not in prefetcher.metrics()
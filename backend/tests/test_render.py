@@ -0,0 +1,69 @@
+import pytest
+from tools.render import MarkdownRenderer
+
+pytest.importorskip("markdown")
+pytest.importorskip("nh3")
+
+POST = """# Solar Power Explained
+
+## Why it matters
+
+Panels are **cheap** now[^1].
+
+| Year | Price |
+|------|------:|
+| 2010 | 2.00 |
+
+```python
+print("sun")
+```
+
+[^1]: Industry report.
+"""
+
+def test_markdown_features_are_rendered():
+    html = MarkdownRenderer().render(POST, template="plain")
+
+    assert '<h2 id="why-it-matters">Why it matters</h2>' in html
+    assert "<strong>cheap</strong>" in html
+    assert '<td style="text-align:right">2.00</td>' in html
+    assert 'class="footnote"' in html
+    # Code is highlighted with inline styles rather than Pygments classes
+    assert '<span style="' in html and "sun" in html
+
+def test_leading_title_heading_is_dropped():
+    renderer = MarkdownRenderer()
+    assert "<h1" not in renderer.render(POST, title="Solar power, explained!")
+    assert "<h1" in renderer.render(POST, title="Wind Power")
+
+@pytest.mark.parametrize("markdown,forbidden", [
+    ('<script>alert("x")</script>', "<script"),
+    ('<img src="x.png" onerror="alert(1)">', "onerror"),
+    ("[click](javascript:alert(1))", "javascript:"),
+    ('<p style="position: fixed">x</p>', "position"),
+    ('<iframe src="https://example.com"></iframe>', "<iframe"),
+])
+def test_unsafe_html_is_stripped(markdown, forbidden):
+    assert forbidden not in MarkdownRenderer().render(markdown, template="plain")
+
+def test_links_are_made_safe():
+    html = MarkdownRenderer().render("[site](https://example.com)", template="plain")
+    assert 'rel="noopener noreferrer"' in html
+
+def test_templates_wrap_the_body():
+    renderer = MarkdownRenderer()
+    assert renderer.render(POST, template="article").startswith('<div class="post-article">')
+    tutorial = renderer.render(POST, template="tutorial")
+    assert '<nav class="post-toc">' in tutorial and 'href="#why-it-matters"' in tutorial
+    with pytest.raises(ValueError):
+        renderer.render(POST, template="fancy")
+
+def test_unchanged_drafts_are_served_from_the_cache():
+    renderer = MarkdownRenderer(max_entries=1)
+    first = renderer.render(POST)
+    assert renderer.render(POST) == first
+    renderer.render("Another post.")
+    renderer.render(POST)
+
+    metrics = renderer.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["cached"]) == (1, 3, 1)
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from llama_index.core.agent.workflow import AgentWorkflow, FunctionAgent
+from llama_index.core.workflow import Context
+from scripted_llm import ScriptedLLM
+from tools import revisions
+from tools.revisions import EditError, apply_delta, apply_edits, make_delta
+
+SCRIPT = """# Solar Power
+
+## Introduction
+Solar panels turn sunlight into electricity.
+They work best at noon.
+
+## Costs
+Prices fell by 90% since 2010.
+
+## Outro
+Thanks for watching!
+"""
+
+def run(coro_fn):
+    """Runs a coroutine function with a fresh context holding the script draft."""
+    async def main():
+        agent = FunctionAgent(name="YouTubeAgent", description="Writes scripts.", llm=ScriptedLLM(lambda messages: "done"))
+        ctx = Context(AgentWorkflow(agents=[agent]))
+        await ctx.set("state", {"scripts": {"Solar": SCRIPT}})
+        result = await coro_fn(ctx)
+        return result, await ctx.get("state")
+
+    return asyncio.run(main())
+
+def test_find_and_replace_tolerates_whitespace():
+    text = apply_edits(SCRIPT, [{"find": "They work   best\nat noon.", "replace": "They work on cloudy days too."}])
+    assert "They work on cloudy days too." in text
+    assert "noon" not in text
+
+def test_section_replacement_keeps_the_heading_and_later_sections():
+    text = apply_edits(SCRIPT, [{"section": "costs", "content": "Prices keep falling."}])
+    assert "## Costs\nPrices keep falling.\n\n## Outro" in text
+    assert "90%" not in text
+
+@pytest.mark.parametrize("edit", [
+    {"find": "Solar", "replace": "Wind"},
+    {"find": "geothermal", "replace": "Wind"},
+    {"find": "  ", "replace": "Wind"},
+    {"section": "Conclusion", "content": "Bye"},
+])
+def test_ambiguous_or_missing_edits_are_rejected(edit):
+    with pytest.raises(EditError):
+        apply_edits(SCRIPT, [edit])
+
+@pytest.mark.parametrize("old,new", [
+    (SCRIPT, SCRIPT.replace("noon", "midday")),
+    (SCRIPT, SCRIPT + "Subscribe!\n"),
+    (SCRIPT, "Completely different\n"),
+    ("", SCRIPT),
+    (SCRIPT, SCRIPT.replace("\n", "", 1)),
+])
+def test_delta_restores_the_older_text(old, new):
+    assert apply_delta(new, make_delta(new, old)) == old
+
+def test_delta_only_stores_changed_lines():
+    new = SCRIPT.replace("noon", "midday")
+    assert make_delta(new, SCRIPT) == [[4, 5, ["They work best at noon.\n"]]]
+
+def test_failed_edit_leaves_the_draft_unchanged():
+    result, state = run(lambda ctx: revisions.revise_video_script(
+        ctx, "Solar", find=["noon", "geothermal"], replace=["midday", "wind"],
+    ))
+    assert result.startswith("No edits applied")
+    assert state["scripts"]["Solar"] == SCRIPT
+    assert "revisions" not in state
+
+def test_revisions_are_numbered_and_restorable():
+    async def revise(ctx):
+        await revisions.revise_video_script(ctx, "Solar", find=["noon"], replace=["midday"], note="timing")
+        await revisions.revise_video_script(ctx, "Solar", sections=["Outro"], section_contents=["Subscribe!"])
+        history = await revisions.get_revision_history(ctx, "scripts", "Solar")
+        restored = await revisions.restore_revision(ctx, "scripts", "Solar", 1)
+        return history, restored
+
+    (history, restored), state = run(revise)
+    assert [entry["version"] for entry in history] == [3, 2, 1]
+    assert history[0]["current"] and history[1]["note"] == "timing"
+    assert restored.startswith("Restored version 1 of 'Solar' as version 4")
+    assert state["scripts"]["Solar"] == SCRIPT
+    assert state["revisions"]["scripts"]["Solar"]["version"] == 4
+
+def test_versions_beyond_the_history_limit_cant_be_restored(monkeypatch):
+    monkeypatch.setattr(revisions, "HISTORY_LIMIT", 2)
+
+    async def revise(ctx):
+        for word in ["dawn", "dusk", "night"]:
+            current = (await ctx.get("state"))["scripts"]["Solar"]
+            find = next(old for old in ["noon", "dawn", "dusk"] if old in current)
+            await revisions.revise_video_script(ctx, "Solar", find=[find], replace=[word])
+        return await revisions.restore_revision(ctx, "scripts", "Solar", 1)
+
+    result, state = run(revise)
+    assert result == "Version 1 can't be restored; versions 2 to 3 can."
+    assert len(state["revisions"]["scripts"]["Solar"]["deltas"]) == 2
+
+def test_revised_blog_post_is_rendered_again():
+    async def revise(ctx):
+        draft = {"content_markdown": SCRIPT, "content_html": "<p>old</p>", "template": "plain"}
+        await ctx.set("state", {"blog_posts": {"Solar": draft}})
+        return await revisions.revise_blog_post(ctx, "Solar", find=["noon"], replace=["**midday**"])
+
+    result, state = run(revise)
+    assert result.startswith("Revised 'Solar' to version 2")
+    assert "<strong>midday</strong>" in state["blog_posts"]["Solar"]["content_html"]
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from app.locks import ContextBusy, ContextRunGuard, RunSuperseded
+
+def step(events: list[str], name: str, seconds: float = 0.05):
+    """Returns a run that records when it starts, finishes or is cancelled."""
+    async def fn() -> str:
+        events.append(f"{name} started")
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+        events.append(f"{name} finished")
+        return name
+    return fn
+
+async def overlap(guard: ContextRunGuard, names: list[str], key: str = "ctx-1") -> list:
+    """Sends messages to one conversation a moment apart, while the earlier ones still run."""
+    events, tasks = [], []
+    for name in names:
+        tasks.append(asyncio.create_task(guard.run(key, step(events, name))))
+        await asyncio.sleep(0.01)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return results, events
+
+def test_queue_runs_messages_one_after_another():
+    guard = ContextRunGuard("queue")
+    results, events = asyncio.run(overlap(guard, ["first", "second"]))
+
+    assert results == ["first", "second"]
+    assert events == ["first started", "first finished", "second started", "second finished"]
+    assert guard.metrics()["queued"] == 1
+    assert guard.metrics()["busy_contexts"] == 0
+
+def test_reject_fails_the_overlapping_message():
+    guard = ContextRunGuard("reject")
+    results, events = asyncio.run(overlap(guard, ["first", "second"]))
+
+    assert results[0] == "first"
+    assert isinstance(results[1], ContextBusy)
+    assert "second started" not in events
+
+def test_cancel_previous_stops_the_running_message():
+    guard = ContextRunGuard("cancel_previous")
+    results, events = asyncio.run(overlap(guard, ["first", "second", "third"]))
+
+    assert isinstance(results[0], RunSuperseded)
+    assert isinstance(results[1], RunSuperseded)
+    assert results[2] == "third"
+    assert events == [
+        "first started", "first cancelled", "second started", "second cancelled", "third started", "third finished",
+    ]
+    assert guard.metrics()["cancelled"] == 2
+
+def test_cancel_previous_skips_messages_replaced_while_waiting():
+    async def main():
+        guard = ContextRunGuard("cancel_previous")
+        events = []
+        first = asyncio.create_task(guard.run("ctx-1", step(events, "first")))
+        await asyncio.sleep(0.01)
+        # Both arrive before the first run has wound down, so the second never gets to run
+        second = asyncio.create_task(guard.run("ctx-1", step(events, "second")))
+        third = asyncio.create_task(guard.run("ctx-1", step(events, "third")))
+        results = await asyncio.gather(first, second, third, return_exceptions=True)
+        return results, events, guard
+
+    results, events, guard = asyncio.run(main())
+    assert isinstance(results[0], RunSuperseded)
+    assert isinstance(results[1], RunSuperseded)
+    assert results[2] == "third"
+    assert events == ["first started", "first cancelled", "third started", "third finished"]
+    assert guard.metrics()["skipped"] == 1
+    assert guard.metrics()["busy_contexts"] == 0
+
+def test_conversations_run_independently():
+    async def main():
+        guard = ContextRunGuard("reject")
+        events = []
+        return await asyncio.gather(
+            guard.run("ctx-1", step(events, "first")),
+            guard.run("ctx-2", step(events, "second")),
+        )
+
+    assert asyncio.run(main()) == ["first", "second"]
+
+def test_policy_can_be_overridden_per_message():
+    async def main():
+        guard = ContextRunGuard("reject")
+        events = []
+        first = asyncio.create_task(guard.run("ctx-1", step(events, "first")))
+        await asyncio.sleep(0.01)
+        second = await guard.run("ctx-1", step(events, "second"), policy="queue")
+        return await first, second
+
+    assert asyncio.run(main()) == ("first", "second")
+
+def test_cancelling_the_caller_cancels_the_run():
+    async def main():
+        guard = ContextRunGuard("queue")
+        events = []
+        caller = asyncio.create_task(guard.run("ctx-1", step(events, "first", seconds=1)))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        return events, guard.is_busy("ctx-1")
+
+    events, busy = asyncio.run(main())
+    assert events == ["first started", "first cancelled"]
+    assert not busy
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ContextRunGuard("drop")
@@ -0,0 +1,59 @@
+from datetime import datetime
+from app.memory import ResearchMemory
+from app.search import SearchIndex
+
+# Each instance stands for a worker: they only share the store
+
+def test_workers_keep_each_others_briefs(store):
+    first, second = ResearchMemory(store), ResearchMemory(store)
+    first.record("solar_power", "Solar brief", "ctx-1")
+    second.record("wind_farms", "Wind brief", "ctx-2")
+    first.save()
+    second.save()
+
+    assert first.find("wind farms")[0]["brief"] == "Wind brief"
+    assert second.find("solar power")[0]["brief"] == "Solar brief"
+    assert set(ResearchMemory(store).entries) == {"power solar", "farms wind"}
+
+def test_newer_brief_wins(store):
+    first, second = ResearchMemory(store), ResearchMemory(store)
+    first.record("solar_power", "Old brief", "ctx-1", recorded_at=datetime(2026, 1, 1))
+    first.save()
+    second.record("solar_power", "New brief", "ctx-2", recorded_at=datetime(2026, 2, 1))
+    second.save()
+    # An older brief saved later doesn't replace the newer one
+    first.save()
+
+    assert ResearchMemory(store).find("solar power")[0]["brief"] == "New brief"
+    assert first.find("solar power")[0]["brief"] == "New brief"
+
+def test_workers_keep_each_others_contexts(store):
+    first, second = SearchIndex(store), SearchIndex(store)
+    first.index_context("ctx-1", ["Tell me about solar panels", "Solar panels convert sunlight."], {})
+    second.index_context("ctx-2", ["Tell me about wind turbines", "Turbines convert wind."], {})
+    first.save()
+    second.save()
+
+    assert {result["ctx_id"] for result in first.search("turbines")} == {"ctx-2"}
+    assert {result["ctx_id"] for result in second.search("solar")} == {"ctx-1"}
+    assert {document["ctx_id"] for document in SearchIndex(store).documents.values()} == {"ctx-1", "ctx-2"}
+
+def test_reindexed_and_removed_contexts_are_saved_over_other_copies(store):
+    first, second = SearchIndex(store), SearchIndex(store)
+    first.index_context("ctx-1", ["Tell me about solar panels", "Solar panels convert sunlight."], {})
+    first.index_context("ctx-2", ["Tell me about wind turbines", "Turbines convert wind."], {})
+    first.save()
+    second.search("solar")
+
+    # The second worker updates one context and removes the other; the first saves its stale copy later
+    second.index_context("ctx-1", ["Tell me about solar panels", "Perovskite cells are next."], {"intel_briefing": {"perovskite": "Brief"}})
+    second.remove_context("ctx-2")
+    second.save()
+    first.index_context("ctx-3", ["Tell me about tidal power", "Tides are predictable."], {})
+    first.save()
+
+    for index in (first, second, SearchIndex(store)):
+        index.refresh()
+        assert {document["ctx_id"] for document in index.documents.values()} == {"ctx-1", "ctx-3"}
+        assert [result["ctx_id"] for result in index.search("perovskite")] == ["ctx-1", "ctx-1"]
+        assert index.search("turbines") == []
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from app.store import ContextLocked, FileContextStore
+
+def test_documents_round_trip(store):
+    context = {"state": {"draft": "ünïcode", "nested": [1, 2.5, None, True]}}
+    chat_history = ["Human: hi", "AI: hello"]
+
+    assert store.saved_at("ctx-1") is None
+    store.write("ctx-1", {"ctx": context, "chat_history": chat_history})
+
+    assert store.read("ctx-1", "ctx") == context
+    assert store.read("ctx-1", "chat_history") == chat_history
+    assert store.saved_at("ctx-1") is not None
+    with pytest.raises(FileNotFoundError):
+        store.read("ctx-2", "ctx")
+
+def test_index_round_trip(store):
+    store.register("ctx-1")
+    store.register("ctx-2")
+    store.set_title("ctx-2", "Solar power")
+    # Registering again keeps the title
+    store.register("ctx-2")
+
+    assert store.load_index() == {"ctx-1": None, "ctx-2": "Solar power"}
+    assert store.exists("ctx-1")
+    assert not store.exists("ctx-3")
+
+def test_shared_documents_round_trip(store):
+    assert store.shared_saved_at("search_index") is None
+    with pytest.raises(FileNotFoundError):
+        store.read_shared("search_index")
+
+    store.write_shared("search_index", {"documents": {"ctx-1:chat:0": {"text": "hi"}}})
+    assert store.read_shared("search_index") == {"documents": {"ctx-1:chat:0": {"text": "hi"}}}
+    assert store.shared_saved_at("search_index") is not None
+
+def test_hold_is_exclusive(store):
+    with store.hold("shared:search_index"):
+        assert not store._try_lock("shared:search_index", "other", 5)
+    assert store._try_lock("shared:search_index", "other", 5)
+
+def test_jobs_round_trip(store):
+    store.write_job({"id": "b", "status": "queued", "events": []})
+    store.write_job({"id": "a", "status": "running", "events": [{"type": "AgentOutput"}]})
+    store.write_job({"id": "b", "status": "succeeded", "events": []})
+
+    assert store.job_ids() == ["a", "b"]
+    assert store.read_job("b")["status"] == "succeeded"
+    assert store.read_job("a")["events"] == [{"type": "AgentOutput"}]
+    with pytest.raises(FileNotFoundError):
+        store.read_job("c")
+
+def test_lock_is_exclusive(store):
+    async def main():
+        async with store.lock("ctx-1"):
+            with pytest.raises(ContextLocked):
+                async with store.lock("ctx-1", timeout=0.05):
+                    pass
+            # Other conversations aren't blocked
+            async with store.lock("ctx-2", timeout=0.05):
+                pass
+        async with store.lock("ctx-1", timeout=0.05):
+            pass
+
+    asyncio.run(main())
+
+def test_lock_is_renewed_while_held(store):
+    async def main():
+        async with store.lock("ctx-1"):
+            # Held for longer than the lease, which the holder keeps renewing
+            await asyncio.sleep(store.lock_ttl * 2)
+            assert not await asyncio.to_thread(store._try_lock, "ctx:ctx-1", "other", store.lock_ttl)
+
+    asyncio.run(main())
+
+def test_expired_lease_is_taken_over(store):
+    assert store._try_lock("ctx:ctx-1", "crashed", 0.1)
+    assert not store._try_lock("ctx:ctx-1", "worker", 0.1)
+    time.sleep(0.2)
+
+    assert store._try_lock("ctx:ctx-1", "worker", 5)
+    # The crashed holder can neither renew nor release the lock it lost
+    assert not store._renew_lock("ctx:ctx-1", "crashed", 5)
+    store._unlock("ctx:ctx-1", "crashed")
+    assert not store._try_lock("ctx:ctx-1", "other", 5)
+
+    store._unlock("ctx:ctx-1", "worker")
+    assert store._try_lock("ctx:ctx-1", "other", 5)
+
+def race(store, name: str, contenders: int = 16) -> list[str]:
+    """Has threads try to take a lock at the same moment; returns the tokens that got it."""
+    barrier = threading.Barrier(contenders)
+    winners = []
+
+    def contend(token: str):
+        barrier.wait()
+        if store._try_lock(name, token, 5):
+            winners.append(token)
+
+    threads = [threading.Thread(target=contend, args=(f"token-{i}",)) for i in range(contenders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return winners
+
+def test_one_contender_takes_a_free_lock(store):
+    assert len(race(store, "ctx:ctx-1")) == 1
+
+def test_one_contender_takes_an_expired_lock(store):
+    assert store._try_lock("ctx:ctx-1", "crashed", 0.05)
+    time.sleep(0.1)
+
+    winners = race(store, "ctx:ctx-1")
+    assert len(winners) == 1
+    assert not store._renew_lock("ctx:ctx-1", "crashed", 5)
+    assert store._renew_lock("ctx:ctx-1", winners[0], 5)
+
+def test_file_lock_without_a_lease_counts_as_held(tmp_path):
+    store = FileContextStore(str(tmp_path), lock_ttl=0.2)
+    # An empty lock file, as left by a worker between creating and writing it
+    open(store._lock_path("ctx:ctx-1"), "w").close()
+
+    assert not store._try_lock("ctx:ctx-1", "worker", 5)
+    os.utime(store._lock_path("ctx:ctx-1"), (time.time() - 1, time.time() - 1))
+    assert store._try_lock("ctx:ctx-1", "worker", 5)
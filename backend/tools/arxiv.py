@@ -1,5 +1,14 @@
-from llama_index.tools.arxiv import ArxivToolSpec
+import functools
+from .cache import tool_cache
 
+@functools.lru_cache(maxsize=None)
+def get_tool_spec():
+    """Returns the shared arXiv tool spec, imported and built on first use."""
+    from llama_index.tools.arxiv import ArxivToolSpec
+
+    return ArxivToolSpec()
+
+@tool_cache.cached("arxiv_query", key_fn=lambda query, sort_by: (query.strip().lower(), sort_by or "relevance"))
 def arxiv_query(query: str, sort_by: str):
     """
     A tool to query arxiv.org
@@ -11,5 +20,4 @@ def arxiv_query(query: str, sort_by: str):
         sort_by (str): Either 'relevance' (default) or 'recent'
 
     """
-    arxiv_tool = ArxivToolSpec()
-    return arxiv_tool.arxiv_query(query, sort_by=sort_by)
\ No newline at end of file
+    return get_tool_spec().arxiv_query(query, sort_by=sort_by)
\ No newline at end of file
@@ -1,12 +1,15 @@
 import os
+import time
+import random
+import asyncio
 import logging
+import threading
 from typing import Optional, List, Dict, Any
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from llama_index.core.workflow import Context
+from .blog_mirror import get_blog_mirror, title_key
+from .deadline import remaining
+from .render import DEFAULT_TEMPLATE, TEMPLATES, renderer
+from .revisions import record_revision
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,42 +17,92 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 SCOPES = ['https://www.googleapis.com/auth/blogger']
 CLIENT_SECRETS_FILE = './secrets/credentials.json'
 TOKEN_FILE = './secrets/token.json'
+# Requests per batch round trip, kept within the limits of Google's batch endpoints
+BATCH_SIZE = max(1, min(50, int(os.getenv('BLOGGER_BATCH_SIZE', '50'))))
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
 
-def get_blogger_service() -> Optional[Any]:
+# The Google client libraries are imported on first use. Services are cached per thread,
+# since the underlying HTTP client isn't thread-safe; credentials are shared.
+_services = threading.local()
+_creds_lock = threading.Lock()
+_creds = None
+
+def get_credentials(interactive: bool = True) -> Optional[Any]:
+    """Loads (refreshing or authorizing if needed) and caches the user's OAuth 2.0 credentials.
+
+    Args:
+        interactive (bool): Whether to run the browser authorization flow if there is no usable token.
+
+    Returns:
+        Optional[google.oauth2.credentials.Credentials]: The credentials, or None if authorization is impossible.
+    """
+    global _creds
+    with _creds_lock:
+        if _creds is not None:
+            return _creds
+
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+
+        creds = None
+        if os.path.exists(TOKEN_FILE):
+            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                except Exception as e:
+                    logging.error(f"Error refreshing token: {e}")
+                    if not interactive:
+                        return None
+                    flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
+                    creds = flow.run_local_server(port=0)
+            else:
+                if not os.path.exists(CLIENT_SECRETS_FILE):
+                    logging.error(f"Error: {CLIENT_SECRETS_FILE} not found. Please download it from Google Cloud Console.")
+                    return None
+                if not interactive:
+                    return None
+                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
+                creds = flow.run_local_server(port=0)
+            with open(TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
+        _creds = creds
+        return _creds
+
+def get_blogger_service(interactive: bool = True) -> Optional[Any]:
     """Authenticates the user with Google using OAuth 2.0 and returns a Blogger API v3 service object.
 
     Handles token loading, validation, refresh, and the initial authorization flow
-    using 'client_secrets.json'. Stores/updates credentials in 'token.json'.
+    using 'client_secrets.json'. Stores/updates credentials in 'token.json'. The service is
+    built once per thread and reused; expired tokens are refreshed on the next request.
 
     Requires 'client_secrets.json' (renamed from Google Cloud Console credentials.json)
     and 'token.json' (created automatically) in the './secrets/' directory.
 
+    Args:
+        interactive (bool): Whether to run the browser authorization flow if there is no usable token.
+
     Returns:
         Optional[googleapiclient.discovery.Resource]: The authenticated Blogger service object,
                                                      or None if authentication fails.
     """
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-            except Exception as e:
-                logging.error(f"Error refreshing token: {e}")
-                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
-                creds = flow.run_local_server(port=0)
-        else:
-            if not os.path.exists(CLIENT_SECRETS_FILE):
-                logging.error(f"Error: {CLIENT_SECRETS_FILE} not found. Please download it from Google Cloud Console.")
-                return None
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
+    service = getattr(_services, "blogger", None)
+    if service is not None:
+        return service
+
+    creds = get_credentials(interactive)
+    if creds is None:
+        return None
+    from googleapiclient.errors import HttpError
 
     try:
+        from googleapiclient.discovery import build
+
         service = build('blogger', 'v3', credentials=creds)
+        _services.blogger = service
         return service
     except HttpError as error:
         logging.error(f'An error occurred building the service: {error}')
@@ -70,6 +123,8 @@ def fetch_user_blogs() -> Optional[List[Dict[str, Any]]]:
                                         Returns an empty list if no blogs are found.
                                         Returns None if the service is unavailable or an API error occurs.
     """
+    from googleapiclient.errors import HttpError
+
     service = get_blogger_service()
     if not service:
         return None
@@ -90,8 +145,8 @@ def fetch_user_blogs() -> Optional[List[Dict[str, Any]]]:
 def search_blog_posts(blog_id: str, query: str) -> Optional[List[Dict[str, Any]]]:
     """Searches for posts within a specific blog that match a given query string.
 
-    Uses the authenticated service obtained from get_blogger_service().
-    Calls the Blogger API v3 'posts.search' method.
+    Searches the local mirror of the blog's posts (synced first if it is stale) when it is
+    enabled, and otherwise calls the Blogger API v3 'posts.search' method.
 
     Args:
         blog_id (str): The ID of the blog to search within.
@@ -103,7 +158,14 @@ def search_blog_posts(blog_id: str, query: str) -> Optional[List[Dict[str, Any]]
                                         Returns an empty list if no posts match the query.
                                         Returns None if the service is unavailable or an API error occurs.
     """
+    from googleapiclient.errors import HttpError
+
     service = get_blogger_service()
+    mirror = get_blog_mirror()
+    if mirror is not None and mirror.ensure_fresh(service, blog_id):
+        posts = mirror.search(blog_id, query)
+        logging.info(f"Found {len(posts)} mirrored post(s) for '{query}' in blog ID {blog_id}.")
+        return posts
     if not service:
         return None
     try:
@@ -120,23 +182,62 @@ def search_blog_posts(blog_id: str, query: str) -> Optional[List[Dict[str, Any]]
         logging.error(f'An error occurred searching posts: {error}')
         return None
 
-def create_blog_post(blog_id: str, title: str, content_html: str) -> Optional[Dict[str, Any]]:
+def find_blog_posts_by_title(blog_id: str, title: str) -> Optional[List[Dict[str, Any]]]:
+    """Finds the posts of a blog whose title matches a given title exactly.
+
+    Matching ignores case, punctuation and spacing, so it tells whether a post with a
+    title already exists (to update it rather than create a duplicate). Uses the local
+    mirror of the blog's posts, synced first if it is stale; without the mirror, filters
+    the results of 'posts.search' for the title.
+
+    Args:
+        blog_id (str): The ID of the blog to look in.
+        title (str): The post title.
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: The matching posts (containing keys like 'id', 'title', 'url', 'status').
+                                        Returns an empty list if no post has that title.
+                                        Returns None if the service is unavailable or an API error occurs.
+    """
+    mirror = get_blog_mirror()
+    if mirror is not None and mirror.ensure_fresh(get_blogger_service(), blog_id):
+        return mirror.find_by_title(blog_id, title)
+    posts = search_blog_posts(blog_id, title)
+    if posts is None:
+        return None
+    key = title_key(title)
+    return [post for post in posts if title_key(post.get("title")) == key]
+
+def _mirror_write(blog_id: str, post: Dict[str, Any]):
+    mirror = get_blog_mirror()
+    if mirror is None:
+        return
+    try:
+        mirror.record_write(blog_id, post)
+    except Exception as e:
+        logging.error(f"Error mirroring post {post.get('id')}: {e}")
+
+def create_blog_post(blog_id: str, title: str, content_markdown: str, template: str = DEFAULT_TEMPLATE) -> Optional[Dict[str, Any]]:
     """Creates a new blog post on a specified blog.
 
     Uses the authenticated service obtained from get_blogger_service().
-    Calls the Blogger API v3 'posts.insert' method.
+    Renders the Markdown content to HTML locally, then calls the Blogger API v3 'posts.insert' method.
     Should typically be called *after* user confirmation via the ManagerAgent.
 
     Args:
         blog_id (str): The ID of the blog where the post will be created.
         title (str): The title for the new blog post.
-        content_html (str): The HTML content for the new blog post.
+        content_markdown (str): The Markdown content for the new blog post.
+        template (str): The HTML template: 'article' (default), 'tutorial' (adds a table of contents) or 'plain'.
 
     Returns:
         Optional[Dict[str, Any]]: A dictionary representing the newly created post
                                   (containing keys like 'id', 'title', 'url', 'published', 'updated').
                                   Returns None if the service is unavailable or an API error occurs.
     """
+    from googleapiclient.errors import HttpError
+
+    content_html = renderer.render(content_markdown, title, template)
     service = get_blogger_service()
     if not service:
         return None
@@ -146,6 +247,7 @@ def create_blog_post(blog_id: str, title: str, content_html: str) -> Optional[Di
             "content": content_html
         }
         post = service.posts().insert(blogId=blog_id, body=post_body).execute()
+        _mirror_write(blog_id, post)
         logging.info(f"Successfully created post:")
         logging.info(f"- Title: {post['title']}")
         logging.info(f"- ID: {post['id']}")
@@ -155,24 +257,28 @@ def create_blog_post(blog_id: str, title: str, content_html: str) -> Optional[Di
         logging.error(f'An error occurred creating the post: {error}')
         return None
     
-def update_blog_post(blog_id: str, post_id: str, title: str, content_html: str) -> Optional[Dict[str, Any]]:
+def update_blog_post(blog_id: str, post_id: str, title: str, content_markdown: str, template: str = DEFAULT_TEMPLATE) -> Optional[Dict[str, Any]]:
     """Updates an existing blog post with a new title and/or content.
 
     Uses the authenticated service obtained from get_blogger_service().
-    Calls the Blogger API v3 'posts.update' method.
+    Renders the Markdown content to HTML locally, then calls the Blogger API v3 'posts.update' method.
     Should typically be called *after* user confirmation via the ManagerAgent.
 
     Args:
         blog_id (str): The ID of the blog containing the post.
         post_id (str): The ID of the post to update.
         title (str): The new title for the blog post.
-        content_html (str): The new HTML content for the blog post.
+        content_markdown (str): The new Markdown content for the blog post.
+        template (str): The HTML template: 'article' (default), 'tutorial' (adds a table of contents) or 'plain'.
 
     Returns:
         Optional[Dict[str, Any]]: A dictionary representing the updated post
                                   (containing keys like 'id', 'title', 'url', 'published', 'updated').
                                   Returns None if the service is unavailable or an API error occurs.
     """
+    from googleapiclient.errors import HttpError
+
+    content_html = renderer.render(content_markdown, title, template)
     service = get_blogger_service()
     if not service:
         return None
@@ -182,6 +288,7 @@ def update_blog_post(blog_id: str, post_id: str, title: str, content_html: str)
             "content": content_html
         }
         post = service.posts().update(blogId=blog_id, postId=post_id, body=post_body).execute()
+        _mirror_write(blog_id, post)
         logging.info(f"Successfully updated post:")
         logging.info(f"- Title: {post['title']}")
         logging.info(f"- ID: {post['id']}")
@@ -205,41 +312,292 @@ def delete_blog_post(blog_id: str, post_id: str) -> None:
     Returns:
         None. Logs success or error messages.
     """
+    from googleapiclient.errors import HttpError
+
     service = get_blogger_service()
     if not service:
         return None
     try:
         service.posts().delete(blogId=blog_id, postId=post_id).execute()
         logging.info(f"Successfully deleted post with ID: {post_id}")
+        mirror = get_blog_mirror()
+        if mirror is not None:
+            try:
+                mirror.record_delete(blog_id, post_id)
+            except Exception as e:
+                logging.error(f"Error removing post {post_id} from the mirror: {e}")
     except HttpError as error:
         logging.error(f'An error occurred deleting the post: {error}')
         return None
 
-async def prepare_blog_post(ctx: Context, title: str, content_html: str) -> str:
+def _rate_limited(error: Exception) -> bool:
+    """Whether Blogger turned a request away for rate limiting, so it was definitely not carried out."""
+    from googleapiclient.errors import HttpError
+
+    return isinstance(error, HttpError) and (
+        error.resp.status == 429
+        or (error.resp.status == 403 and any(reason in str(error) for reason in RATE_LIMIT_REASONS))
+    )
+
+def _retryable(error: Exception) -> bool:
+    """Whether a failed Blogger request is worth retrying: rate limits, server errors and transport failures."""
+    from googleapiclient.errors import HttpError
+
+    if not isinstance(error, HttpError):
+        return True
+    return error.resp.status in RETRYABLE_STATUSES or _rate_limited(error)
+
+def _existing_titles(blog_id: str, titles: List[str]) -> Optional[set]:
+    """Returns the keys of the titles that have a post on the blog, looked up fresh so posts created
+    moments ago are seen; None if Blogger can't be asked."""
+    mirror = get_blog_mirror()
+    if mirror is not None and mirror.sync(get_blogger_service(), blog_id):
+        return {title_key(title) for title in titles if mirror.find_by_title(blog_id, title)}
+    existing = set()
+    for title in titles:
+        posts = search_blog_posts(blog_id, title)
+        if posts is None:
+            return None
+        if any(title_key(post.get("title")) == title_key(title) for post in posts):
+            existing.add(title_key(title))
+    return existing
+
+def execute_blog_batch(blog_id: str, operations: List[tuple], max_retries: int = 3) -> Optional[List[Dict[str, Any]]]:
+    """Runs many Blogger post operations as batch HTTP requests, with per-item results.
+
+    Operations are sent in chunks of `BLOGGER_BATCH_SIZE` requests, each chunk in one round trip.
+    Items that fail with a rate limit or server error are retried in later rounds, after an
+    exponential backoff and with the chunk size halved if Blogger was rate limiting; other
+    failures are reported and don't affect the rest. An insert that failed with a server or
+    transport error may still have created its post, so it is only sent again if no post with
+    its title exists; otherwise it is reported as possibly created. Retries stop early if the
+    request's deadline would pass. Successful writes update the blog mirror.
+
+    Args:
+        blog_id (str): The ID of the blog.
+        operations (List[tuple]): `(method, kwargs)` pairs, with `method` one of 'insert', 'update'
+                                  or 'delete' and `kwargs` its arguments besides `blogId`.
+        max_retries (int): Retry rounds for retryable failures.
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: One result per operation, in order, with 'ok' and either
+                                        'post' (None for deletes) or 'error'.
+                                        Returns None if the service is unavailable.
+    """
+    from googleapiclient.errors import HttpError
+
+    service = get_blogger_service()
+    if not service:
+        return None
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+    errors: Dict[int, Exception] = {}
+
+    def callback(request_id: str, response: Any, exception: Optional[Exception]):
+        index = int(request_id)
+        if exception is None:
+            results[index] = {"ok": True, "post": response or None}
+        else:
+            errors[index] = exception
+
+    pending, batch_size = list(range(len(operations))), BATCH_SIZE
+    for attempt in range(max_retries + 1):
+        errors.clear()
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=callback)
+            for index in chunk:
+                method, kwargs = operations[index]
+                batch.add(getattr(service.posts(), method)(blogId=blog_id, **kwargs), request_id=str(index))
+            try:
+                batch.execute()
+            except Exception as e:
+                logging.error(f"Error executing a batch of {len(chunk)} Blogger requests: {e}")
+                errors.update({index: e for index in chunk if results[index] is None})
+
+        # Inserts that failed without a definite rejection may have gone through; re-sending them
+        # is only safe while no post with their title exists
+        uncertain = [
+            index for index, error in errors.items()
+            if operations[index][0] == "insert" and _retryable(error) and not _rate_limited(error)
+        ]
+        existing = None
+        if uncertain and attempt < max_retries:
+            existing = _existing_titles(blog_id, [operations[index][1]["body"]["title"] for index in uncertain])
+
+        pending = []
+        for index, error in sorted(errors.items()):
+            results[index] = {"ok": False, "error": str(error)}
+            if index in uncertain:
+                if existing is not None and title_key(operations[index][1]["body"]["title"]) not in existing:
+                    pending.append(index)
+                else:
+                    results[index]["error"] += (
+                        " The post may have been created anyway; verify with FindBlogPostByTitleTool before retrying."
+                    )
+            elif _retryable(error):
+                pending.append(index)
+        if not pending or attempt == max_retries:
+            break
+        if any(isinstance(errors[index], HttpError) and errors[index].resp.status in (403, 429) for index in pending):
+            batch_size = max(1, batch_size // 2)
+        delay = min(2 ** attempt, 30) + random.random()
+        left = remaining()
+        if left is not None and left < delay:
+            break
+        logging.warning(f"Retrying {len(pending)} Blogger request(s) in {delay:.1f}s, {batch_size} per batch.")
+        time.sleep(delay)
+        for index in pending:
+            results[index] = None
+
+    results = [result or {"ok": False, "error": "No response received."} for result in results]
+    mirror = get_blog_mirror()
+    for (method, kwargs), result in zip(operations, results):
+        if mirror is None or not result["ok"]:
+            continue
+        try:
+            if method == "delete":
+                mirror.record_delete(blog_id, kwargs["postId"])
+            else:
+                mirror.record_write(blog_id, result["post"])
+        except Exception as e:
+            logging.error(f"Error mirroring a batched {method}: {e}")
+    succeeded = sum(result["ok"] for result in results)
+    logging.info(f"Batched Blogger {'/'.join(sorted({m for m, _ in operations}))}: {succeeded} of {len(results)} succeeded.")
+    return results
+
+def _batch_summary(labels: List[Dict[str, Any]], results: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Pairs batch results with what each item was, keeping only the useful fields of returned posts."""
+    if results is None:
+        return {"error": "Blogger service unavailable."}
+    items = []
+    for label, result in zip(labels, results):
+        item = {**label, "ok": result["ok"]}
+        if result["ok"] and result.get("post"):
+            item.update({key: result["post"].get(key) for key in ("id", "title", "url")})
+        elif not result["ok"]:
+            item["error"] = result["error"]
+        items.append(item)
+    succeeded = sum(item["ok"] for item in items)
+    return {"succeeded": succeeded, "failed": len(items) - succeeded, "items": items}
+
+async def _prepared_posts(ctx: Context, titles: List[str]) -> tuple[List[Dict[str, str]], List[str]]:
+    """Returns the prepared blog posts with the given titles, and the titles not found in the context."""
+    state = await ctx.get("state")
+    prepared = state.get("blog_posts", {})
+    return [prepared[title] for title in titles if title in prepared], [title for title in titles if title not in prepared]
+
+async def create_blog_posts(ctx: Context, blog_id: str, titles: List[str]) -> Dict[str, Any]:
+    """Publishes several prepared blog posts at once, as batched Blogger requests.
+
+    The posts are read from the context, where `prepare_blog_post` stored them, so their
+    content doesn't have to be repeated. Should typically be called *after* user
+    confirmation via the ManagerAgent.
+
+    Args:
+        ctx (Context): The LlamaIndex workflow context object.
+        blog_id (str): The ID of the blog where the posts will be created.
+        titles (List[str]): The titles of the prepared blog posts to publish.
+
+    Returns:
+        Dict[str, Any]: 'succeeded' and 'failed' counts, and per-item results ('title', 'ok', and
+                        the new post's 'id' and 'url', or an 'error'). Failed items can be retried.
+    """
+    posts, missing = await _prepared_posts(ctx, titles)
+    operations = [("insert", {"body": {"title": post["title"], "content": post["content_html"]}}) for post in posts]
+    summary = _batch_summary(
+        [{"title": post["title"]} for post in posts],
+        await asyncio.to_thread(execute_blog_batch, blog_id, operations) if operations else [],
+    )
+    if missing:
+        summary["not_prepared"] = missing
+    return summary
+
+async def update_blog_posts(ctx: Context, blog_id: str, post_ids: List[str], titles: List[str]) -> Dict[str, Any]:
+    """Updates several existing blog posts at once from prepared posts, as batched Blogger requests.
+
+    Each post ID is paired with the title of the prepared blog post (stored by
+    `prepare_blog_post`) that replaces it. Should typically be called *after* user
+    confirmation via the ManagerAgent.
+
+    Args:
+        ctx (Context): The LlamaIndex workflow context object.
+        blog_id (str): The ID of the blog containing the posts.
+        post_ids (List[str]): The IDs of the posts to update.
+        titles (List[str]): The titles of the prepared blog posts, one per post ID, in the same order.
+
+    Returns:
+        Dict[str, Any]: 'succeeded' and 'failed' counts, and per-item results ('post_id', 'title',
+                        'ok', and the post's 'url', or an 'error'). Failed items can be retried.
+    """
+    if len(post_ids) != len(titles):
+        return {"error": f"Got {len(post_ids)} post IDs but {len(titles)} titles; pass one title per post ID."}
+    state = await ctx.get("state")
+    prepared = state.get("blog_posts", {})
+    pairs = [(post_id, prepared[title]) for post_id, title in zip(post_ids, titles) if title in prepared]
+    operations = [
+        ("update", {"postId": post_id, "body": {"title": post["title"], "content": post["content_html"]}}) for post_id, post in pairs
+    ]
+    summary = _batch_summary(
+        [{"post_id": post_id, "title": post["title"]} for post_id, post in pairs],
+        await asyncio.to_thread(execute_blog_batch, blog_id, operations) if operations else [],
+    )
+    missing = [title for title in titles if title not in prepared]
+    if missing:
+        summary["not_prepared"] = missing
+    return summary
+
+def delete_blog_posts(blog_id: str, post_ids: List[str]) -> Dict[str, Any]:
+    """Deletes several blog posts at once, as batched Blogger requests.
+
+    Should typically be called *after* user confirmation via the ManagerAgent.
+
+    Args:
+        blog_id (str): The ID of the blog containing the posts.
+        post_ids (List[str]): The IDs of the posts to delete.
+
+    Returns:
+        Dict[str, Any]: 'succeeded' and 'failed' counts, and per-item results ('post_id', 'ok',
+                        or an 'error'). Failed items can be retried.
+    """
+    operations = [("delete", {"postId": post_id}) for post_id in post_ids]
+    return _batch_summary([{"post_id": post_id} for post_id in post_ids], execute_blog_batch(blog_id, operations) if operations else [])
+
+async def prepare_blog_post(ctx: Context, title: str, content_markdown: str, template: str = DEFAULT_TEMPLATE) -> str:
     """Stores proposed blog post title and content into the workflow context for confirmation.
 
-    This function DOES NOT interact with the Blogger API. It prepares the data
-    so the ManagerAgent can present it to the user for approval before calling
-    `create_blog_post` or `update_blog_post`.
+    This function DOES NOT interact with the Blogger API. It renders the Markdown content
+    to Blogger-ready HTML locally and stores both, so the ManagerAgent can present the post
+    to the user for approval before calling `create_blog_post` or `update_blog_post`.
 
     Args:
         ctx (Context): The LlamaIndex workflow context object.
         title (str): The proposed title of the blog post.
-        content_html (str): The proposed HTML content of the blog post.
+        content_markdown (str): The proposed Markdown content of the blog post.
+        template (str): The HTML template: 'article' (default), 'tutorial' (adds a table of contents) or 'plain'.
 
     Returns:
         str: A status message indicating success ("Blog post prepared in context.")
              or failure ("Failed to prepare blog post in context.").
     """
+    if template not in TEMPLATES:
+        return f"Unknown template '{template}'. Use one of: {', '.join(TEMPLATES)}."
     try:
+        content_html = await asyncio.to_thread(renderer.render, content_markdown, title, template)
         state = await ctx.get("state")
         if "blog_posts" not in state:
             state["blog_posts"] = {}
+        previous = state["blog_posts"].get(title, {}).get("content_markdown")
+        if previous is not None and previous != content_markdown:
+            # A full rewrite of a draft is kept in its version history too
+            record_revision(state, "blog_posts", title, previous, content_markdown, "rewritten")
         # Store the blog post data in the context state
         state["blog_posts"][title] = {
             "title": title,
-            "content_html": content_html
-        } 
+            "content_markdown": content_markdown,
+            "template": template,
+            "content_html": content_html,
+        }
         return f"Blog post set in context, under title: {title} as key."
     except Exception as e:
         logging.error(f"Error preparing blog post in context: {e}")
@@ -257,14 +615,17 @@ async def read_prepared_blog_post(ctx: Context, title: str) -> Dict[str, str] |
         title (str): The title of the blog post to retrieve.
 
     Returns:
-        Dict[str, str] | str: A dictionary containing the 'title' and 'content_html'
-                               of the prepared blog post, or an error message string if
-                               retrieval fails or no post is prepared.
+        Dict[str, str] | str: A dictionary containing the 'title', 'content_markdown' and 'template'
+                               of the prepared blog post (its rendered HTML is kept out of the reply),
+                               or an error message string if retrieval fails or no post is prepared.
     """
     try:
         state = await ctx.get("state")
         blog_post = state.get("blog_posts", {}).get(title, None)
-        return blog_post or f"Blog post with title '{title}' not found in context."
+        if blog_post is None:
+            return f"Blog post with title '{title}' not found in context."
+        # Drafts prepared before Markdown rendering only have their HTML
+        return {key: value for key, value in blog_post.items() if key != "content_html" or "content_markdown" not in blog_post}
     except Exception as e:
         logging.error(f"Error reading prepared blog post from context: {e}")
         return "Failed to read blog post from context."
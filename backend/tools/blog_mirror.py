@@ -0,0 +1,329 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+WORD = re.compile(r"\w+")
+# Fields returned for a mirrored post; the body is only searched, not returned
+POST_FIELDS = ("id", "title", "url", "published", "updated", "status", "labels")
+
+def title_key(title: str) -> str:
+    """Normalizes a post title for duplicate checks (case, punctuation and whitespace insensitive)."""
+    return " ".join(WORD.findall((title or "").casefold()))
+
+def _timestamp(value: Optional[str]) -> float:
+    """Converts a Blogger RFC 3339 timestamp to epoch seconds (0 if missing or malformed)."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+class BlogMirror:
+    """A local SQLite mirror of the posts of the user's blogs, for searches and title lookups that
+    don't round-trip to the Blogger API.
+
+    Each blog is synced on its first use and then incrementally: posts are listed by last update,
+    newest first, until the ones already mirrored, and the listing's ETag makes an unchanged blog
+    a single 304 response. Deletions made outside the app are picked up by a periodic full sync.
+    Writes made through the app update the mirror immediately. Searches use SQLite FTS5 (BM25),
+    or a plain substring match on builds without it.
+    """
+    def __init__(
+        self,
+        path: str = "./contexts/blog_mirror.db",
+        max_staleness: float = 60,
+        full_sync_interval: float = 3600,
+        page_size: int = 50,
+        statuses: tuple = ("live", "draft", "scheduled"),
+    ):
+        """
+        Args:
+            path (str): The database file.
+            max_staleness (float): Seconds since a blog's last sync after which a read syncs it first.
+            full_sync_interval (float): Seconds between full syncs of a blog, which also drop deleted posts.
+            page_size (int): Posts listed per request while syncing.
+            statuses (tuple): The post statuses mirrored.
+        """
+        self.path = path
+        self.max_staleness = max_staleness
+        self.full_sync_interval = full_sync_interval
+        self.page_size = page_size
+        self.statuses = list(statuses)
+        self.stats = Counter()
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    rowid INTEGER PRIMARY KEY, blog_id TEXT, post_id TEXT, title TEXT, title_key TEXT, url TEXT,
+                    published TEXT, updated TEXT, updated_ts REAL, status TEXT, labels TEXT, body TEXT,
+                    UNIQUE (blog_id, post_id)
+                );
+                CREATE INDEX IF NOT EXISTS posts_title_key ON posts (blog_id, title_key);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    blog_id TEXT PRIMARY KEY, watermark REAL, etag TEXT, synced_at REAL, full_synced_at REAL
+                );
+            """)
+            try:
+                db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, body)")
+                self.fts = True
+            except sqlite3.OperationalError:
+                logger.warning("SQLite was built without FTS5; blog mirror searches fall back to substring matching.")
+                self.fts = False
+
+    @contextmanager
+    def _connect(self):
+        # A connection per operation, so the mirror can be used from any tool thread
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _lock(self, blog_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(blog_id, threading.Lock())
+
+    def _upsert(self, db: sqlite3.Connection, blog_id: str, post: Dict[str, Any]):
+        body = TAG_PATTERN.sub(" ", post.get("content") or "")
+        rowid = db.execute(
+            """
+            INSERT INTO posts (blog_id, post_id, title, title_key, url, published, updated, updated_ts, status, labels, body)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (blog_id, post_id) DO UPDATE SET
+                title = excluded.title, title_key = excluded.title_key, url = excluded.url, published = excluded.published,
+                updated = excluded.updated, updated_ts = excluded.updated_ts, status = excluded.status,
+                labels = excluded.labels, body = excluded.body
+            RETURNING rowid
+            """,
+            (
+                blog_id, post["id"], post.get("title") or "", title_key(post.get("title")), post.get("url"),
+                post.get("published"), post.get("updated"), _timestamp(post.get("updated")),
+                post.get("status") or "LIVE", ",".join(post.get("labels") or []), body,
+            ),
+        ).fetchone()[0]
+        if self.fts:
+            db.execute("DELETE FROM posts_fts WHERE rowid = ?", (rowid,))
+            db.execute("INSERT INTO posts_fts (rowid, title, body) VALUES (?, ?, ?)", (rowid, post.get("title") or "", body))
+
+    def _delete(self, db: sqlite3.Connection, blog_id: str, post_ids: List[str]):
+        for post_id in post_ids:
+            row = db.execute("DELETE FROM posts WHERE blog_id = ? AND post_id = ? RETURNING rowid", (blog_id, post_id)).fetchone()
+            if row is not None and self.fts:
+                db.execute("DELETE FROM posts_fts WHERE rowid = ?", (row[0],))
+
+    def sync(self, service: Any, blog_id: str, full: bool = False) -> bool:
+        """
+        Brings a blog's mirror up to date with Blogger.
+
+        Args:
+            service: The Blogger API service.
+            blog_id (str): The blog ID.
+            full (bool): Whether to relist every post (dropping deleted ones), even if a full sync isn't due.
+
+        Returns:
+            bool: Whether the mirror is in sync; False if the API calls failed.
+        """
+        from googleapiclient.errors import HttpError
+
+        with self._lock(blog_id):
+            with self._connect() as db:
+                state = db.execute(
+                    "SELECT watermark, etag, full_synced_at FROM sync_state WHERE blog_id = ?", (blog_id,)
+                ).fetchone()
+            now = time.time()
+            full = full or state is None or now - (state[2] or 0) > self.full_sync_interval
+            watermark, etag = (0.0, None) if full or state is None else (state[0] or 0.0, state[1])
+
+            posts, seen, page_token, first_etag = [], [], None, etag
+            try:
+                while True:
+                    request = service.posts().list(
+                        blogId=blog_id, orderBy="updated", maxResults=self.page_size, pageToken=page_token,
+                        fetchBodies=True, status=self.statuses, view="ADMIN",
+                    )
+                    if page_token is None and etag:
+                        request.headers["If-None-Match"] = etag
+                    self.stats["requests"] += 1
+                    try:
+                        response = request.execute()
+                    except HttpError as error:
+                        if error.resp.status != 304:
+                            raise
+                        # Nothing changed since the last sync
+                        self.stats["not_modified"] += 1
+                        break
+                    if page_token is None:
+                        first_etag = response.get("etag")
+                    items = response.get("items", [])
+                    seen.extend(item["id"] for item in items)
+                    # Listed newest update first: stop at the posts the mirror already has
+                    fresh = [item for item in items if _timestamp(item.get("updated")) >= watermark]
+                    posts.extend(fresh)
+                    page_token = response.get("nextPageToken")
+                    if not page_token or len(fresh) < len(items):
+                        break
+            except HttpError as error:
+                self.stats["sync_failures"] += 1
+                logger.error(f"Could not sync the mirror of blog {blog_id}: {error}")
+                return False
+
+            with self._connect() as db:
+                db.execute("BEGIN IMMEDIATE")
+                for post in posts:
+                    self._upsert(db, blog_id, post)
+                if full:
+                    mirrored = [row[0] for row in db.execute("SELECT post_id FROM posts WHERE blog_id = ?", (blog_id,))]
+                    self._delete(db, blog_id, sorted(set(mirrored) - set(seen)))
+                new_watermark = max([watermark, *(_timestamp(post.get("updated")) for post in posts)])
+                db.execute(
+                    """
+                    INSERT INTO sync_state (blog_id, watermark, etag, synced_at, full_synced_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (blog_id) DO UPDATE SET
+                        watermark = excluded.watermark, etag = excluded.etag, synced_at = excluded.synced_at,
+                        full_synced_at = COALESCE(excluded.full_synced_at, full_synced_at)
+                    """,
+                    (blog_id, new_watermark, first_etag, now, now if full else None),
+                )
+                db.execute("COMMIT")
+            self.stats["full_syncs" if full else "incremental_syncs"] += 1
+            self.stats["posts_synced"] += len(posts)
+            logger.info(f"Synced {len(posts)} post(s) of blog {blog_id} ({'full' if full else 'incremental'}).")
+            return True
+
+    def ensure_fresh(self, service: Any, blog_id: str) -> bool:
+        """
+        Syncs a blog if its mirror is older than `max_staleness`.
+
+        Returns:
+            bool: Whether the mirror can be read: it is fresh, or stale but was synced before.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT synced_at FROM sync_state WHERE blog_id = ?", (blog_id,)).fetchone()
+        if row is not None and time.time() - row[0] <= self.max_staleness:
+            return True
+        if service is not None and self.sync(service, blog_id):
+            return True
+        if row is not None:
+            logger.warning(f"Serving the stale mirror of blog {blog_id}.")
+            return True
+        return False
+
+    def search(self, blog_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Searches a blog's mirrored posts by title and content, best matches first.
+
+        Args:
+            blog_id (str): The blog ID.
+            query (str): The search query.
+            limit (int): Maximum number of posts returned.
+
+        Returns:
+            List[Dict[str, Any]]: The matching posts, with a `snippet` of the matched text.
+        """
+        terms = WORD.findall(query or "")
+        if not terms:
+            return []
+        self.stats["searches"] += 1
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            if self.fts:
+                # Any of the terms, titles weighted over bodies
+                rows = db.execute(
+                    """
+                    SELECT posts.*, snippet(posts_fts, 1, '', '', '...', 24) AS snippet
+                    FROM posts_fts JOIN posts ON posts.rowid = posts_fts.rowid
+                    WHERE posts_fts MATCH ? AND posts.blog_id = ?
+                    ORDER BY bm25(posts_fts, 10.0, 1.0) LIMIT ?
+                    """,
+                    (" OR ".join(f'"{term}"' for term in terms), blog_id, limit),
+                ).fetchall()
+            else:
+                pattern = f"%{' '.join(terms)}%"
+                rows = db.execute(
+                    """
+                    SELECT posts.*, substr(body, 1, 200) AS snippet FROM posts
+                    WHERE blog_id = ? AND (title LIKE ? OR body LIKE ?) ORDER BY updated_ts DESC LIMIT ?
+                    """,
+                    (blog_id, pattern, pattern, limit),
+                ).fetchall()
+        return [{**self._post(row), "snippet": " ".join(row["snippet"].split())} for row in rows]
+
+    def find_by_title(self, blog_id: str, title: str) -> List[Dict[str, Any]]:
+        """Returns a blog's mirrored posts whose title matches exactly (ignoring case, punctuation and spacing)."""
+        self.stats["title_lookups"] += 1
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute(
+                "SELECT * FROM posts WHERE blog_id = ? AND title_key = ? ORDER BY updated_ts DESC", (blog_id, title_key(title))
+            ).fetchall()
+        return [self._post(row) for row in rows]
+
+    @staticmethod
+    def _post(row: sqlite3.Row) -> Dict[str, Any]:
+        post = {field: row["post_id" if field == "id" else field] for field in POST_FIELDS}
+        post["labels"] = post["labels"].split(",") if post["labels"] else []
+        return post
+
+    def record_write(self, blog_id: str, post: Dict[str, Any]):
+        """Mirrors a post just created or updated through the API."""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            self._upsert(db, blog_id, post)
+            db.execute("COMMIT")
+        self.stats["writes"] += 1
+
+    def record_delete(self, blog_id: str, post_id: str):
+        """Drops a post just deleted through the API from the mirror."""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            self._delete(db, blog_id, [post_id])
+            db.execute("COMMIT")
+        self.stats["deletes"] += 1
+
+    def metrics(self) -> dict:
+        with self._connect() as db:
+            blogs, posts = db.execute("SELECT COUNT(DISTINCT blog_id), COUNT(*) FROM posts").fetchone()
+        return {**self.stats, "blogs": blogs, "posts": posts, "fts": self.fts}
+
+def blog_mirror_from_env() -> Optional[BlogMirror]:
+    """
+    Builds the blog mirror from the `BLOG_MIRROR` (`on`, the default, or `off`), `BLOG_MIRROR_PATH`
+    (default `./contexts/blog_mirror.db`), `BLOG_MIRROR_MAX_STALENESS` (seconds, default 60) and
+    `BLOG_MIRROR_FULL_SYNC_INTERVAL` (seconds, default 3600) environment variables. Returns None if it is disabled.
+    """
+    if os.getenv("BLOG_MIRROR", "on").strip().lower() in ("off", "false", "0", "none"):
+        return None
+    return BlogMirror(
+        path=os.getenv("BLOG_MIRROR_PATH", "./contexts/blog_mirror.db"),
+        max_staleness=float(os.getenv("BLOG_MIRROR_MAX_STALENESS", "60")),
+        full_sync_interval=float(os.getenv("BLOG_MIRROR_FULL_SYNC_INTERVAL", "3600")),
+    )
+
+_mirror: Optional[BlogMirror] = None
+_mirror_loaded = False
+_mirror_lock = threading.Lock()
+
+def get_blog_mirror() -> Optional[BlogMirror]:
+    """Returns the shared blog mirror, built from the environment on first use (None if disabled)."""
+    global _mirror, _mirror_loaded
+    with _mirror_lock:
+        if not _mirror_loaded:
+            try:
+                _mirror = blog_mirror_from_env()
+            except Exception as e:
+                logger.error(f"Could not open the blog mirror, searching Blogger directly: {e}")
+            _mirror_loaded = True
+    return _mirror
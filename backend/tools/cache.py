@@ -0,0 +1,123 @@
+import time
+import inspect
+import functools
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+class ToolResultCache:
+    """A thread-safe TTL/LRU cache for tool results.
+
+    Concurrent calls with the same arguments share a single upstream request: a call that
+    arrives while another (e.g. a speculative prefetch) is in flight waits for its result.
+    Entries remember whether they were prefetched, so unused prefetches can be counted.
+    """
+    def __init__(self, ttl: float = 900, max_entries: int = 256):
+        """
+        Args:
+            ttl (float): Seconds a result stays valid.
+            max_entries (int): Maximum number of cached results.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._entries: OrderedDict[Hashable, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["future"].done() and (
+            entry["future"].exception() is not None or time.monotonic() - entry["created_at"] > self.ttl
+        ):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_or_compute(self, key: Hashable, fn: Callable[[], Any], prefetch: bool = False) -> Any:
+        """
+        Returns the cached result for a key, computing it with `fn` if needed.
+
+        Args:
+            key (Hashable): The cache key, usually the tool name and its normalized arguments.
+            fn (Callable[[], Any]): Computes the result.
+            prefetch (bool): Whether this is a speculative call rather than a real tool call.
+
+        Returns:
+            Any: The result.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                if not prefetch:
+                    self.stats["hits"] += 1
+                    if entry["prefetched"] and not entry["used"]:
+                        self.stats["prefetch_hits"] += 1
+                    entry["used"] = True
+                future = entry["future"]
+                owner = False
+            else:
+                self.stats["prefetches" if prefetch else "misses"] += 1
+                future = Future()
+                self._entries[key] = {
+                    "future": future,
+                    "created_at": time.monotonic(),
+                    "prefetched": prefetch,
+                    "used": not prefetch,
+                }
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                owner = True
+
+        if owner:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def is_unused_prefetch(self, key: Hashable) -> bool:
+        """Whether a key was prefetched and no real tool call has used it yet."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry["prefetched"] and not entry["used"]
+
+    def cached(self, name: str, key_fn: Optional[Callable[..., Hashable]] = None):
+        """
+        Decorates a tool function so its results are cached.
+
+        Args:
+            name (str): The tool name, used in cache keys.
+            key_fn (Optional[Callable[..., Hashable]]): Builds the key from the call's arguments, passed
+                                                        positionally in signature order. Defaults to the arguments as-is.
+        """
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            def key(*args, **kwargs) -> Hashable:
+                # Bind first, so positional and keyword calls share cache entries
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return (name, key_fn(*bound.args) if key_fn else bound.args)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                return self.get_or_compute(key(*args, **kwargs), lambda: fn(*args, **kwargs))
+
+            def prefetch(*args, **kwargs) -> Any:
+                return self.get_or_compute(key(*args, **kwargs), lambda: fn(*args, **kwargs), prefetch=True)
+
+            wrapper.cache_key = key
+            wrapper.prefetch = prefetch
+            return wrapper
+        return decorator
+
+    def metrics(self) -> dict:
+        """Returns the hit, miss and prefetch counters."""
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+tool_cache = ToolResultCache()
@@ -0,0 +1,114 @@
+import time
+import asyncio
+import inspect
+import functools
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Monotonic time by which the current request must finish, if it has a deadline. Being a
+# context variable, it follows the request into the agent workflow's tasks and tool threads.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request runs past its deadline."""
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    Gives the code in the block a deadline, `seconds` from now. A deadline already in force
+    is only ever tightened.
+
+    Args:
+        seconds (Optional[float]): The time budget, or None to keep the current deadline.
+    """
+    current = _deadline.get()
+    deadline = current if seconds is None else time.monotonic() + seconds
+    if current is not None and deadline is not None:
+        deadline = min(current, deadline)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Returns the seconds left until the current deadline (at least 0), or None if there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+def timeout_for(timeout: Optional[float]) -> Optional[float]:
+    """Caps a timeout by the time left until the current deadline."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+@asynccontextmanager
+async def enforce_deadline():
+    """
+    Cancels the block when the current deadline passes, raising DeadlineExceeded.
+    Cancellation propagates to everything the block awaits, including running workflow handlers.
+    """
+    left = remaining()
+    if left is None:
+        yield
+        return
+
+    task = asyncio.current_task()
+    expired = False
+
+    def expire():
+        nonlocal expired
+        expired = True
+        task.cancel()
+
+    handle = asyncio.get_running_loop().call_later(left, expire)
+    try:
+        yield
+    except asyncio.CancelledError:
+        if expired:
+            if hasattr(task, "uncancel"):
+                # The cancellation was ours; don't leave the task marked as cancelled
+                task.uncancel()
+            raise DeadlineExceeded("The request ran past its deadline.") from None
+        raise
+    finally:
+        handle.cancel()
+
+def with_deadline(fn: Callable, verify_with: Optional[str] = None) -> Callable:
+    """
+    Wraps a tool function so each call respects the current deadline. Calls that start after the
+    deadline, or run past it, return an error message instead of a result. Sync functions run in
+    a worker thread; one that overruns can't be interrupted, but its result is discarded.
+
+    Since an overrunning call may still complete, tools with side effects (publishing, deleting)
+    pass `verify_with`: their timeout message then says the change may have been made, and to
+    check with that tool before retrying, rather than inviting a blind retry.
+
+    Args:
+        fn (Callable): The tool function, sync or async.
+        verify_with (Optional[str]): For tools with side effects, the tool that tells whether a call went through.
+
+    Returns:
+        Callable: An async function with the same signature, for `FunctionTool.from_defaults(async_fn=...)`.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        left = remaining()
+        if left is not None and left <= 0:
+            return f"Error: the request's deadline passed before {fn.__name__} could run."
+        if inspect.iscoroutinefunction(fn):
+            call = fn(*args, **kwargs)
+        else:
+            call = asyncio.to_thread(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(call, timeout=left)
+        except asyncio.TimeoutError:
+            if verify_with is not None:
+                return (
+                    f"Error: {fn.__name__} did not finish before the request's deadline, but it may have completed. "
+                    f"Verify with {verify_with} before retrying."
+                )
+            return f"Error: {fn.__name__} did not finish before the request's deadline."
+    return wrapper
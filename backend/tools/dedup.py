@@ -0,0 +1,119 @@
+import re
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+WORD = re.compile(r"\w+")
+# Trailing " - Outlet" / " | Outlet" that syndicated titles carry
+TITLE_SUFFIX = re.compile(r"\s+[-|–]\s+[^-|–]{1,60}$")
+# Modulus of the MinHash permutations (a Mersenne prime)
+PRIME = (1 << 31) - 1
+
+def article_shingles(article: Dict[str, Any]) -> set:
+    """Returns the word bigrams of an article's title (without its outlet suffix) and description."""
+    title = TITLE_SUFFIX.sub("", article.get("title") or "")
+    words = WORD.findall(f"{title} {article.get('description') or ''}".lower())
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def minhash_signatures(shingle_sets: List[set], num_perm: int = 64, seed: int = 1):
+    """
+    Computes the MinHash signatures of shingle sets, for all sets at once.
+
+    Args:
+        shingle_sets (List[set]): The shingle sets; none may be empty.
+        num_perm (int): Number of hash permutations (signature length).
+        seed (int): Seed of the permutations; signatures are only comparable under the same seed.
+
+    Returns:
+        numpy.ndarray: An (n, num_perm) array of signatures.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, num_perm, dtype=np.int64)
+    b = rng.integers(0, PRIME, num_perm, dtype=np.int64)
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for shingles in shingle_sets for s in shingles],
+        dtype=np.int64,
+    )
+    offsets = np.cumsum([0] + [len(shingles) for shingles in shingle_sets[:-1]])
+    # Hashes are below 2**32 and `a` below 2**31, so the products fit in 63 bits
+    permuted = (hashes[:, None] * a + b) % PRIME
+    return np.minimum.reduceat(permuted, offsets, axis=0)
+
+def cluster_near_duplicates(articles: List[Dict[str, Any]], threshold: float = 0.6, num_perm: int = 64, block: int = 256) -> List[List[int]]:
+    """
+    Clusters articles whose titles and descriptions are near-duplicates, by estimated Jaccard
+    similarity of their word bigrams (MinHash), compared all-pairs in vectorized blocks.
+
+    Args:
+        articles (List[Dict[str, Any]]): NewsAPI articles.
+        threshold (float): Estimated Jaccard similarity at or above which two articles are near-duplicates.
+        num_perm (int): MinHash signature length.
+        block (int): Rows compared at once, bounding memory to block * n * num_perm.
+
+    Returns:
+        List[List[int]]: The clusters, as article indices, ordered by their first article.
+    """
+    import numpy as np
+
+    parent = list(range(len(articles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    shingle_sets = [article_shingles(article) for article in articles]
+    comparable = [i for i, shingles in enumerate(shingle_sets) if shingles]
+    if len(comparable) > 1:
+        signatures = minhash_signatures([shingle_sets[i] for i in comparable], num_perm=num_perm)
+        for start in range(0, len(comparable), block):
+            rows = signatures[start:start + block]
+            similarity = (rows[:, None, :] == signatures[None, :, :]).mean(axis=2)
+            # Each pair once: only columns after the row's own article
+            similarity[np.arange(len(comparable))[None, :] <= np.arange(start, start + len(rows))[:, None]] = 0
+            for i, j in zip(*np.nonzero(similarity >= threshold)):
+                parent[find(comparable[start + i])] = find(comparable[j])
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(articles)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+def dedupe_articles(articles: List[Dict[str, Any]], threshold: float = 0.6) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Keeps one representative per cluster of near-duplicate articles (e.g. syndicated copies of a
+    wire story): the most detailed one, or the earliest published among equals. A representative
+    of several copies gets `duplicates` (how many were dropped) and `also_reported_by` (their outlets).
+
+    Args:
+        articles (List[Dict[str, Any]]): NewsAPI articles.
+        threshold (float): Estimated Jaccard similarity at or above which two articles are near-duplicates.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: The representatives, in their original order, and the number of articles dropped.
+    """
+    if len(articles) < 2:
+        return articles, 0
+
+    representatives = []
+    for members in cluster_near_duplicates(articles, threshold):
+        best = min(
+            members,
+            key=lambda i: (
+                -(len(articles[i].get("description") or "") + len(articles[i].get("content") or "")),
+                articles[i].get("publishedAt") or "",
+            ),
+        )
+        representative = dict(articles[best])
+        if len(members) > 1:
+            own_source = (representative.get("source") or {}).get("name")
+            outlets = {(articles[i].get("source") or {}).get("name") for i in members if i != best}
+            representative["duplicates"] = len(members) - 1
+            representative["also_reported_by"] = sorted(outlet for outlet in outlets if outlet and outlet != own_source)
+        representatives.append((min(members), representative))
+    representatives.sort(key=lambda item: item[0])
+    return [representative for _, representative in representatives], len(articles) - len(representatives)
@@ -0,0 +1,252 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from prompts import CHUNK_SUMMARY_PROMPT, DIGEST_REDUCE_PROMPT
+from llms import get_model_router
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the token count of a text (about four characters per token)."""
+    return len(text) // 4
+
+def split_chunks(text: str, max_tokens: int) -> list[str]:
+    """
+    Splits a text into chunks of at most `max_tokens` (estimated), breaking at paragraph, then line,
+    then sentence boundaries where possible.
+
+    Args:
+        text (str): The text.
+        max_tokens (int): The chunk size bound.
+
+    Returns:
+        list[str]: The chunks, in order.
+    """
+    max_chars = max_tokens * 4
+
+    def pieces(block: str, separators: list) -> list[str]:
+        if len(block) <= max_chars:
+            return [block]
+        if not separators:
+            return [block[i:i + max_chars] for i in range(0, len(block), max_chars)]
+        separator, rest = separators[0], separators[1:]
+        parts = separator.split(block) if isinstance(separator, re.Pattern) else block.split(separator)
+        return [piece for part in parts if part.strip() for piece in pieces(part, rest)]
+
+    chunks, current = [], ""
+    for piece in pieces(text, ["\n\n", "\n", SENTENCE_END, " "]):
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+class SourceDigester:
+    """Condenses long source texts (video transcripts, Wikipedia pages) before they reach the agents.
+
+    A text over `min_tokens` is split into chunks of at most `chunk_tokens`, which are summarized
+    concurrently on the `summarize` task's (fast) model and reduced into one digest. Agents get
+    the digest and an outline of the chunks; the full text of any chunk can be read back with
+    `read_source_chunk`. Chunk summaries are cached by content hash, so a source (or a chunk shared
+    between sources) is only summarized once.
+
+    Chunks are kept in this process's memory only (the last `max_documents` texts): they aren't
+    stored with the conversation, so a document ID can't be read back on another worker or after
+    a restart.
+    """
+    def __init__(
+        self,
+        min_tokens: int = 3000,
+        chunk_tokens: int = 2000,
+        concurrency: int = 4,
+        summary_words: int = 200,
+        digest_words: int = 600,
+        max_summaries: int = 2048,
+        max_documents: int = 64,
+    ):
+        """
+        Args:
+            min_tokens (int): Texts up to this size (estimated) are passed on as they are.
+            chunk_tokens (int): Maximum size of a chunk.
+            concurrency (int): Maximum number of summarization calls in flight per text.
+            summary_words (int): Target length of a chunk summary.
+            digest_words (int): Target length of the digest.
+            max_summaries (int): Number of chunk summaries kept in the cache.
+            max_documents (int): Number of digested texts whose chunks are kept for `read_source_chunk`.
+        """
+        self.min_tokens = min_tokens
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+        self.summary_words = summary_words
+        self.digest_words = digest_words
+        self.max_summaries = max_summaries
+        self.max_documents = max_documents
+        self.stats = Counter()
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._pending: dict[str, asyncio.Future] = {}
+        self._documents: OrderedDict[str, dict] = OrderedDict()
+
+    async def digest(self, text: str, source: str) -> str:
+        """
+        Returns a digest of a long text, or the text itself if it is short (or can't be summarized).
+
+        Args:
+            text (str): The source text.
+            source (str): What the text is, for the prompts and the agents (e.g. "the transcript of <link>").
+        """
+        if estimate_tokens(text) <= self.min_tokens:
+            return text
+
+        document_id = hashlib.sha256(text.encode()).hexdigest()[:12]
+        chunks = split_chunks(text, self.chunk_tokens)
+        self._documents[document_id] = {"source": source, "chunks": chunks}
+        self._documents.move_to_end(document_id)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        summaries = await asyncio.gather(
+            *(self._summarize_chunk(chunk, index, len(chunks), source, semaphore) for index, chunk in enumerate(chunks))
+        )
+        if all(summary is None for summary in summaries):
+            self.stats["fallbacks"] += 1
+            return text
+        # A chunk that couldn't be summarized is represented by its opening lines
+        summaries = [summary or chunk[:600] for summary, chunk in zip(summaries, chunks)]
+
+        try:
+            digest = await self._reduce(summaries, source, semaphore)
+        except Exception as e:
+            logger.warning(f"Could not reduce the summaries of {source}: {e!r}")
+            digest = "\n\n".join(summaries)
+        self.stats["digests"] += 1
+        self.stats["source_tokens"] += estimate_tokens(text)
+        self.stats["digest_tokens"] += estimate_tokens(digest)
+
+        outline = "\n".join(f"[{index}] {summary.strip().splitlines()[0][:200]}" for index, summary in enumerate(summaries))
+        return (
+            f"Digest of {source} (~{estimate_tokens(text)} tokens, split into {len(chunks)} chunks). "
+            f"Read the full text of a chunk with `ReadSourceChunkTool` (document_id='{document_id}', chunk 0-{len(chunks) - 1}).\n\n"
+            f"{digest}\n\nChunks:\n{outline}"
+        )
+
+    async def _summarize_chunk(self, chunk: str, index: int, total: int, source: str, semaphore: asyncio.Semaphore):
+        key = hashlib.sha256(chunk.encode()).hexdigest()
+        if key in self._summaries:
+            self.stats["cache_hits"] += 1
+            self._summaries.move_to_end(key)
+            return self._summaries[key]
+        if key in self._pending:
+            # Another text with the same chunk is summarizing it already
+            self.stats["cache_hits"] += 1
+            return await asyncio.shield(self._pending[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        summary = None
+        try:
+            async with semaphore:
+                self.stats["chunks_summarized"] += 1
+                response = await get_model_router().complete(
+                    "summarize",
+                    CHUNK_SUMMARY_PROMPT.format(index=index + 1, total=total, source=source, max_words=self.summary_words, text=chunk),
+                )
+            summary = response.text.strip() or None
+            if summary is not None:
+                self._summaries[key] = summary
+                while len(self._summaries) > self.max_summaries:
+                    self._summaries.popitem(last=False)
+        except Exception as e:
+            self.stats["chunk_failures"] += 1
+            logger.warning(f"Could not summarize chunk {index} of {source}: {e!r}")
+        finally:
+            del self._pending[key]
+            future.set_result(summary)
+        return summary
+
+    async def _reduce(self, summaries: list[str], source: str, semaphore: asyncio.Semaphore) -> str:
+        """Merges chunk summaries into one digest, in rounds of groups that fit a chunk."""
+        while len(summaries) > 1:
+            groups, group = [], []
+            for summary in summaries:
+                if group and estimate_tokens("\n\n".join(group + [summary])) > self.chunk_tokens:
+                    groups.append(group)
+                    group = []
+                group.append(summary)
+            groups.append(group)
+            if len(groups) == len(summaries) and len(groups) > 1:
+                # No two summaries fit together; merging further can't shrink them
+                return "\n\n".join(summaries)
+
+            async def merge(group: list[str]) -> str:
+                if len(group) == 1:
+                    return group[0]
+                async with semaphore:
+                    response = await get_model_router().complete(
+                        "summarize",
+                        DIGEST_REDUCE_PROMPT.format(
+                            source=source,
+                            max_words=self.digest_words,
+                            summaries="\n\n".join(f"Part {i + 1}:\n{s}" for i, s in enumerate(group)),
+                        ),
+                    )
+                return response.text.strip() or "\n\n".join(group)
+
+            summaries = await asyncio.gather(*(merge(group) for group in groups))
+        return summaries[0]
+
+    def read_chunk(self, document_id: str, chunk: int) -> str:
+        """Returns the full text of one chunk of a digested text, or an error message."""
+        document = self._documents.get(document_id)
+        if document is None:
+            return (
+                f"Error: no digested text with document_id '{document_id}'. Chunks are only kept in the memory of "
+                "the worker that fetched the source, for a limited number of recent sources, so this one was served "
+                "by another worker, lost in a restart or evicted. Fetch the source again to read it."
+            )
+        chunks = document["chunks"]
+        if not 0 <= chunk < len(chunks):
+            return f"Error: chunk must be between 0 and {len(chunks) - 1} for document '{document_id}'."
+        self.stats["chunk_reads"] += 1
+        return f"Chunk {chunk} (of 0-{len(chunks) - 1}) of {document['source']}:\n\n{chunks[chunk]}"
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "cached_summaries": len(self._summaries),
+            "documents": len(self._documents),
+        }
+
+def digester_from_env() -> SourceDigester:
+    """
+    Builds the source digester from the `DIGEST_MIN_TOKENS` (default 3000), `DIGEST_CHUNK_TOKENS`
+    (default 2000) and `DIGEST_CONCURRENCY` (default 4) environment variables.
+    """
+    return SourceDigester(
+        min_tokens=int(os.getenv("DIGEST_MIN_TOKENS", "3000")),
+        chunk_tokens=int(os.getenv("DIGEST_CHUNK_TOKENS", "2000")),
+        concurrency=int(os.getenv("DIGEST_CONCURRENCY", "4")),
+    )
+
+digester = digester_from_env()
+
+async def read_source_chunk(document_id: str, chunk: int) -> str:
+    """
+    Read the full text of one chunk of a long source (video transcript, Wikipedia page) that was returned as a digest.
+
+    Args:
+        document_id (str): The document ID given with the digest.
+        chunk (int): The chunk number, as listed in the digest's outline.
+
+    Returns:
+        str: The chunk's full text, or an error message.
+    """
+    return digester.read_chunk(document_id, chunk)
@@ -1,10 +1,17 @@
-from llama_index.tools.duckduckgo import DuckDuckGoSearchToolSpec
+import functools
+
+@functools.lru_cache(maxsize=None)
+def get_tool_spec():
+    """Returns the shared DuckDuckGo tool spec, imported and built on first use."""
+    from llama_index.tools.duckduckgo import DuckDuckGoSearchToolSpec
+
+    return DuckDuckGoSearchToolSpec()
 
 def duckduckgo_instant_search(query: str) -> str:
     """Perform an instant search using DuckDuckGo."""
-    return DuckDuckGoSearchToolSpec().duckduckgo_instant_search(query)
+    return get_tool_spec().duckduckgo_instant_search(query)
 
 def duckduckgo_full_search(query: str, region: str, max_results: int) -> str:
     """Perform a full search using DuckDuckGo."""
     max_results = int(max_results)
-    return DuckDuckGoSearchToolSpec().duckduckgo_full_search(query, region, max_results)
\ No newline at end of file
+    return get_tool_spec().duckduckgo_full_search(query, region, max_results)
\ No newline at end of file
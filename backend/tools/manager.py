@@ -1,7 +1,6 @@
 from llama_index.core.workflow import Context
-from llama_index.llms.google_genai import GoogleGenAI
 from prompts import REVIEW_PROMPT
-import os
+from llms import get_model_router
 
 async def review_content(
     ctx: Context,
@@ -32,14 +31,13 @@ async def review_content(
 
         if content is None: 
             return f"No {content_type} content found for the key '{key}'."
+        if isinstance(content, dict) and "content_markdown" in content:
+            # Review the Markdown draft; its rendered HTML would only double the prompt
+            content = {k: v for k, v in content.items() if k != "content_html"}
 
-        # Prepare Review LLM
-        review_llm = GoogleGenAI(
-            model="gemini-2.0-flash-lite",
-            api_key=os.getenv("GEMINI_API_KEY"),
-        )
-
-        review = await review_llm.acomplete(
+        # Review on the model tier configured for reviews
+        review = await get_model_router().complete(
+            "review",
             prompt=REVIEW_PROMPT.format(
                 content_to_review=content,
             )
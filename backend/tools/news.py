@@ -1,14 +1,94 @@
-from llama_index.readers.web import NewsArticleReader
-from newsapi import NewsApiClient
 import os
+import math
+import asyncio
+import logging
+import threading
+import functools
+from collections import Counter
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
+from llama_index.core.workflow import Context
+from .dedup import dedupe_articles
+
+# Configure logging
+logger = logging.getLogger(__name__)
 
 class News:
-    """A wrapper class for interacting with the NewsAPI and reading article content."""
-    def __init__(self):
-        """Initializes the NewsApiClient and NewsArticleReader."""
-        self.newsapi_client = NewsApiClient(api_key=os.getenv("NEWS_API_KEY"))
-        self.reader = NewsArticleReader()
+    """A wrapper class for interacting with the NewsAPI and reading article content.
+
+    The NewsApiClient and NewsArticleReader (which pulls in the web readers' browser
+    dependencies) are imported and built on first use.
+
+    Article lists are deduplicated: near-duplicates (syndicated copies of the same story) are
+    collapsed into one representative that lists the other outlets.
+    """
+    def __init__(
+        self,
+        dedup_threshold: Optional[float] = 0.6,
+        page_size: int = 20,
+        max_pages: int = 5,
+        max_results: int = 100,
+        daily_quota: Optional[int] = 100,
+    ):
+        """
+        Args:
+            dedup_threshold (Optional[float]): Title and description similarity (estimated Jaccard) at or
+                                               above which articles are near-duplicates; None disables deduplication.
+            page_size (int): Articles per page fetched by `search_news`.
+            max_pages (int): Maximum number of pages `search_news` fetches per search.
+            max_results (int): The plan's limit on results reachable by paging (100 on the free plan).
+            daily_quota (Optional[int]): The plan's requests per (UTC) day; unlimited if None.
+        """
+        self.dedup_threshold = dedup_threshold
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_results = max_results
+        self.daily_quota = daily_quota
+        self.stats = Counter()
+        self._quota_day = None
+        self._quota_used = 0
+        self._quota_lock = threading.Lock()
+
+    def _take_request(self) -> bool:
+        """Counts one API request against the daily quota; False if it is used up."""
+        with self._quota_lock:
+            today = datetime.now(timezone.utc).date()
+            if today != self._quota_day:
+                self._quota_day, self._quota_used = today, 0
+            if self.daily_quota is not None and self._quota_used >= self.daily_quota:
+                return False
+            self._quota_used += 1
+            self.stats["requests"] += 1
+            return True
+
+    def quota_left(self) -> Optional[int]:
+        """Returns the requests left today, or None if there is no quota."""
+        with self._quota_lock:
+            if self.daily_quota is None:
+                return None
+            used = self._quota_used if self._quota_day == datetime.now(timezone.utc).date() else 0
+            return max(0, self.daily_quota - used)
+
+    def _call(self, endpoint: str, **params) -> Dict[str, Any]:
+        """Calls a NewsAPI endpoint, within the daily quota."""
+        if not self._take_request():
+            self.stats["quota_refusals"] += 1
+            return {"status": "error", "code": "quotaExhausted", "message": "The daily NewsAPI request quota is used up."}
+        return getattr(self.newsapi_client, endpoint)(**params)
+
+    @functools.cached_property
+    def newsapi_client(self):
+        """The NewsAPI client."""
+        from newsapi import NewsApiClient
+
+        return NewsApiClient(api_key=os.getenv("NEWS_API_KEY"))
+
+    @functools.cached_property
+    def reader(self):
+        """The article reader."""
+        from llama_index.readers.web import NewsArticleReader
+
+        return NewsArticleReader()
 
     def read_news_articles(self, urls: List[str]) -> List[str]:
         """Reads the main content of news articles from a list of URLs.
@@ -60,7 +140,8 @@ class News:
             page_size = int(page_size)
         if page is not None:
             page = int(page)
-        return self.newsapi_client.get_top_headlines(
+        return self._dedupe(self._call(
+            "get_top_headlines",
             q=q,
             sources=sources,
             category=category,
@@ -68,7 +149,7 @@ class News:
             country=country,
             page_size=page_size,
             page=page,
-        )
+        ))
 
     def get_sources(
         self,
@@ -91,8 +172,8 @@ class News:
         Returns:
             Dict[str, Any]: The raw JSON response from the NewsAPI.
         """
-        return self.newsapi_client.get_sources(
-            category=category, language=language, country=country
+        return self._call(
+            "get_sources", category=category, language=language, country=country
         )
 
     def get_everything(
@@ -171,9 +252,8 @@ class News:
             page_size = int(page_size)
         if page is not None:
             page = int(page)
-        else:
-            page = 5
-        return self.newsapi_client.get_everything(
+        return self._dedupe(self._call(
+            "get_everything",
             q=q,
             qintitle=qintitle,
             sources=sources,
@@ -185,4 +265,125 @@ class News:
             sort_by=sort_by,
             page_size=page_size,
             page=page,
+        ))
+
+    async def search_news(
+        self,
+        ctx: Context,
+        q: Optional[str],
+        qintitle: Optional[str],
+        sources: Optional[str],
+        domains: Optional[str],
+        from_param: Optional[str],
+        language: Optional[str],
+        only_new: bool = True,
+    ) -> Dict[str, Any]:
+        """Searches all news articles for a query, fetching several pages at once, newest first.
+
+        Repeating a search in the same conversation only returns articles published since the
+        newest one it returned before (unless `only_new` is False).
+
+        Args:
+            ctx (Context): The workflow context, where each query's newest article date is kept.
+            q (Optional[str]): Keywords or a phrase to search for in the article title and body.
+            qintitle (Optional[str]): Keywords or a phrase to search for in the article title only.
+            sources (Optional[str]): A comma-separated string of news source identifiers.
+            domains (Optional[str]): A comma-separated string of domains to restrict the search to.
+            from_param (Optional[str]): The oldest article date allowed, in ISO-8601 (`YYYY-MM-DD`).
+            language (Optional[str]): The 2-letter ISO-639-1 code of the articles' language.
+            only_new (bool): Whether to skip articles returned by an earlier search for the same query.
+
+        Returns:
+            Dict[str, Any]: The merged articles, newest first, with `totalResults`, `pages_fetched`,
+                            `since` (the date newer articles were searched from) and `duplicates_dropped`.
+        """
+        query_key = "|".join((part or "").strip().lower() for part in (q, qintitle, sources, domains, language))
+        state = await ctx.get("state")
+        marks = state.setdefault("news_high_water_marks", {})
+        since = marks.get(query_key) if only_new else None
+        params = dict(
+            q=q,
+            qintitle=qintitle,
+            sources=sources,
+            domains=domains,
+            from_param=max(filter(None, (from_param, since)), default=None),
+            language=language,
+            sort_by="publishedAt",
+            page_size=self.page_size,
+        )
+
+        first = await asyncio.to_thread(self._call, "get_everything", page=1, **params)
+        if first.get("status") != "ok":
+            return first
+        total = first.get("totalResults", 0)
+        pages = min(self.max_pages, math.ceil(min(total, self.max_results) / self.page_size))
+        left = self.quota_left()
+        if left is not None:
+            pages = min(pages, left + 1)
+        rest = await asyncio.gather(
+            *(asyncio.to_thread(self._call, "get_everything", page=page, **params) for page in range(2, pages + 1)),
+            return_exceptions=True,
         )
+
+        articles, seen = [], set()
+        for response in [first, *rest]:
+            if isinstance(response, Exception) or response.get("status") != "ok":
+                logger.warning(f"A NewsAPI page of '{q or qintitle}' failed: {response}")
+                continue
+            for article in response.get("articles", []):
+                published = (article.get("publishedAt") or "").rstrip("Z")
+                # The `from` date is inclusive; drop what the previous search already returned
+                if article.get("url") in seen or (since and published <= since):
+                    continue
+                seen.add(article.get("url"))
+                articles.append(article)
+        articles.sort(key=lambda article: article.get("publishedAt") or "", reverse=True)
+
+        newest = articles[0].get("publishedAt") if articles else None
+        if newest:
+            marks[query_key] = max(since or "", newest.rstrip("Z"))
+            await ctx.set("state", state)
+        self.stats["searches"] += 1
+        self.stats["pages_fetched"] += 1 + len(rest)
+        return self._dedupe({
+            "status": "ok",
+            "totalResults": total,
+            "pages_fetched": 1 + len(rest),
+            "since": since,
+            "articles": articles,
+        })
+
+    def _dedupe(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Collapses near-duplicate articles in a NewsAPI response, recording how many were dropped."""
+        articles = response.get("articles") if isinstance(response, dict) else None
+        if self.dedup_threshold is None or not articles:
+            return response
+        try:
+            unique, dropped = dedupe_articles(articles, self.dedup_threshold)
+        except Exception as e:
+            logger.error(f"Error deduplicating news articles: {e}")
+            return response
+        self.stats["articles"] += len(articles)
+        self.stats["duplicates_dropped"] += dropped
+        return {**response, "articles": unique, "duplicates_dropped": dropped}
+
+    def metrics(self) -> dict:
+        """Returns the request, search and deduplication counters, and the quota left today."""
+        return {**self.stats, "quota_left": self.quota_left()}
+
+def news_from_env() -> News:
+    """
+    Builds the NewsAPI wrapper from the `NEWS_DEDUP_THRESHOLD` (near-duplicate similarity, default 0.6;
+    `off` to keep every article), `NEWS_PAGE_SIZE` (default 20), `NEWS_MAX_PAGES` (default 5),
+    `NEWS_MAX_RESULTS` (default 100) and `NEWS_DAILY_QUOTA` (requests per day, default 100; 0 for
+    no limit) environment variables.
+    """
+    threshold = os.getenv("NEWS_DEDUP_THRESHOLD", "0.6").strip().lower()
+    daily_quota = int(os.getenv("NEWS_DAILY_QUOTA", "100"))
+    return News(
+        dedup_threshold=None if threshold in ("off", "none", "0", "") else float(threshold),
+        page_size=int(os.getenv("NEWS_PAGE_SIZE", "20")),
+        max_pages=int(os.getenv("NEWS_MAX_PAGES", "5")),
+        max_results=int(os.getenv("NEWS_MAX_RESULTS", "100")),
+        daily_quota=daily_quota if daily_quota > 0 else None,
+    )
@@ -0,0 +1,147 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Wrappers around a rendered post body; `{toc}` is the post's table of contents
+TEMPLATES = {
+    "plain": "{body}",
+    "article": '<div class="post-article">\n{body}\n</div>',
+    "tutorial": (
+        '<div class="post-tutorial">\n<nav class="post-toc">\n<p><strong>Contents</strong></p>\n{toc}\n</nav>\n{body}\n</div>'
+    ),
+}
+DEFAULT_TEMPLATE = "article"
+
+# What a rendered post may contain once sanitized; everything else is stripped
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "code", "dd", "del", "div", "dl", "dt", "em", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "li", "nav", "ol", "p", "pre", "s", "span", "strong",
+    "sub", "sup", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    # Classes and ids carry the template, footnote and heading anchors
+    "*": {"class", "id", "title"},
+    "a": {"href"},
+    "img": {"src", "alt", "width", "height"},
+    "ol": {"start"},
+    "th": {"align", "style"},
+    "td": {"align", "style"},
+    # Code is highlighted with inline styles, since Blogger themes don't ship Pygments CSS
+    "div": {"style"},
+    "pre": {"style"},
+    "span": {"style"},
+}
+ALLOWED_STYLES = {
+    "background", "background-color", "border", "border-radius", "color", "font-style", "font-weight",
+    "line-height", "overflow", "overflow-x", "padding", "text-align", "text-decoration",
+}
+LEADING_H1 = re.compile(r"\A\s*#\s+(.+?)\s*#*\s*(?:\n|\Z)")
+WORD = re.compile(r"\w+")
+
+class MarkdownRenderer:
+    """Renders the Markdown written by BlogAgent into sanitized, Blogger-ready HTML.
+
+    Rendering is local and deterministic: Python-Markdown (tables, fenced code, footnotes, heading
+    anchors) with code blocks highlighted by Pygments as inline styles, wrapped in a template and
+    sanitized with nh3. Results are cached by content hash, so a draft re-rendered unchanged (on
+    read-back, review or publishing) costs nothing.
+    """
+    def __init__(self, code_style: str = "friendly", max_entries: int = 256):
+        """
+        Args:
+            code_style (str): The Pygments style of highlighted code blocks.
+            max_entries (int): Number of rendered posts kept in the cache.
+        """
+        self.code_style = code_style
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        # Markdown instances aren't thread-safe; one per tool thread, reset between documents
+        self._local = threading.local()
+
+    def _markdown(self):
+        md = getattr(self._local, "md", None)
+        if md is None:
+            import markdown
+
+            md = markdown.Markdown(
+                extensions=["extra", "sane_lists", "toc", "codehilite"],
+                extension_configs={
+                    "codehilite": {"noclasses": True, "guess_lang": False, "pygments_style": self.code_style},
+                    "toc": {"permalink": False},
+                },
+                output_format="html",
+            )
+            self._local.md = md
+        return md.reset()
+
+    def render(self, content_markdown: str, title: Optional[str] = None, template: str = DEFAULT_TEMPLATE) -> str:
+        """
+        Renders a post's Markdown into HTML.
+
+        Args:
+            content_markdown (str): The post body in Markdown. Inline HTML is allowed, but sanitized.
+            title (Optional[str]): The post title; a leading level-1 heading repeating it is dropped,
+                                   since Blogger shows the title above the body.
+            template (str): The template wrapping the body: one of `TEMPLATES`.
+
+        Returns:
+            str: The sanitized HTML.
+        """
+        if template not in TEMPLATES:
+            raise ValueError(f"Unknown template '{template}'. Use one of: {', '.join(TEMPLATES)}.")
+        heading = LEADING_H1.match(content_markdown)
+        if title and heading and WORD.findall(heading.group(1).lower()) == WORD.findall(title.lower()):
+            content_markdown = content_markdown[heading.end():]
+
+        key = hashlib.sha256(f"{template}\0{self.code_style}\0{content_markdown}".encode()).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self.stats["hits"] += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        import nh3
+
+        start = time.perf_counter()
+        md = self._markdown()
+        body = md.convert(content_markdown)
+        html = TEMPLATES[template].format(body=body, toc=getattr(md, "toc", ""))
+        html = nh3.clean(
+            html,
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            filter_style_properties=ALLOWED_STYLES,
+            link_rel="noopener noreferrer",
+        )
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["render_ms"] += round((time.perf_counter() - start) * 1000)
+            self._cache[key] = html
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return html
+
+    def metrics(self) -> dict:
+        return {**self.stats, "cached": len(self._cache), "code_style": self.code_style}
+
+def renderer_from_env() -> MarkdownRenderer:
+    """
+    Builds the Markdown renderer from the `RENDER_CODE_STYLE` (a Pygments style, default `friendly`)
+    and `RENDER_CACHE_SIZE` (default 256) environment variables.
+    """
+    return MarkdownRenderer(
+        code_style=os.getenv("RENDER_CODE_STYLE", "friendly"),
+        max_entries=int(os.getenv("RENDER_CACHE_SIZE", "256")),
+    )
+
+renderer = renderer_from_env()
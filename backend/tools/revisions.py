@@ -0,0 +1,319 @@
+import os
+import re
+import time
+import asyncio
+import difflib
+import logging
+from typing import Any, Dict, List, Optional
+from llama_index.core.workflow import Context
+from .render import DEFAULT_TEMPLATE, renderer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+WORD = re.compile(r"\w+")
+# Revisions whose deltas are kept per draft; older versions can no longer be restored
+HISTORY_LIMIT = int(os.getenv("REVISION_HISTORY_LIMIT", "20"))
+# Drafts that can be revised, with where their text is kept in the workflow state
+CONTENT_TYPES = ("blog_posts", "scripts")
+
+class EditError(ValueError):
+    """Raised when an edit can't be applied unambiguously to a draft."""
+
+def _locate(text: str, find: str) -> tuple[int, int]:
+    """Finds the one occurrence of `find` in `text`, exactly or else ignoring differences in whitespace."""
+    if not find.strip():
+        raise EditError("An edit has an empty `find` text.")
+    count = text.count(find)
+    if count == 1:
+        start = text.index(find)
+        return start, start + len(find)
+    if count == 0:
+        pattern = re.compile(r"\s+".join(re.escape(part) for part in find.split()))
+        matches = list(pattern.finditer(text))
+        if len(matches) == 1:
+            return matches[0].span()
+        count = len(matches)
+    if count == 0:
+        raise EditError(f"Text not found in the draft: {find[:80]!r}")
+    raise EditError(f"Text found {count} times in the draft, include more of it to make it unique: {find[:80]!r}")
+
+def _section_span(text: str, section: str) -> tuple[int, int]:
+    """Returns the span of the body of the section under a heading: up to the next heading of the same or a higher level."""
+    wanted = WORD.findall(section.lower().lstrip("#"))
+    headings = list(HEADING.finditer(text))
+    matches = [i for i, heading in enumerate(headings) if WORD.findall(heading.group(2).lower()) == wanted]
+    if len(matches) != 1:
+        available = ", ".join(repr(heading.group(2)) for heading in headings) or "none"
+        problem = "not found" if not matches else f"found {len(matches)} times"
+        raise EditError(f"Section {section!r} {problem}. Headings: {available}")
+    heading = headings[matches[0]]
+    level = len(heading.group(1))
+    end = next((later.start() for later in headings[matches[0] + 1:] if len(later.group(1)) <= level), len(text))
+    return heading.end(), end
+
+def apply_edits(text: str, edits: List[Dict[str, str]]) -> str:
+    """
+    Applies edits to a draft, in order. Either all of them apply or the draft is left as it was.
+
+    Args:
+        text (str): The draft.
+        edits (List[Dict[str, str]]): Each either `{"find": ..., "replace": ...}`, replacing text that
+                                       occurs exactly once, or `{"section": ..., "content": ...}`,
+                                       replacing the body of the section under a heading.
+
+    Returns:
+        str: The revised draft.
+
+    Raises:
+        EditError: If an edit's text or section isn't found exactly once.
+    """
+    for edit in edits:
+        if "section" in edit:
+            start, end = _section_span(text, edit["section"])
+            trailing = "\n\n" if end < len(text) else "\n"
+            text = f"{text[:start]}\n{edit['content'].strip()}{trailing}{text[end:]}"
+        else:
+            start, end = _locate(text, edit["find"])
+            text = text[:start] + edit["replace"] + text[end:]
+    return text
+
+def make_delta(new: str, old: str) -> List[list]:
+    """Returns the line operations that turn `new` back into `old`: `[start, end, old_lines]` over `new`'s lines."""
+    new_lines, old_lines = new.splitlines(keepends=True), old.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    return [[i1, i2, old_lines[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+def apply_delta(text: str, delta: List[list]) -> str:
+    """Applies the operations of `make_delta` to the newer text, returning the older one."""
+    lines = text.splitlines(keepends=True)
+    # Later operations first, so earlier line numbers stay valid
+    for start, end, replacement in reversed(delta):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+def diff_preview(old: str, new: str, context: int = 6, max_changes: int = 12, max_chars: int = 160) -> str:
+    """Returns the changes of a revision word by word, as `[-removed-]{+added+}` with a few words of context around each."""
+    old_words, new_words = re.split(r"(\s+)", old), re.split(r"(\s+)", new)
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    # Changes a few words apart are shown as one (words and whitespace alternate, hence the doubling)
+    changes = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if changes and i1 - changes[-1][1] <= 2 * context:
+            changes[-1][1], changes[-1][3] = i2, j2
+        else:
+            changes.append([i1, i2, j1, j2])
+
+    def clip(text: str) -> str:
+        return text if len(text) <= max_chars else f"{text[:max_chars // 2]} ... {text[-max_chars // 2:]}"
+
+    lines = []
+    for i1, i2, j1, j2 in changes[:max_changes]:
+        before = "".join(old_words[max(0, i1 - 2 * context):i1])
+        after = "".join(old_words[i2:i2 + 2 * context])
+        removed = f"[-{clip(''.join(old_words[i1:i2]))}-]" if i2 > i1 else ""
+        added = f"{{+{clip(''.join(new_words[j1:j2]))}+}}" if j2 > j1 else ""
+        lines.append(" ".join(f"...{before}{removed}{added}{after}...".split()))
+    if len(changes) > max_changes:
+        lines.append(f"... and {len(changes) - max_changes} more changes")
+    return "\n".join(lines)
+
+def record_revision(state: dict, content_type: str, key: str, old: str, new: str, note: str = "") -> int:
+    """
+    Records a revision of a draft in the workflow state, as the delta back to the previous version.
+
+    Args:
+        state (dict): The workflow state.
+        content_type (str): 'blog_posts' or 'scripts'.
+        key (str): The draft's key (its title).
+        old (str): The text before the revision.
+        new (str): The text after the revision.
+        note (str): What changed, for the history.
+
+    Returns:
+        int: The new version number.
+    """
+    history = state.setdefault("revisions", {}).setdefault(content_type, {}).setdefault(key, {"version": 1, "deltas": []})
+    history["version"] += 1
+    history["deltas"].append({
+        "version": history["version"],
+        "note": note,
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "chars": len(new),
+        "delta": make_delta(new, old),
+    })
+    del history["deltas"][:-HISTORY_LIMIT]
+    return history["version"]
+
+def _draft_text(state: dict, content_type: str, key: str) -> Optional[str]:
+    draft = state.get(content_type, {}).get(key)
+    if isinstance(draft, dict):
+        return draft.get("content_markdown")
+    return draft
+
+async def _set_draft_text(state: dict, content_type: str, key: str, text: str):
+    if content_type == "scripts":
+        state["scripts"][key] = text
+        return
+    draft = state["blog_posts"][key]
+    draft["content_markdown"] = text
+    draft["content_html"] = await asyncio.to_thread(renderer.render, text, key, draft.get("template", DEFAULT_TEMPLATE))
+
+def _edits(find: Optional[List[str]], replace: Optional[List[str]], sections: Optional[List[str]], section_contents: Optional[List[str]]) -> List[Dict[str, str]]:
+    find, replace, sections, section_contents = find or [], replace or [], sections or [], section_contents or []
+    if len(find) != len(replace):
+        raise EditError(f"Got {len(find)} `find` texts but {len(replace)} `replace` texts; pass one replacement per text.")
+    if len(sections) != len(section_contents):
+        raise EditError(f"Got {len(sections)} sections but {len(section_contents)} section contents; pass one content per section.")
+    edits = [{"section": s, "content": c} for s, c in zip(sections, section_contents)]
+    edits += [{"find": f, "replace": r} for f, r in zip(find, replace)]
+    if not edits:
+        raise EditError("No edits given.")
+    return edits
+
+async def _revise(
+    ctx: Context,
+    content_type: str,
+    key: str,
+    find: Optional[List[str]],
+    replace: Optional[List[str]],
+    sections: Optional[List[str]],
+    section_contents: Optional[List[str]],
+    note: str,
+) -> str:
+    try:
+        state = await ctx.get("state")
+        old = _draft_text(state, content_type, key)
+        if old is None:
+            return f"No draft found in {content_type} under the key '{key}'."
+        new = apply_edits(old, _edits(find, replace, sections, section_contents))
+        if new == old:
+            return "The edits don't change the draft."
+        await _set_draft_text(state, content_type, key, new)
+        version = record_revision(state, content_type, key, old, new, note)
+        return f"Revised '{key}' to version {version} ({len(old)} -> {len(new)} chars):\n{diff_preview(old, new)}"
+    except EditError as e:
+        return f"No edits applied: {e}"
+    except Exception as e:
+        logger.error(f"Error revising {content_type} draft '{key}': {e}")
+        return f"Failed to revise the draft: {e}"
+
+async def revise_blog_post(
+    ctx: Context,
+    title: str,
+    find: Optional[List[str]] = None,
+    replace: Optional[List[str]] = None,
+    sections: Optional[List[str]] = None,
+    section_contents: Optional[List[str]] = None,
+    note: str = "",
+) -> str:
+    """
+    Revise a prepared blog post with targeted edits instead of rewriting it. Edits apply in order, all or none.
+
+    Args:
+        ctx (Context): The context object.
+        title (str): The title the blog post was prepared under.
+        find (Optional[List[str]]): Markdown snippets to replace, each occurring exactly once (copy enough of the text to be unique).
+        replace (Optional[List[str]]): The replacement of each `find` snippet, in the same order ('' deletes it).
+        sections (Optional[List[str]]): Headings whose section bodies are replaced entirely (headings are kept).
+        section_contents (Optional[List[str]]): The new Markdown body of each section, in the same order.
+        note (str): A short description of the revision, for the version history.
+
+    Returns:
+        str: The new version number and a diff of the change, or why no edits were applied.
+    """
+    return await _revise(ctx, "blog_posts", title, find, replace, sections, section_contents, note)
+
+async def revise_video_script(
+    ctx: Context,
+    title: str,
+    find: Optional[List[str]] = None,
+    replace: Optional[List[str]] = None,
+    sections: Optional[List[str]] = None,
+    section_contents: Optional[List[str]] = None,
+    note: str = "",
+) -> str:
+    """
+    Revise a stored video script with targeted edits instead of rewriting it. Edits apply in order, all or none.
+
+    Args:
+        ctx (Context): The context object.
+        title (str): The key the script was stored under.
+        find (Optional[List[str]]): Script snippets to replace, each occurring exactly once (copy enough of the text to be unique).
+        replace (Optional[List[str]]): The replacement of each `find` snippet, in the same order ('' deletes it).
+        sections (Optional[List[str]]): Headings (e.g. 'Introduction') whose section bodies are replaced entirely (headings are kept).
+        section_contents (Optional[List[str]]): The new body of each section, in the same order.
+        note (str): A short description of the revision, for the version history.
+
+    Returns:
+        str: The new version number and a diff of the change, or why no edits were applied.
+    """
+    return await _revise(ctx, "scripts", title, find, replace, sections, section_contents, note)
+
+async def get_revision_history(ctx: Context, content_type: str, key: str) -> List[Dict[str, Any]] | str:
+    """
+    List the versions of a blog post or video script draft, newest first.
+
+    Args:
+        ctx (Context): The context object.
+        content_type (str): 'blog_posts' or 'scripts'.
+        key (str): The draft's title.
+
+    Returns:
+        List[Dict[str, Any]] | str: Each version's number, note, time and size, or an error message.
+    """
+    if content_type not in CONTENT_TYPES:
+        return f"Invalid content type. Must be one of: {', '.join(CONTENT_TYPES)}."
+    state = await ctx.get("state")
+    current = _draft_text(state, content_type, key)
+    if current is None:
+        return f"No draft found in {content_type} under the key '{key}'."
+    history = state.get("revisions", {}).get(content_type, {}).get(key)
+    if history is None:
+        return [{"version": 1, "note": "original", "chars": len(current), "current": True}]
+    versions = [
+        {"version": entry["version"], "note": entry["note"], "at": entry["at"], "chars": entry["chars"]}
+        for entry in reversed(history["deltas"])
+    ]
+    versions[0]["current"] = True
+    oldest = history["deltas"][0]["version"] - 1
+    versions.append({"version": oldest, "note": "original" if oldest == 1 else "oldest kept"})
+    return versions
+
+async def restore_revision(ctx: Context, content_type: str, key: str, version: int) -> str:
+    """
+    Restore an earlier version of a blog post or video script draft. The restore is itself recorded as a new version.
+
+    Args:
+        ctx (Context): The context object.
+        content_type (str): 'blog_posts' or 'scripts'.
+        key (str): The draft's title.
+        version (int): The version to restore, as listed by the revision history.
+
+    Returns:
+        str: The new version number and a diff of the change, or an error message.
+    """
+    if content_type not in CONTENT_TYPES:
+        return f"Invalid content type. Must be one of: {', '.join(CONTENT_TYPES)}."
+    try:
+        state = await ctx.get("state")
+        current = _draft_text(state, content_type, key)
+        history = state.get("revisions", {}).get(content_type, {}).get(key)
+        if current is None or history is None:
+            return f"No revision history for '{key}' in {content_type}."
+        deltas = [entry for entry in history["deltas"] if entry["version"] > version]
+        if version >= history["version"] or len(deltas) != history["version"] - version:
+            oldest = history["deltas"][0]["version"] - 1
+            return f"Version {version} can't be restored; versions {oldest} to {history['version'] - 1} can."
+        text = current
+        for entry in reversed(deltas):
+            text = apply_delta(text, entry["delta"])
+        await _set_draft_text(state, content_type, key, text)
+        new_version = record_revision(state, content_type, key, current, text, f"restored version {version}")
+        return f"Restored version {version} of '{key}' as version {new_version}:\n{diff_preview(current, text)}"
+    except Exception as e:
+        logger.error(f"Error restoring version {version} of {content_type} draft '{key}': {e}")
+        return f"Failed to restore the version: {e}"
@@ -1,5 +1,19 @@
-from llama_index.tools.wikipedia import WikipediaToolSpec
+import asyncio
+import functools
+from .cache import tool_cache
+from .digest import digester
 
+@functools.lru_cache(maxsize=None)
+def get_tool_spec():
+    """Returns the shared Wikipedia tool spec, imported and built on first use."""
+    from llama_index.tools.wikipedia import WikipediaToolSpec
+
+    return WikipediaToolSpec()
+
+def _wikipedia_key(text: str, lang: str) -> tuple[str, str]:
+    return text.strip().lower(), (lang or "en").strip().lower()
+
+@tool_cache.cached("wikipedia_load_data", key_fn=_wikipedia_key)
 def load_data(
     page: str, lang: str
 ) -> str:
@@ -10,9 +24,9 @@ def load_data(
         page (str): Title of the page to read.
         lang (str): Language of Wikipedia to read. (default: en)
     """
-    wikipedia_tool = WikipediaToolSpec()
-    return wikipedia_tool.load_data(page, lang)
+    return get_tool_spec().load_data(page, lang)
 
+@tool_cache.cached("wikipedia_search_data", key_fn=_wikipedia_key)
 def search_data(
     query: str, lang: str
 ) -> str:
@@ -24,5 +38,28 @@ def search_data(
         query (str): the string to search for
         lang (str): Language of Wikipedia to read. (default: en)
     """
-    wikipedia_tool = WikipediaToolSpec()
-    return wikipedia_tool.search_data(query, lang)
\ No newline at end of file
+    return get_tool_spec().search_data(query, lang)
+
+async def read_page(page: str, lang: str) -> str:
+    """
+    Retrieve a Wikipedia page; a long page is returned as a digest, whose chunks can be read in full.
+
+    Args:
+        page (str): Title of the page to read.
+        lang (str): Language of Wikipedia to read. (default: en)
+    """
+    content = await asyncio.to_thread(load_data, page, lang)
+    return await digester.digest(content, f"the Wikipedia page '{page}'") if isinstance(content, str) else content
+
+async def search_page(query: str, lang: str) -> str:
+    """
+    Search Wikipedia for a page related to the given query; a long page is returned as a digest,
+    whose chunks can be read in full.
+    Use this tool when `read_page` returns no results.
+
+    Args:
+        query (str): the string to search for
+        lang (str): Language of Wikipedia to read. (default: en)
+    """
+    content = await asyncio.to_thread(search_data, query, lang)
+    return await digester.digest(content, f"the Wikipedia page found for '{query}'") if isinstance(content, str) else content
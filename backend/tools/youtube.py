@@ -1,15 +1,39 @@
-from llama_index.readers.youtube_transcript import YoutubeTranscriptReader
-from llama_index.core import Settings
+import asyncio
+import functools
 from llama_index.core.workflow import Context
 from prompts import VIDEO_SCRIPT_WRITER_PROMPT
+from llms import get_model_router
 
-reader = YoutubeTranscriptReader()
+from .cache import tool_cache
+from .digest import digester
+from .revisions import record_revision
 
-def get_youtube_transcripts(links: list[str]) -> list[str]:
-    """Get the transcripts of youtube videos."""
-    documents = reader.load_data(ytlinks=links)
-    transcripts = [doc.text for doc in documents]
-    return transcripts
+NO_TRANSCRIPT = "No transcript is available for {link}."
+
+@functools.lru_cache(maxsize=None)
+def get_reader():
+    """Returns the shared transcript reader, imported and built on first use."""
+    from llama_index.readers.youtube_transcript import YoutubeTranscriptReader
+
+    return YoutubeTranscriptReader()
+
+@tool_cache.cached("youtube_transcript", key_fn=lambda link: link.strip())
+def load_transcript(link: str) -> str:
+    """Get the transcript of a single youtube video. Cached per link."""
+    documents = get_reader().load_data(ytlinks=[link])
+    return "\n".join(doc.text for doc in documents)
+
+async def get_youtube_transcripts(links: list[str]) -> list[str]:
+    """Get the transcripts of youtube videos, one entry per link, in order. Long transcripts are returned as a digest, whose chunks can be read in full."""
+    transcripts = await asyncio.gather(*(asyncio.to_thread(load_transcript, link) for link in links))
+
+    async def entry(link: str, transcript: str) -> str:
+        if not transcript.strip():
+            # Kept as an entry of its own, so the results still line up with the links
+            return NO_TRANSCRIPT.format(link=link)
+        return await digester.digest(transcript, f"the transcript of {link}")
+
+    return list(await asyncio.gather(*(entry(link, transcript) for link, transcript in zip(links, transcripts))))
 
 async def write_video_script(ctx: Context, title: str, information: str, intel_keys: list[str]) -> str:
     """
@@ -37,7 +61,8 @@ async def write_video_script(ctx: Context, title: str, information: str, intel_k
         
         briefs = '\n\n'.join([f"{state['intel_briefing'][key]}" for key in intel_keys if key in state["intel_briefing"]])
 
-        script = await Settings.llm.acomplete(
+        script = await get_model_router().complete(
+            "video_script",
             prompt = VIDEO_SCRIPT_WRITER_PROMPT.format(
                 briefs=briefs,
                 title=title,
@@ -47,6 +72,10 @@ async def write_video_script(ctx: Context, title: str, information: str, intel_k
         # Set the script in the context
         if "scripts" not in state:
             state["scripts"] = {}
+        previous = state["scripts"].get(title)
+        if previous is not None and previous != script.text:
+            # A full rewrite of a script is kept in its version history too
+            record_revision(state, "scripts", title, previous, script.text, "rewritten")
         state["scripts"][title] = script.text
 
         result_str = script.text + f"\n\nSuccessfully generated and set the video script in the context, under the key '{title}'."
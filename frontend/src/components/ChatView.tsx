@@ -39,6 +39,8 @@ const ChatView = () => {
   const { toast } = useToast();
   const queryClient = useQueryClient();
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // The conversation being shown; sent with every message so any backend worker can serve it
+  const ctxIdRef = useRef<string | null>(null);
   const { openMobile, setOpenMobile } = useSidebar();
 
   // Auto-scroll to bottom when messages change
@@ -51,6 +53,7 @@ const ChatView = () => {
     // Handle new chat (clear messages)
     const newChatHandler = () => {
       console.log("New chat event received, clearing messages");
+      ctxIdRef.current = null;
       setMessages([]);
     };
     
@@ -90,6 +93,7 @@ const ChatView = () => {
       if (!res.ok) throw new Error("Failed to load context");
       
       const data = await res.json();
+      ctxIdRef.current = id;
       
       // Parse the chat_history array from the response
       if (data.chat_history && Array.isArray(data.chat_history)) {
@@ -124,6 +128,7 @@ const ChatView = () => {
       const data = await res.json();
       
       // Clear messages immediately
+      ctxIdRef.current = null;
       setMessages([]);
       
       toast({
@@ -169,12 +174,13 @@ const ChatView = () => {
       const res = await fetch(`${API_BASE}/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: userMessage }),
+        body: JSON.stringify({ message: userMessage, ctx_id: ctxIdRef.current }),
       });
 
       if (!res.ok) throw new Error(`API error: ${res.status}`);
 
       const data = await res.json();
+      if (data.ctx_id) ctxIdRef.current = data.ctx_id;
       setMessages(prev => prev.filter(msg => !msg.loading));
       setMessages(prev => [...prev, { 
         sender: "agent", 